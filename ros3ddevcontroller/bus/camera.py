@@ -23,7 +23,7 @@
 """Camera Controller wrapper"""
 from __future__ import absolute_import
 from ros3ddevcontroller.bus.client import DBusClientTask
-from ros3ddevcontroller.param.store import ParametersStore, CAMERA_PARAMETERS
+from ros3ddevcontroller.param.store import ParametersStore
 from ros3ddevcontroller.param.parameter import ParameterStatus
 from datetime import datetime
 import glib
@@ -69,7 +69,7 @@ class CameraTask(DBusClientTask):
         self._setup_camctl_proxy()
 
     def _set_camera_status(self, pstatus):
-        for pname in CAMERA_PARAMETERS:
+        for pname in ParametersStore.CAMERA_PARAMETERS:
             pdesc = ParametersStore.get(pname)
             pdesc_status = pdesc.status
             pdesc_status.set_status(pstatus)
@@ -125,7 +125,7 @@ class CameraTask(DBusClientTask):
 
     def _camera_parameter_changed(self, key, val):
         self.logger.debug('camera parameter changed: %s: %s', key, val)
-        if key not in CAMERA_PARAMETERS:
+        if not ParametersStore.is_camera_parameter(key):
             self.logger.debug('parameter %s is not a camera parameter', key)
             return
         try:
@@ -282,7 +282,7 @@ class CameraTask(DBusClientTask):
     def _update_camera_parameters(self, cam):
         """Update camera related parameters"""
         self.logger.debug('updating camera parameters')
-        for param in CAMERA_PARAMETERS:
+        for param in ParametersStore.CAMERA_PARAMETERS:
             try:
                 val = self._get_param(cam, param)
                 self.logger.debug('current value: %s -> %s', param, val)
@@ -23,7 +23,7 @@
 """Servo driver proxy"""
 from __future__ import absolute_import
 
-from ros3ddevcontroller.param.store import ParametersStore, SERVO_PARAMETERS
+from ros3ddevcontroller.param.store import ParametersStore
 from ros3ddevcontroller.param.parameter import ParameterStatus, Infinity
 from ros3ddevcontroller.bus.client import DBusClientTask
 import dbus
@@ -75,7 +75,7 @@ class ServoTask(DBusClientTask):
     @classmethod
     def _set_servo_params_status(cls, pstatus):
         """Update status of parameters that are applied to servo"""
-        for pname in SERVO_PARAMETERS:
+        for pname in ParametersStore.SERVO_PARAMETERS:
             pdesc = ParametersStore.get(pname)
             pdesc_status = pdesc.status
             pdesc_status.set_status(pstatus)
@@ -98,7 +98,7 @@ class ServoTask(DBusClientTask):
         if not self.servo:
             return
 
-        for param in SERVO_PARAMETERS:
+        for param in ParametersStore.SERVO_PARAMETERS:
             try:
                 val = self.servo.getValue(param)
                 ParametersStore.set(param, val)
@@ -22,17 +22,12 @@
 # SOFTWARE.
 
 from ros3ddevcontroller.service import Ros3DKRControllerService, Ros3DAOControllerService
-from ros3ddevcontroller.param.store import ParameterLoader
 
 
 def mainAO():
-    # load parameters from file
-    ParameterLoader.load()
-    # initialize tasks
+    # initialize tasks, parameters are loaded by the service
     Ros3DAOControllerService.initFromCLI()
 
 def mainKR():
-    # load parameters from file
-    ParameterLoader.load()
-    # initialize tasks
+    # initialize tasks, parameters are loaded by the service
     Ros3DKRControllerService.initFromCLI()
@@ -25,14 +25,24 @@ from __future__ import absolute_import
 import logging
 import datetime
 from ros3ddevcontroller.param.store import ParametersStore, ParameterSnapshotter
+from ros3ddevcontroller.param.batch import BatchEvaluator
+from ros3ddevcontroller.param.solver import ParameterSolver
 from ros3ddevcontroller.param.backends import FileSnapshotBackend
+from ros3ddevcontroller.web.codec import ParameterCodec
+from ros3ddevcontroller.param.parameter import Infinity, HiddenParameter
 from ros3ddevcontroller.bus import servo
 from ros3ddevcontroller.util import make_dir
 from threading import Lock
 
 class Controller(object):
-    def __init__(self):
+    def __init__(self, store=ParametersStore):
+        """Create a controller operating on parameter store `store`. By
+        default, the process wide ParametersStore is used.
+
+        :param store ParametersStore: parameters store
+        """
         self.logger = logging.getLogger(__name__)
+        self.store = store
         self.servo = None
         self.camera = None
         self.snapshots_location = None
@@ -56,10 +66,9 @@ class Controller(object):
         # update snapshots backend
         self.snapshots_backend = FileSnapshotBackend(self.snapshots_location)
 
-    @classmethod
-    def is_servo_parameter(cls, param):
+    def is_servo_parameter(self, param):
         """Return true if parameter is applicable to servo"""
-        return ParametersStore.is_servo_parameter(param.name)
+        return self.store.is_servo_parameter(param.name)
 
     def apply_servo_parameter(self, param):
         """Apply parameter to servo
@@ -81,10 +90,9 @@ class Controller(object):
             self.logger.exception('error when applying a parameter')
             return False
 
-    @classmethod
-    def is_camera_parameter(cls, param):
+    def is_camera_parameter(self, param):
         """Return True if parameter is applicable to camera"""
-        return ParametersStore.is_camera_parameter(param.name)
+        return self.store.is_camera_parameter(param.name)
 
     def apply_camera_parameter(self, param):
         """Apply camera parameter
@@ -105,10 +113,9 @@ class Controller(object):
             self.logger.exception('unexpected error when setting camera parameter')
             return False
 
-    @classmethod
-    def is_parameter_writable(cls, param):
+    def is_parameter_writable(self, param):
         """Return True if parameter is applicable to camera"""
-        return ParametersStore.is_read_only(param.name) == False
+        return self.store.is_read_only(param.name) == False
 
     def apply_other_parameter(self, param):
         """Apply parameter directly in parameter store, i.e. skipping any
@@ -119,7 +126,7 @@ class Controller(object):
         :return: True"""
         value = param.value
         name = param.name
-        ParametersStore.set(name, value)
+        self.store.set(name, value)
         return True
 
     def apply_single_parameter(self, param):
@@ -137,39 +144,227 @@ class Controller(object):
             status = self.apply_other_parameter(param)
         return status
 
+    def _is_local_parameter(self, param):
+        """Return True if parameter is not applied to any external device,
+        but directly in parameter store"""
+        if self.is_servo_parameter(param):
+            return not self.servo.is_active()
+        elif self.is_camera_parameter(param):
+            return not self.camera.is_active()
+        return True
+
     def apply_parameters(self, params):
         """Apply a parameter set
 
         :param params list of ParamDesc: list of parameters to apply
         :rtype: list(Parameter)
         :return: list of parameters applied"""
-        # record changed parameter descriptors
-        changed_params = []
+        # record applied parameters
+        applied_params = []
+        # parameters that do not need to be applied to external
+        # devices are set in the store in one go, so that dependant
+        # parameters are evaluated only once
+        local_params = []
 
         # apply parameters serially, note that if any parameter takes
         # longer to aplly this will contribute to wait time of the
         # whole request
         for param in params:
-            applied = self.apply_single_parameter(param)
-
-            # param validation was successful and was applied to servo
-            if applied:
-                par = ParametersStore.get(param.name)
-                changed_params.append(par)
-
-        return changed_params
+            if not self.is_parameter_writable(param):
+                self.logger.warning('parameter %s is read-only, skipping', param.name)
+            elif self._is_local_parameter(param):
+                local_params.append(param)
+                applied_params.append(param)
+            elif self.apply_single_parameter(param):
+                # param validation was successful and was applied to
+                # servo or camera
+                applied_params.append(param)
+
+        if local_params:
+            self.store.set_many([(param.name, param.value)
+                                 for param in local_params])
+
+        return [self.store.get(param.name) for param in applied_params]
 
     def get_parameters(self):
         """Return a dict with all parameters in the system"""
-        return ParametersStore.parameters_as_dict()
+        return self.store.parameters_as_dict()
+
+    def get_selected_parameters(self, names=None, groups=None, fields=None):
+        """Return a dict with parameters of given names and parameters
+        belonging to given groups, all parameters if neither are
+        given. Raises KeyError if parameter or group is not known,
+        ValueError if field is not known.
+
+        :param names list(str): parameter names
+        :param groups list(str): group names, see ParametersStore.GROUPS
+        :param fields list(str): fields of parameter description to
+                                 include, e.g. ['value'], all if None
+        :rtype: dict
+        """
+        if fields is not None:
+            unknown = set(fields) - set(ParameterCodec.FIELDS)
+            if unknown:
+                raise ValueError('unknown fields %s' % (', '.join(sorted(unknown))))
+
+        params = {}
+        for param in self.store.select_parameters(names, groups):
+            as_dict = ParameterCodec.parameter_to_dict(param)
+            if fields is not None:
+                as_dict = dict((field, as_dict[field]) for field in fields
+                               if field in as_dict)
+            params[param.name] = as_dict
+        return params
+
+    def get_parameters_json(self):
+        """Return all parameters in the system, encoded to JSON object, same
+        as get_parameters()
+
+        :rtype: str
+        """
+        return self.store.parameters_as_json()
+
+    def get_parameters_revision(self):
+        """Return current revision of parameters store, the revision changes
+        whenever any parameter is modified
+
+        :rtype: int
+        """
+        return self.store.revision()
+
+    def get_changed_parameters(self, since):
+        """Return a dict with current store revision and parameters modified
+        after revision `since`
+
+        :param since int: store revision
+        :rtype: dict
+        """
+        revision, changed = self.store.changed_since(since)
+
+        params = {}
+        for param in changed:
+            params[param.name] = ParameterCodec.parameter_to_dict(param)
+
+        return {
+            "revision": revision,
+            "parameters": params
+        }
+
+    def evaluate_batch(self, inputs, outputs=None,
+                       mode=BatchEvaluator.MODE_PRODUCT):
+        """Evaluate parameters for a batch of input values, without modifying
+        the store. Raises KeyError if parameter is not known, ValueError
+        if values are incorrect.
+
+        :param inputs list: list of (parameter_name, list of values) tuples
+        :param outputs list(str): names of parameters to evaluate, all
+                                  parameters depending on inputs if None
+        :param mode str: BatchEvaluator.MODE_PRODUCT or BatchEvaluator.MODE_ZIP
+        :rtype: dict
+        :return: dict of parameter_name: list of values
+        """
+        return BatchEvaluator(self.store).evaluate(inputs, outputs, mode)
+
+    def simulate(self, params, ranges=None, outputs=None,
+                 mode=BatchEvaluator.MODE_PRODUCT):
+        """Evaluate parameters as if `params` were applied, using a scratch
+        copy of the store. Servo and camera are not involved, change
+        listeners are not notified and read-only parameters can be
+        set as well. If `ranges` are given, a batch of their values is
+        evaluated on top of `params`. Raises KeyError if parameter is
+        not known, ValueError if values are incorrect.
+
+        :param params list(Parameter): hypothetical parameter values
+        :param ranges list: list of (parameter_name, list of values) tuples
+        :param outputs list(str): names of parameters to report, by
+                                  default `params` and all parameters
+                                  depending on them
+        :param mode str: batch mode, see evaluate_batch()
+        :rtype: dict
+        :return: dict with 'parameters', list of simulated Parameter
+                 instances, and 'batch', result of evaluating the batch
+                 of `ranges` if these were given
+        """
+        scratch = self.store.clone()
+        scratch.LAZY_EVALUATION = False
+        scratch.set_many([(param.name, param.value) for param in params],
+                         notify=False)
+
+        view = scratch.view()
+        if outputs is None:
+            pdescs = [scratch.get(param.name) for param in params]
+            pdescs += scratch._collect_dependants(pdescs)
+            # hidden parameters are not part of the view
+            simulated = [view.get(pdesc.name) for pdesc in pdescs
+                         if not isinstance(pdesc, HiddenParameter)]
+        else:
+            simulated = [view.get(name) for name in outputs]
+
+        result = {
+            "parameters": simulated
+        }
+        if ranges:
+            result["batch"] = BatchEvaluator(scratch).evaluate(ranges, outputs,
+                                                               mode)
+        return result
+
+    def solve_parameter(self, target, value, variable, low=None, high=None):
+        """Find value of parameter `variable` for which evaluated parameter
+        `target` reaches `value`, other parameters being fixed at
+        their current values. The store is not modified. Raises
+        KeyError if parameter is not known, SolverRequestError if
+        `target` cannot be solved for `variable`, ValueError if
+        solution was not found.
+
+        :param target str: name of evaluated parameter
+        :param value float: requested value of `target`
+        :param variable str: name of parameter to solve for
+        :param low float: lower end of range of `variable`
+        :param high float: upper end of range of `variable`
+        :rtype: dict
+        :return: solution, see ParameterSolver.solve()
+        """
+        return ParameterSolver(self.store).solve(target, value, variable,
+                                                 low, high)
+
+    def get_parameter_history(self, name, since=None):
+        """Return recorded history of parameter `name`, or None if history of
+        this parameter is not recorded
+
+        :param name str: parameter name
+        :param since float: only samples recorded at or after this timestamp
+        :rtype: list((float, value))
+        :return: list of (timestamp, value) tuples, oldest first
+        """
+        try:
+            samples = self.store.history(name, since)
+        except KeyError:
+            self.logger.error('history of parameter %s not available', name)
+            return None
+
+        return [(timestamp, Infinity.convert_to(value)
+                 if isinstance(value, float) else value)
+                for timestamp, value in samples]
+
+    def get_system_status(self):
+        """Return a dict describing current state of the system, including
+        call statistics of parameter evaluators and queue metrics of
+        change listeners
+
+        :rtype: dict
+        """
+        return {
+            "evaluators": self.store.evaluator_stats(),
+            "listeners": self.store.change_listeners.stats()
+        }
 
     def _record_timestamp(self):
         """Helper for updating current timestamp in parameters"""
         now = datetime.datetime.now()
-        ParametersStore.set('record_date', now.strftime('%Y-%m-%d'),
-                            notify=False)
-        ParametersStore.set('record_time', now.strftime('%H:%M:%S'),
-                            notify=False)
+        self.store.set('record_date', now.strftime('%Y-%m-%d'),
+                       notify=False)
+        self.store.set('record_time', now.strftime('%H:%M:%S'),
+                       notify=False)
 
     def take_snapshot(self):
         """Record a snapshot of current parameter set
@@ -179,7 +374,8 @@ class Controller(object):
             # record timestamp
             self._record_timestamp()
 
-            return ParameterSnapshotter.save(self.snapshots_backend)
+            return ParameterSnapshotter.save(self.snapshots_backend,
+                                             store=self.store)
 
     def list_snapshots(self):
         """List IDs of available snapshots
@@ -31,6 +31,7 @@ from ros3ddevcontroller.web.codec import ParameterCodec
 from ros3ddevcontroller.param  import ParametersStore
 
 import paho.mqtt.client as mqtt
+from threading import Lock
 import logging
 import socket
 
@@ -42,12 +43,19 @@ class MQTTTask(TornadoTask):
     port = option(default=1883, help='Broker port')
     host = option(default='localhost', help='Broker host address')
     topic = option(default='/parameters', help='Parameters topic')
+    rate = option(default=10, type=float,
+                  help='Maximum number of updates of a single parameter ' \
+                  'published per second, 0 for no limit')
 
     def __init__(self, *args, **kwargs):
         super(MQTTTask, self).__init__(*args, **kwargs)
 
         self.adapter = None
 
+        # parameters changed since last publish, name: Parameter
+        self.pending = {}
+        self.pending_lock = Lock()
+
         self.client = mqtt.Client()
         self.client.on_connect = self._on_connect
         self.client.on_disconnect = self._on_disconnect
@@ -55,7 +63,12 @@ class MQTTTask(TornadoTask):
     def start(self):
         _log.debug('start')
         self.ioloop.add_callback(self._try_connect)
-        ParametersStore.change_listeners.add(self.param_changed)
+        # deliver notifications from dispatcher thread, so that
+        # publishing does not hold up parameter updates, rapid updates
+        # of a parameter are coalesced, but the final value is always
+        # published
+        ParametersStore.change_listeners.add(self.param_changed, queued=True,
+                                             rate=self.rate)
 
     def stop(self):
         _log.debug('stop')
@@ -106,7 +119,19 @@ class MQTTTask(TornadoTask):
 
     def param_changed(self, param):
         _log.debug('param_changed %s', param)
-        self.ioloop.add_callback(self._publish_param, param)
+        # parameters changed before the publish callback runs are
+        # coalesced into a single message
+        with self.pending_lock:
+            if not self.pending:
+                self.ioloop.add_callback(self._publish_pending)
+            self.pending[param.name] = param
+
+    def _publish_pending(self):
+        with self.pending_lock:
+            params = list(self.pending.values())
+            self.pending = {}
+
+        self._publish_param(params)
 
     def _publish_param(self, param):
         as_json = ParameterCodec(as_set=True).encode(param)
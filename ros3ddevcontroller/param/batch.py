@@ -0,0 +1,406 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Evaluation of parameters for batches of input values"""
+
+from __future__ import absolute_import
+from ros3ddevcontroller.param.store import ParametersStore, FailedValue
+from ros3ddevcontroller.param.parameter import HiddenParameter
+import itertools
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_log = logging.getLogger(__name__)
+
+
+class BatchEvaluator(object):
+    """Evaluate parameters depending on given inputs, for a batch of input
+    values. Each row of the batch is evaluated as if the inputs were
+    set in a copy of the store, with parameters depending on the
+    inputs being evaluated. Only parameters needed for requested
+    outputs are evaluated. Parameters that fail to evaluate keep
+    their current value from the store. The store is not modified.
+
+    When NumPy is available, the batch is evaluated column by column.
+    Evaluators that are VECTORIZED evaluate a whole column at once,
+    other evaluators, and rows that failed or involve a failed hidden
+    parameter, are evaluated value by value, reusing results for
+    repeated arguments.
+
+    Otherwise the batch is evaluated row by row. Between consecutive
+    rows, only parameters depending on inputs whose value has
+    changed are evaluated again. In PRODUCT mode, rows follow the
+    order of itertools.product(), hence parameters that depend only
+    on the leading inputs are evaluated once per value of these
+    inputs.
+
+    """
+
+    # evaluate every combination of input values
+    MODE_PRODUCT = 'product'
+    # evaluate n-th values of all inputs together
+    MODE_ZIP = 'zip'
+
+    # limit of number of rows in a batch
+    MAX_ROWS = 100000
+
+    def __init__(self, store=ParametersStore):
+        """Initialize batch evaluator
+
+        :param store ParametersStore: store providing parameters and
+                                      evaluation plans
+        """
+        self.store = store
+
+    def _prepare(self, inputs, outputs):
+        """Take a snapshot of parameter values and evaluation state"""
+        store = self.store
+        with store.lock:
+            # pending lazy evaluations must not leak into the snapshot
+            store.evaluate_dirty()
+
+            values = dict((name, pdesc.value)
+                          for name, pdesc in store.PARAMETERS.items())
+
+            in_params = []
+            columns = []
+            for name, column in inputs:
+                pdesc = store._find_param(name)
+                in_params.append(pdesc)
+                columns.append([store._convert(pdesc, value) for value in column])
+
+            everything = store._collect_dependants(in_params)
+            if outputs is None:
+                outputs = [pdesc.name for pdesc in everything
+                           if not isinstance(pdesc, HiddenParameter)]
+            else:
+                for name in outputs:
+                    if isinstance(store._find_param(name), HiddenParameter):
+                        raise KeyError('parameter %s not found' % (name))
+
+            bound = dict((pdesc.name, store.EVALUATORS[pdesc.name])
+                         for pdesc in everything)
+            failed = set(store.FAILED_HIDDEN)
+
+        # skip parameters that none of outputs depends on
+        needed = set(outputs)
+        for pdesc in reversed(everything):
+            if pdesc.name in needed:
+                needed.update(arg.name for arg in bound[pdesc.name].args)
+
+        return values, in_params, columns, outputs, bound, failed, needed
+
+    def _count(self, columns, mode):
+        """Obtain number of rows of a batch, validating mode and size"""
+        if mode == self.MODE_PRODUCT:
+            count = 1
+            for column in columns:
+                count *= len(column)
+        elif mode == self.MODE_ZIP:
+            lengths = set(len(column) for column in columns)
+            if len(lengths) > 1:
+                raise ValueError('inputs differ in length')
+            count = lengths.pop() if lengths else 0
+        else:
+            raise ValueError('unsupported mode %s' % (mode))
+
+        if count > self.MAX_ROWS:
+            raise ValueError('batch of %d rows exceeds limit of %d' % (
+                count, self.MAX_ROWS))
+        return count
+
+    def evaluate(self, inputs, outputs=None, mode=MODE_PRODUCT):
+        """Evaluate parameters for a batch of input values. Raises KeyError
+        if any of parameters is not known, ValueError if input values
+        cannot be converted to parameter type or the batch is too
+        large.
+
+        :param inputs: dict of parameter_name: list of values, or list of
+                       (parameter_name, list of values) tuples
+        :param outputs list(str): names of parameters to evaluate, if None,
+                                  all parameters depending on inputs are
+                                  returned
+        :param mode str: MODE_PRODUCT or MODE_ZIP
+        :rtype: dict
+        :return: dict of parameter_name: list of values, for both
+                 inputs and outputs, n-th elements of lists form n-th row
+        """
+        if isinstance(inputs, dict):
+            inputs = inputs.items()
+
+        prepared = self._prepare(inputs, outputs)
+        count = self._count(prepared[2], mode)
+
+        if numpy is not None:
+            return self._evaluate_columns(prepared, count, mode)
+        return self._evaluate_rows(prepared, count, mode)
+
+    def _evaluate_rows(self, prepared, count, mode):
+        """Evaluate batch row by row"""
+        base, in_params, columns, outputs, bound, base_failed, needed = prepared
+        if mode == self.MODE_PRODUCT:
+            rows = itertools.product(*columns)
+        else:
+            rows = itertools.izip(*columns)
+
+        store = self.store
+        in_names = [pdesc.name for pdesc in in_params]
+        skip = set(in_names)
+        # dict of frozenset(changed input positions): evaluation plan
+        plans = {}
+
+        values = dict(base)
+        failed = set(base_failed)
+        result = dict((name, []) for name in in_names + list(outputs))
+
+        previous = None
+        for row in rows:
+            changed = frozenset(idx for idx, value in enumerate(row)
+                                if previous is None or previous[idx] != value)
+            previous = row
+
+            plan = plans.get(changed)
+            if plan is None:
+                plan = [pdesc for pdesc in store._collect_dependants(
+                    [in_params[idx] for idx in changed])
+                        if pdesc.name not in skip and pdesc.name in needed]
+                plans[changed] = plan
+
+            for idx in changed:
+                values[in_names[idx]] = row[idx]
+
+            for pdesc in plan:
+                self._evaluate(pdesc, bound[pdesc.name], values, base, failed)
+
+            for name, column in result.items():
+                column.append(values[name])
+
+        _log.debug('evaluated batch of %d rows, %d plans', count, len(plans))
+        return result
+
+    @staticmethod
+    def _evaluate(pdesc, bound, values, base, failed):
+        """Evaluate a single parameter of a row, following semantics of
+        ParametersStore.evaluate_single_param()"""
+        name = pdesc.name
+        hidden = isinstance(pdesc, HiddenParameter)
+
+        try:
+            args = [FailedValue(arg.name) if arg.name in failed else values[arg.name]
+                    for arg in bound.args]
+            values[name] = pdesc.value_type(FailedValue.check(bound.evaluator(*args)))
+        except ArithmeticError:
+            values[name] = base[name]
+            if hidden:
+                failed.add(name)
+            return
+
+        if hidden:
+            failed.discard(name)
+
+    @staticmethod
+    def _column_array(pdesc, values):
+        """Convert list of values of parameter to NumPy array"""
+        if pdesc.value_type in (float, int, bool):
+            return numpy.array(values, dtype=pdesc.value_type)
+        return numpy.array(values, dtype=object)
+
+    def _input_arrays(self, in_params, columns, count, mode):
+        """Obtain arrays of input values for each row of the batch"""
+        arrays = [self._column_array(pdesc, column)
+                  for pdesc, column in zip(in_params, columns)]
+        if count == 0:
+            return [array[:0] for array in arrays]
+
+        if mode == self.MODE_PRODUCT:
+            # same row order as itertools.product()
+            repeat = count
+            tile = 1
+            for idx, array in enumerate(arrays):
+                repeat //= len(array)
+                arrays[idx] = numpy.tile(numpy.repeat(array, repeat), tile)
+                tile *= len(array)
+        return arrays
+
+    def _evaluate_columns(self, prepared, count, mode):
+        """Evaluate batch column by column using NumPy"""
+        base, in_params, columns, outputs, bound, base_failed, needed = prepared
+
+        in_names = [pdesc.name for pdesc in in_params]
+        arrays = dict(zip(in_names, self._input_arrays(in_params, columns,
+                                                       count, mode)))
+        # dict of parameter_name: tuple(array of group IDs, number of
+        # groups), rows in the same group have the same value
+        groups = dict((name, self._unique(array)) for name, array in arrays.items())
+        # dict of parameter_name: boolean array, rows in which hidden
+        # parameter failed to evaluate
+        failed = dict((name, numpy.ones(count, dtype=bool)) for name in base_failed)
+
+        skip = set(in_names)
+        plan = [pdesc for pdesc in self.store._collect_dependants(in_params)
+                if pdesc.name not in skip and pdesc.name in needed]
+        vectorized = 0
+        for pdesc in plan:
+            if self._evaluate_column(pdesc, bound[pdesc.name], count,
+                                     arrays, groups, base, failed):
+                vectorized += 1
+
+        result = {}
+        for name in in_names + list(outputs):
+            if name in arrays:
+                result[name] = arrays[name].tolist()
+            else:
+                result[name] = [base[name]] * count
+
+        _log.debug('evaluated batch of %d rows, %d of %d parameters vectorized',
+                   count, vectorized, len(plan))
+        return result
+
+    @staticmethod
+    def _unique(array):
+        """Assign group IDs to equal elements of `array`
+
+        :rtype: tuple(numpy.ndarray, int)
+        :return: tuple (array of group IDs, number of groups)
+        """
+        unique, ids = numpy.unique(array, return_inverse=True)
+        return ids, len(unique)
+
+    def _combine_groups(self, names, groups):
+        """Assign group IDs to rows, such that rows in the same group have
+        the same values of all parameters in `names`"""
+        ids, size = None, 1
+        for name in names:
+            arg_ids, arg_size = groups[name]
+            if ids is None:
+                ids, size = arg_ids, arg_size
+                continue
+
+            ids = ids * arg_size + arg_ids
+            size *= arg_size
+            if size > len(ids):
+                # keep IDs small
+                ids, size = self._unique(ids)
+        return ids, size
+
+    def _evaluate_column(self, pdesc, bound, count, arrays, groups, base, failed):
+        """Evaluate all rows of a single parameter, following semantics of
+        ParametersStore.evaluate_single_param()
+
+        :return: True if evaluated with NumPy
+        """
+        name = pdesc.name
+        args = [arrays.get(arg.name, base[arg.name]) for arg in bound.args]
+        ids, size = self._combine_groups([arg.name for arg in bound.args
+                                          if arg.name in arrays], groups)
+        groups[name] = (ids, size)
+
+        # rows involving failed hidden parameters
+        args_failed = None
+        for arg in bound.args:
+            if arg.name in failed:
+                if args_failed is None:
+                    args_failed = failed[arg.name].copy()
+                else:
+                    args_failed |= failed[arg.name]
+
+        evaluator = bound.evaluator
+        vectorized = evaluator.VECTORIZED and pdesc.value_type == float
+        if vectorized:
+            values = numpy.empty(count, dtype=float)
+            values[:] = evaluator.evaluate_array(*args)
+            # NaN is either a failure or a result of evaluation,
+            # evaluation of a single value tells which one it is
+            redo = numpy.isnan(values)
+            if args_failed is not None:
+                redo |= args_failed
+            rows = numpy.flatnonzero(redo)
+        else:
+            values = numpy.empty(count, dtype=self._column_array(pdesc, []).dtype)
+            rows = numpy.arange(count)
+
+        row_failed = None
+        if len(rows):
+            row_failed = numpy.zeros(count, dtype=bool)
+            self._evaluate_rows_of(pdesc, bound, rows, ids, values, row_failed,
+                                   args, base, failed)
+
+        arrays[name] = values
+        if isinstance(pdesc, HiddenParameter):
+            if row_failed is not None and row_failed.any():
+                failed[name] = row_failed
+            else:
+                failed.pop(name, None)
+        return vectorized
+
+    @staticmethod
+    def _evaluate_rows_of(pdesc, bound, rows, ids, values, row_failed,
+                          args, base, failed):
+        """Evaluate parameter in given rows one by one, once for each group
+        of rows with the same arguments, storing results in `values`
+        and marking rows that failed in `row_failed`"""
+        name = pdesc.name
+        group_ids, first, inverse = numpy.unique(ids[rows], return_index=True,
+                                                 return_inverse=True)
+
+        group_values = []
+        group_failed = []
+        for row in rows[first].tolist():
+            row_args = []
+            for arg, value in zip(bound.args, args):
+                if arg.name in failed and failed[arg.name][row]:
+                    value = FailedValue(arg.name)
+                elif isinstance(value, numpy.ndarray):
+                    value = value.item(row)
+                row_args.append(value)
+
+            try:
+                value = pdesc.value_type(FailedValue.check(bound.evaluator(*row_args)))
+                group_failed.append(False)
+            except ArithmeticError:
+                value = base[name]
+                group_failed.append(True)
+            group_values.append(value)
+
+        group_values = numpy.array(group_values, dtype=values.dtype)
+        values[rows] = group_values[inverse]
+        row_failed[rows] = numpy.array(group_failed, dtype=bool)[inverse]
+
+    @staticmethod
+    def as_arrays(result):
+        """Convert columns of batch evaluation result to NumPy arrays.
+        Raises RuntimeError if NumPy is not available.
+
+        :param result dict: result of evaluate()
+        :rtype: dict
+        :return: dict of parameter_name: numpy.ndarray
+        """
+        if numpy is None:
+            raise RuntimeError('NumPy is not available')
+
+        return dict((name, numpy.asarray(column))
+                    for name, column in result.items())
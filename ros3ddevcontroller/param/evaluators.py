@@ -25,6 +25,20 @@
 from ros3ddevcontroller.param.parameter import Evaluator
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def divide_array(num, den):
+    """Divide NumPy arrays element-wise, NaN where `den` is 0, for which
+    scalar division raises ZeroDivisionError"""
+    with numpy.errstate(all='ignore'):
+        if not isinstance(den, numpy.ndarray):
+            return numpy.nan if den == 0 else num / den
+        return numpy.where(den == 0, numpy.nan, num / den)
+
 class DiagonalHelperCalc(Evaluator):
 
     REQUIRES = []
@@ -33,10 +47,13 @@ class DiagonalHelperCalc(Evaluator):
     def calc_diag(width=None, height=None):
         return math.sqrt(width * width + height * height);
 
-class DofHelperCalc(Evaluator):
+class HyperfocalCalc(Evaluator):
+    """Hyperfocal distance, evaluated into a hidden parameter shared by
+    depth of field evaluators"""
+
+    VECTORIZED = True
 
     REQUIRES = [
-        'focus_distance_m',
         'focal_length_mm',
         'aperture',
         'coc_um',
@@ -44,40 +61,61 @@ class DofHelperCalc(Evaluator):
         'sensor_width_px'
     ]
 
-    @staticmethod
-    def calc_h_hs(coc_um=None, focus_distance_m=None, aperture=None,
-                  frame_width_px=None, sensor_width_px=None, focal_length_mm=None):
+    def __call__(self, coc_um=None, aperture=None, frame_width_px=None,
+                 sensor_width_px=None, focal_length_mm=None):
+
+        if coc_um == 0:
+            return float('inf')
 
         coc_mm = coc_um / 1000.
-        ratio = frame_width_px / sensor_width_px
-        h = 0.001 * (focal_length_mm * focal_length_mm) / (coc_mm * ratio * aperture)
-        hs = h * focus_distance_m
+        ratio = float(frame_width_px) / sensor_width_px
+        return 0.001 * (focal_length_mm * focal_length_mm) / (coc_mm * ratio * aperture)
 
-        return h, hs
+    def evaluate_array(self, coc_um, aperture, frame_width_px,
+                       sensor_width_px, focal_length_mm):
+        coc_mm = coc_um / 1000.
+        ratio = divide_array(numpy.asarray(frame_width_px, dtype=float), sensor_width_px)
+        hyperfocal = divide_array(0.001 * (focal_length_mm * focal_length_mm),
+                                  coc_mm * ratio * aperture)
+        return numpy.where(coc_um == 0, numpy.inf, hyperfocal)
+
+
+class DofHelperCalc(Evaluator):
+
+    VECTORIZED = True
+
+    REQUIRES = [
+        'focus_distance_m',
+        'coc_um',
+        'hyperfocal_m'
+    ]
 
 
 class DofNearCalc(DofHelperCalc):
 
-    def __call__(self, coc_um=None, focus_distance_m=None, aperture=None,
-                 frame_width_px=None, sensor_width_px=None, focal_length_mm=None):
+    def __call__(self, coc_um=None, focus_distance_m=None, hyperfocal_m=None):
 
         if coc_um == 0:
             return focus_distance_m
 
-        h, hs = DofHelperCalc.calc_h_hs(coc_um, focus_distance_m, aperture,
-                                        frame_width_px, sensor_width_px, focal_length_mm)
-
         if focus_distance_m == float('inf'):
-            return h
+            return hyperfocal_m
 
-        near = hs / (h + focus_distance_m)
+        hs = hyperfocal_m * focus_distance_m
+        near = hs / (hyperfocal_m + focus_distance_m)
         return near
 
+    def evaluate_array(self, coc_um, focus_distance_m, hyperfocal_m):
+        with numpy.errstate(all='ignore'):
+            near = divide_array(hyperfocal_m * focus_distance_m,
+                                hyperfocal_m + focus_distance_m)
+        near = numpy.where(focus_distance_m == numpy.inf, hyperfocal_m, near)
+        return numpy.where(coc_um == 0, focus_distance_m, near)
+
 
 class DofFarCalc(DofHelperCalc):
 
-    def __call__(self, coc_um=None, focus_distance_m=None, aperture=None,
-                 frame_width_px=None, sensor_width_px=None, focal_length_mm=None):
+    def __call__(self, coc_um=None, focus_distance_m=None, hyperfocal_m=None):
 
         if coc_um == 0:
             return focus_distance_m
@@ -85,14 +123,24 @@ class DofFarCalc(DofHelperCalc):
         if focus_distance_m == float('inf'):
             return float('inf')
 
-        h, hs = DofHelperCalc.calc_h_hs(coc_um, focus_distance_m, aperture,
-                                        frame_width_px, sensor_width_px, focal_length_mm)
+        h = hyperfocal_m
+        hs = h * focus_distance_m
         far = float('inf') if focus_distance_m >= h else (hs / (h - focus_distance_m))
         return far
 
+    def evaluate_array(self, coc_um, focus_distance_m, hyperfocal_m):
+        h = hyperfocal_m
+        with numpy.errstate(all='ignore'):
+            far = divide_array(h * focus_distance_m, h - focus_distance_m)
+            far = numpy.where(focus_distance_m >= h, numpy.inf, far)
+        far = numpy.where(focus_distance_m == numpy.inf, numpy.inf, far)
+        return numpy.where(coc_um == 0, focus_distance_m, far)
+
 
 class DofTotalCalc(Evaluator):
 
+    VECTORIZED = True
+
     REQUIRES = [
         'dof_near_m',
         'dof_far_m'
@@ -101,6 +149,10 @@ class DofTotalCalc(Evaluator):
     def __call__(self, dof_near_m=None, dof_far_m=None):
         return dof_far_m - dof_near_m
 
+    def evaluate_array(self, dof_near_m, dof_far_m):
+        with numpy.errstate(all='ignore'):
+            return numpy.subtract(dof_far_m, dof_near_m)
+
 class FovDegHelperCalc(Evaluator):
 
     REQUIRES = [
@@ -166,45 +218,62 @@ class ConvergencePxCalc(Evaluator):
         return frame_width_px * math.atan(baseline_mm / (2 * 1000 * distance_screen_m))  / math.atan(frame_width_mm / (2 * focal_length_mm))
 
 
-class ParallaxPercentHelperCalc(Evaluator):
+class ParallaxScaleCalc(Evaluator):
+    """Parallax scale factor, evaluated into a hidden parameter shared by
+    parallax evaluators"""
+
+    VECTORIZED = True
 
     REQUIRES = [
         'baseline_mm',
         'focal_length_mm',
-        'frame_width_mm',
+        'frame_width_mm'
+    ]
+
+    def __call__(self, baseline_mm=None, focal_length_mm=None, frame_width_mm=None):
+        return 100 * (baseline_mm * focal_length_mm) / frame_width_mm
+
+    def evaluate_array(self, baseline_mm, focal_length_mm, frame_width_mm):
+        return divide_array(100 * (baseline_mm * focal_length_mm), frame_width_mm)
+
+
+class ParallaxPercentHelperCalc(Evaluator):
+
+    VECTORIZED = True
+
+    REQUIRES = [
+        'parallax_scale',
         'distance_screen_m'
     ]
 
     @staticmethod
-    def calc_parallax_percent(baseline_mm, focal_length_mm, frame_width_mm,
-                              distance_screen_m, distance):
+    def calc_parallax_percent(parallax_scale, distance_screen_m, distance):
 
-        return 100 * (baseline_mm * focal_length_mm) / frame_width_mm * (1 / (1000 * distance_screen_m) - 1 / (1000 * distance))
+        return parallax_scale * (1 / (1000 * distance_screen_m) - 1 / (1000 * distance))
+
+    def evaluate_array(self, parallax_scale, distance_screen_m, distance):
+        with numpy.errstate(all='ignore'):
+            return parallax_scale * (divide_array(1, 1000 * distance_screen_m) -
+                                     divide_array(1, 1000 * distance))
 
 
 class ParallaxNearPercentCalc(ParallaxPercentHelperCalc):
 
     REQUIRES = ParallaxPercentHelperCalc.REQUIRES + ['distance_near_m']
 
-    def __call__(self, baseline_mm=None, focal_length_mm=None, frame_width_mm=None,
-                 distance_screen_m=None, distance_near_m=None):
+    def __call__(self, parallax_scale=None, distance_screen_m=None, distance_near_m=None):
 
-        return ParallaxPercentHelperCalc.calc_parallax_percent(baseline_mm,
-                                                               focal_length_mm,
-                                                               frame_width_mm,
+        return ParallaxPercentHelperCalc.calc_parallax_percent(parallax_scale,
                                                                distance_screen_m,
                                                                distance_near_m)
 
-
 class ParallaxFarPercentCalc(ParallaxPercentHelperCalc):
 
     REQUIRES = ParallaxPercentHelperCalc.REQUIRES + ['distance_far_m']
 
-    def __call__(self, baseline_mm=None, focal_length_mm=None, frame_width_mm=None,
-                 distance_screen_m=None, distance_far_m=None):
-        return ParallaxPercentHelperCalc.calc_parallax_percent(baseline_mm,
-                                                               focal_length_mm,
-                                                               frame_width_mm,
+    def __call__(self, parallax_scale=None, distance_screen_m=None, distance_far_m=None):
+
+        return ParallaxPercentHelperCalc.calc_parallax_percent(parallax_scale,
                                                                distance_screen_m,
                                                                distance_far_m)
 
@@ -212,12 +281,9 @@ class ParallaxObject1PercentCalc(ParallaxPercentHelperCalc):
 
     REQUIRES = ParallaxPercentHelperCalc.REQUIRES + ['distance_object1_m']
 
-    def __call__(self, baseline_mm=None, focal_length_mm=None, frame_width_mm=None,
-                 distance_screen_m=None, distance_object1_m=None):
+    def __call__(self, parallax_scale=None, distance_screen_m=None, distance_object1_m=None):
 
-        return ParallaxPercentHelperCalc.calc_parallax_percent(baseline_mm,
-                                                               focal_length_mm,
-                                                               frame_width_mm,
+        return ParallaxPercentHelperCalc.calc_parallax_percent(parallax_scale,
                                                                distance_screen_m,
                                                                distance_object1_m)
 
@@ -225,17 +291,16 @@ class ParallaxObject2PercentCalc(ParallaxPercentHelperCalc):
 
     REQUIRES = ParallaxPercentHelperCalc.REQUIRES + ['distance_object2_m']
 
-    def __call__(self, baseline_mm=None, focal_length_mm=None, frame_width_mm=None,
-                 distance_screen_m=None, distance_object2_m=None):
+    def __call__(self, parallax_scale=None, distance_screen_m=None, distance_object2_m=None):
 
-        return ParallaxPercentHelperCalc.calc_parallax_percent(baseline_mm,
-                                                               focal_length_mm,
-                                                               frame_width_mm,
+        return ParallaxPercentHelperCalc.calc_parallax_percent(parallax_scale,
                                                                distance_screen_m,
                                                                distance_object2_m)
 
 class ParallaxMmHelperCalc(Evaluator):
 
+    VECTORIZED = True
+
     REQUIRES = [
         'screen_width_m'
     ]
@@ -245,6 +310,10 @@ class ParallaxMmHelperCalc(Evaluator):
 
         return 10 * screen_width_m * parallax_percent;
 
+    def evaluate_array(self, screen_width_m, parallax_percent):
+        with numpy.errstate(all='ignore'):
+            return numpy.multiply(10 * screen_width_m, parallax_percent)
+
 class ParallaxNearMMCalc(ParallaxMmHelperCalc):
 
     REQUIRES = ParallaxMmHelperCalc.REQUIRES + ['parallax_near_percent']
@@ -485,6 +554,8 @@ class SpectatorFovHorizontalDegCalc(Evaluator):
 
 class PerceivedPositionPercHelperCalc(Evaluator):
 
+    VECTORIZED = True
+
     REQUIRES = [
         'interpupillary_distance_mm'
     ]
@@ -493,6 +564,11 @@ class PerceivedPositionPercHelperCalc(Evaluator):
     def calc_perceived_pos_perc(interpupillary_distance_mm=None, parallax_mm=None):
         return 100 * interpupillary_distance_mm / (interpupillary_distance_mm - parallax_mm)
 
+    def evaluate_array(self, interpupillary_distance_mm, parallax_mm):
+        with numpy.errstate(all='ignore'):
+            return divide_array(100 * interpupillary_distance_mm,
+                                interpupillary_distance_mm - parallax_mm)
+
 class PerceivedPositionNearPercCalc(PerceivedPositionPercHelperCalc):
 
     REQUIRES = PerceivedPositionPercHelperCalc.REQUIRES + ['parallax_near_mm']
@@ -535,6 +611,8 @@ class PerceivedPositionObject2PercCalc(PerceivedPositionPercHelperCalc):
 
 class PerceivedPositionMHelperCalc(Evaluator):
 
+    VECTORIZED = True
+
     REQUIRES = [
         'screen_distance_m'
     ]
@@ -543,6 +621,10 @@ class PerceivedPositionMHelperCalc(Evaluator):
     def calc_perceived_pos_m(screen_distance_m=None, perceived_pos_perc=None):
         return screen_distance_m * perceived_pos_perc / 100;
 
+    def evaluate_array(self, screen_distance_m, perceived_pos_perc):
+        with numpy.errstate(all='ignore'):
+            return numpy.multiply(screen_distance_m, perceived_pos_perc) / 100
+
 class PerceivedPositionNearMCalc(PerceivedPositionMHelperCalc):
 
     REQUIRES = PerceivedPositionMHelperCalc.REQUIRES + ['perceived_position_near_percent']
@@ -0,0 +1,107 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""History of numeric parameter values"""
+
+from __future__ import absolute_import
+from array import array
+
+
+class ParameterHistory(object):
+    """Fixed size ring buffer of (timestamp, value) samples of a numeric
+    parameter. Samples are kept in preallocated arrays of doubles,
+    once the buffer is full, the oldest sample is overwritten.
+
+    """
+
+    def __init__(self, size, value_type=float):
+        """Initialize history buffer
+
+        :param size int: maximum number of samples
+        :param value_type type: type of parameter value
+        """
+        assert size > 0
+
+        self.size = size
+        self.value_type = value_type
+        self.timestamps = array('d', [0.0]) * size
+        self.values = array('d', [0.0]) * size
+        # index of the oldest sample
+        self.start = 0
+        # number of samples in buffer
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _index(self, pos):
+        """Index of sample at position `pos`, counting from the oldest one"""
+        return (self.start + pos) % self.size
+
+    def append(self, timestamp, value):
+        """Record a sample. Sample is skipped if value is the same as the
+        latest one.
+
+        :param timestamp float: time of sample
+        :param value: parameter value
+        """
+        value = float(value)
+        if self.count and self.values[self._index(self.count - 1)] == value:
+            return
+
+        if self.count < self.size:
+            idx = self._index(self.count)
+            self.count += 1
+        else:
+            idx = self.start
+            self.start = self._index(1)
+
+        self.timestamps[idx] = timestamp
+        self.values[idx] = value
+
+    def _find(self, since):
+        """Position of the first sample recorded at or after `since`"""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.timestamps[self._index(mid)] < since:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def samples(self, since=None):
+        """Obtain samples, oldest first
+
+        :param since float: only samples recorded at or after this time
+        :rtype: list((float, value))
+        """
+        first = 0
+        if since is not None:
+            first = self._find(since)
+
+        value_type = self.value_type
+        out = []
+        for pos in range(first, self.count):
+            idx = self._index(pos)
+            out.append((self.timestamps[idx], value_type(self.values[idx])))
+        return out
@@ -73,15 +73,58 @@ class Infinity(object):
 
 
 class ParameterStatus(object):
-    """Paramter status wrapper"""
+    """Paramter status wrapper. Status is kept as a set of bit flags,
+    `read`, `write` and `status` are exposed as properties."""
     HARDWARE = 'hardware'
     SOFTWARE = 'software'
 
+    FLAG_READ = 0x1
+    FLAG_WRITE = 0x2
+    FLAG_HARDWARE = 0x4
+
+    __slots__ = ['flags']
+
     def __init__(self, read=True, write=True,
                  status_type=SOFTWARE):
+        self.flags = 0
         self.read = read
         self.write = write
-        self.status = status_type
+        self.set_status(status_type)
+
+    def _get_flag(self, flag):
+        return bool(self.flags & flag)
+
+    def _set_flag(self, flag, value):
+        if value:
+            self.flags |= flag
+        else:
+            self.flags &= ~flag
+
+    @property
+    def read(self):
+        return self._get_flag(self.FLAG_READ)
+
+    @read.setter
+    def read(self, value):
+        self._set_flag(self.FLAG_READ, value)
+
+    @property
+    def write(self):
+        return self._get_flag(self.FLAG_WRITE)
+
+    @write.setter
+    def write(self, value):
+        self._set_flag(self.FLAG_WRITE, value)
+
+    @property
+    def status(self):
+        if self.flags & self.FLAG_HARDWARE:
+            return ParameterStatus.HARDWARE
+        return ParameterStatus.SOFTWARE
+
+    @status.setter
+    def status(self, status):
+        self.set_status(status)
 
     def set_status(self, status):
         """Set parameter status
@@ -89,15 +132,40 @@ class ParameterStatus(object):
         :param status: one of HARDWARE, SOFTWARE"""
         if status not in [ParameterStatus.HARDWARE, ParameterStatus.SOFTWARE]:
             raise ValueError('invalid status {}'.format(status))
-        self.status = status
+        self._set_flag(self.FLAG_HARDWARE, status == ParameterStatus.HARDWARE)
+
+    def copy(self):
+        """Create a copy of status"""
+        status = ParameterStatus.__new__(ParameterStatus)
+        status.flags = self.flags
+        return status
+
+    def __getstate__(self):
+        return {'flags': self.flags}
+
+    def __setstate__(self, state):
+        self.flags = state['flags']
 
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return isinstance(other, ParameterStatus) and self.flags == other.flags
+
+    def __ne__(self, other):
+        return not self == other
 
 
 class Parameter(object):
     """System parameter wrapper"""
 
+    __slots__ = [
+        'name',
+        'value',
+        'value_type',
+        'status',
+        'min_value',
+        'max_value',
+        'evaluator'
+    ]
+
     def __init__(self, name, value, value_type,
                  status=None, min_val=None, max_val=None,
                  evaluator=None):
@@ -130,38 +198,84 @@ class Parameter(object):
     def is_read_only(self):
         return self.status.write == False
 
+    def copy(self):
+        """Create a copy of parameter, status is copied as well"""
+        param = self.__class__.__new__(self.__class__)
+        for attr in Parameter.__slots__:
+            setattr(param, attr, getattr(self, attr))
+        param.status = self.status.copy()
+        return param
+
+    def __getstate__(self):
+        return dict((attr, getattr(self, attr)) for attr in Parameter.__slots__)
+
+    def __setstate__(self, state):
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        if not isinstance(other, Parameter):
+            return False
+        for attr in Parameter.__slots__:
+            if getattr(self, attr) != getattr(other, attr):
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self == other
 
 
 class ReadOnlyParameter(Parameter):
     """Read only parameter wrapper"""
 
+    __slots__ = []
+
     def __init__(self, name, value, value_type, **kwargs):
         super(ReadOnlyParameter, self).__init__(name, value, value_type,
                                                 status=ParameterStatus(write=False),
                                                 **kwargs)
 
 
+class HiddenParameter(ReadOnlyParameter):
+    """Intermediate value of evaluation, shared by evaluators of other
+    parameters. Hidden parameters are evaluated like any other
+    parameter, but are not published in store views, hence are not
+    visible to API clients nor recorded in snapshots."""
+
+    __slots__ = []
+
+
 class Evaluator(object):
     REQUIRES = []
 
-    """A parameter evaluator helper class. When a parameter that has this
-    class as an evaluator needs to be updated, an instance of this
-    class will be created and called with keyword parameters listed in
-    REQUIRES property.
+    # maximum number of results cached on values of required
+    # parameters, 0 disables caching; only worth enabling for
+    # evaluators that are costly compared to a dictionary lookup
+    MEMO_SIZE = 0
+
+    # evaluators implementing evaluate_array() are evaluated for whole
+    # batches of values at once when NumPy is available, see
+    # BatchEvaluator
+    VECTORIZED = False
+
+    """A parameter evaluator helper class. An instance of this class is
+    created once, when parameters are loaded. When a parameter that
+    has this class as an evaluator needs to be updated, the instance
+    will be called with values of parameters listed in REQUIRES
+    property. The values are passed positionally, in order of
+    arguments of __call__(), hence argument names must match
+    REQUIRES.
 
     """
 
-    def __init__(self):
-        self.logger = logging.getLogger(__name__)
+    logger = logging.getLogger(__name__)
 
     def __call__(self, **kwargs):
         """Calculate new value of parameter. The value of parameters that are
         required for calculating this parameter will be passed as
-        keyword arguments. The evaluation engine will catch and log
-        ArithmeticError exception, other exceptions are allowed to
-        fall through.
+        arguments named after the parameters. The evaluation engine
+        will catch and log ArithmeticError exception, other
+        exceptions are allowed to fall through.
 
         :param **kwargs dict: parameters that are required for calculating this one
         :rtype: same as parameter
@@ -170,5 +284,18 @@ class Evaluator(object):
         """
         raise NotImplementedError('Evaluation for {} not implemented'.format(self.__class__.__name__))
 
+    def evaluate_array(self, *args):
+        """Calculate values of parameter for a batch of values of required
+        parameters, passed positionally in the same order as to
+        __call__(), either as NumPy arrays or as scalars that are the
+        same for each element of the batch. Elements for which
+        __call__() would raise ArithmeticError must be NaN, these are
+        evaluated again with __call__().
+
+        :rtype: numpy.ndarray
+        :return: array of float values of parameter
+        """
+        raise NotImplementedError('Batch evaluation for {} not implemented'.format(self.__class__.__name__))
+
 
 
@@ -0,0 +1,259 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Loading of parameter definitions from schema files
+
+Schema is a JSON file of the following format:
+
+{
+    "servo": ["baseline_mm", ...],
+    "camera": ["iso", ...],
+    "screen": ["screen_type", ...],
+    "parameters": [
+        {"name": "iso", "type": "int", "value": 800},
+        {"name": "camera_id", "type": "str", "value": "A", "read_only": true},
+        {"name": "hyperfocal_m", "type": "float", "value": 0,
+         "evaluator": "HyperfocalCalc", "hidden": true},
+        {"name": "shutter_us", "type": "float", "value": 20000,
+         "evaluator": "ShutterUSCalc", "min": 0, "max": 1000000},
+        ...
+    ]
+}
+
+Evaluators are referred to by name of a class defined in
+ros3ddevcontroller.param.evaluators. Hidden parameters hold
+intermediate values shared by evaluators and are not visible to API
+clients.
+
+"""
+
+from __future__ import absolute_import
+from ros3ddevcontroller.param.parameter import Parameter, ReadOnlyParameter, \
+    HiddenParameter, Evaluator
+from ros3ddevcontroller.param import evaluators
+import tempfile
+import hashlib
+import logging
+import json
+import pickle
+import shutil
+import os
+
+
+_log = logging.getLogger(__name__)
+
+
+class ParameterSchemaError(Exception):
+    """Schema error wrapper"""
+    pass
+
+
+class CompiledSchema(object):
+    """Parameters loaded from schema, together with evaluation plan
+    obtained from ParametersStore.get_plan()"""
+
+    def __init__(self, parameters, servo, camera, screen, plan=None):
+        self.parameters = parameters
+        self.servo = servo
+        self.camera = camera
+        self.screen = screen
+        self.plan = plan
+
+
+class ParameterSchema(object):
+    """Parameters schema file. Compiled schema is cached in a file at
+    `cache_path`, by default located next to the schema file. The cache
+    is keyed on a hash of schema and evaluators module, hence any
+    change to either invalidates it.
+
+    """
+
+    # bump whenever format of cache changes
+    CACHE_FORMAT = 3
+
+    TYPES = {
+        'str': str,
+        'int': int,
+        'float': float,
+        'bool': bool,
+    }
+
+    def __init__(self, path, cache_path=None):
+        self.path = path
+        self.cache_path = cache_path if cache_path else path + '.cache'
+        self._key = None
+
+    def _read(self, path):
+        with open(path, 'rb') as inf:
+            return inf.read()
+
+    def key(self):
+        """Obtain cache key of schema
+
+        :rtype: str
+        """
+        if not self._key:
+            digest = hashlib.sha1()
+            digest.update(str(self.CACHE_FORMAT).encode())
+            digest.update(self._read(self.path))
+            # argument order of evaluators is part of compiled plan,
+            # hash the source if available, compiled module otherwise
+            evaluators_path = os.path.splitext(evaluators.__file__)[0] + '.py'
+            if not os.path.exists(evaluators_path):
+                evaluators_path = evaluators.__file__
+            digest.update(self._read(evaluators_path))
+            self._key = digest.hexdigest()
+        return self._key
+
+    def load(self):
+        """Load and validate schema. Raises ParameterSchemaError if the
+        schema is incorrect.
+
+        :rtype: CompiledSchema
+        """
+        _log.debug('loading parameters schema from %s', self.path)
+
+        try:
+            schema = json.loads(self._read(self.path).decode('utf-8'))
+        except ValueError:
+            _log.exception('failed to decode schema')
+            raise ParameterSchemaError('JSON decoding error')
+
+        if not isinstance(schema, dict):
+            raise ParameterSchemaError('Schema not an object')
+
+        servo = self._load_names(schema, 'servo')
+        camera = self._load_names(schema, 'camera')
+        screen = self._load_names(schema, 'screen')
+
+        parameters = schema.get('parameters')
+        if not isinstance(parameters, list):
+            raise ParameterSchemaError('Missing \'parameters\' list')
+
+        parameters = [self._load_parameter(p) for p in parameters]
+
+        defined = set(p.name for p in parameters)
+        for field, names in [('servo', servo), ('camera', camera),
+                             ('screen', screen)]:
+            for name in names:
+                if name not in defined:
+                    raise ParameterSchemaError('Unknown parameter {} in \'{}\''.format(
+                        name, field))
+
+        return CompiledSchema(parameters, servo, camera, screen)
+
+    @staticmethod
+    def _load_names(schema, field):
+        names = schema.get(field, [])
+        if not isinstance(names, list):
+            raise ParameterSchemaError('\'{}\' is not a list'.format(field))
+        return [str(name) for name in names]
+
+    @staticmethod
+    def _convert_value(value_type, value):
+        """Convert schema value to `value_type`. Boolean values are either JSON
+        booleans or strings 'true'/'false', as bool() would take any
+        non-empty string, 'false' included, for True"""
+        if value_type is not bool or isinstance(value, bool):
+            return value_type(value)
+
+        if isinstance(value, basestring) and value.lower() in ('true', 'false'):
+            return value.lower() == 'true'
+        raise ValueError('not a boolean: {!r}'.format(value))
+
+    @classmethod
+    def _load_parameter(cls, desc):
+        """Create a Parameter from its schema description"""
+        if not isinstance(desc, dict):
+            raise ParameterSchemaError('Parameter description not an object')
+
+        for field in ['name', 'type', 'value']:
+            if field not in desc:
+                raise ParameterSchemaError('Missing \'{}\' field'.format(field))
+
+        name = str(desc['name'])
+
+        value_type = cls.TYPES.get(desc['type'])
+        if not value_type:
+            raise ParameterSchemaError('Unsupported type {} of parameter {}'.format(
+                desc['type'], name))
+
+        try:
+            value = cls._convert_value(value_type, desc['value'])
+        except ValueError as err:
+            raise ParameterSchemaError('Incorrect value of parameter {}: {}'.format(
+                name, err))
+
+        evaluator = None
+        if desc.get('evaluator'):
+            evaluator = getattr(evaluators, desc['evaluator'], None)
+            if not isinstance(evaluator, type) or not issubclass(evaluator, Evaluator):
+                raise ParameterSchemaError('Unknown evaluator {} of parameter {}'.format(
+                    desc['evaluator'], name))
+
+        kwargs = dict(min_val=desc.get('min'), max_val=desc.get('max'),
+                      evaluator=evaluator)
+        if desc.get('hidden', False):
+            return HiddenParameter(name, value, value_type, **kwargs)
+        if desc.get('read_only', False):
+            return ReadOnlyParameter(name, value, value_type, **kwargs)
+        return Parameter(name, value, value_type, **kwargs)
+
+    def load_cache(self):
+        """Load compiled schema from cache
+
+        :rtype: CompiledSchema
+        :return: compiled schema or None if cache is missing or outdated
+        """
+        if not os.path.exists(self.cache_path):
+            return None
+
+        try:
+            with open(self.cache_path, 'rb') as inf:
+                key, compiled = pickle.load(inf)
+        except Exception:
+            _log.exception('failed to load schema cache from %s', self.cache_path)
+            return None
+
+        if key != self.key():
+            _log.debug('schema cache %s is outdated', self.cache_path)
+            return None
+
+        return compiled
+
+    def save_cache(self, compiled):
+        """Save compiled schema to cache. Failure to write the cache is not
+        fatal.
+
+        :param compiled CompiledSchema: compiled schema, with plan
+        """
+        assert compiled.plan
+
+        _log.debug('saving schema cache to %s', self.cache_path)
+        try:
+            fd, path = tempfile.mkstemp()
+            with os.fdopen(fd, 'wb') as outf:
+                pickle.dump((self.key(), compiled), outf,
+                            pickle.HIGHEST_PROTOCOL)
+            shutil.move(path, self.cache_path)
+        except (IOError, OSError):
+            _log.exception('failed to save schema cache to %s', self.cache_path)
@@ -0,0 +1,309 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Solvers finding parameter values that yield a requested value of an
+evaluated parameter"""
+
+from __future__ import absolute_import
+from ros3ddevcontroller.param.store import ParametersStore
+import logging
+
+
+_log = logging.getLogger(__name__)
+
+class SolverRequestError(ValueError):
+    """Parameters to solve for cannot be solved, e.g. target does not
+    depend on the variable, as opposed to a solution not being found"""
+    pass
+
+# positions in a scene, with name of parameter holding distance to the
+# position
+POSITIONS = {
+    'near': 'distance_near_m',
+    'far': 'distance_far_m',
+    'object1': 'distance_object1_m',
+    'object2': 'distance_object2_m',
+}
+
+
+def find_root(func, low, high, tolerance=1e-9, max_iterations=100):
+    """Find x in range [low, high], such that func(x) == 0, using
+    false position method with Illinois modification. Raises
+    ValueError if func(low) and func(high) have the same sign, or if
+    the root could not be found in `max_iterations`.
+
+    :param func: function of single argument
+    :param low float: lower end of range
+    :param high float: upper end of range
+    :param tolerance float: acceptable error of func(x)
+    :rtype: tuple(float, int)
+    :return: tuple (root, number of iterations)
+    """
+    if low > high:
+        low, high = high, low
+
+    f_low, f_high = func(low), func(high)
+    if f_low == 0:
+        return low, 0
+    if f_high == 0:
+        return high, 0
+    if (f_low > 0) == (f_high > 0):
+        raise ValueError('solution not bracketed by %r, %r' % (low, high))
+
+    # side that was kept in the previous iteration, halving function
+    # value at the side kept twice in a row prevents slow, one sided
+    # convergence of plain false position method
+    side = 0
+    for iteration in range(1, max_iterations + 1):
+        x = (low * f_high - high * f_low) / (f_high - f_low)
+        f_x = func(x)
+        if abs(f_x) <= tolerance or high - low <= tolerance * max(1.0, abs(x)):
+            return x, iteration
+
+        if (f_x > 0) == (f_high > 0):
+            high, f_high = x, f_x
+            if side == -1:
+                f_low /= 2
+            side = -1
+        else:
+            low, f_low = x, f_x
+            if side == 1:
+                f_high /= 2
+            side = 1
+
+    raise ValueError('solution not found in %d iterations' % (max_iterations))
+
+
+class ParameterSolver(object):
+    """Find value of a parameter (variable) that makes an evaluated
+    parameter (target) reach requested value, with all other
+    parameters fixed at their current values. Closed form inversion
+    of evaluators is used where available, otherwise the solution is
+    searched for with a bracketed root finder, evaluating the target
+    directly with evaluators. The store is not modified.
+
+    """
+
+    METHOD_CLOSED_FORM = 'closed-form'
+    METHOD_ROOT_FINDER = 'root-finder'
+
+    # acceptable error of target value, relative to the requested value
+    TOLERANCE = 1e-9
+    MAX_ITERATIONS = 100
+    # number of times the range is grown when looking for a bracket
+    # around current value of the variable
+    MAX_EXPAND = 32
+
+    def __init__(self, store=ParametersStore):
+        """Initialize solver
+
+        :param store ParametersStore: store providing parameters and
+                                      evaluators
+        """
+        self.store = store
+        # dict of (target, variable): inverse function, the function
+        # is called with dict of current parameter values and
+        # requested value of target, returns value of variable
+        self.inverses = {}
+
+        for position, distance in POSITIONS.items():
+            targets = [
+                ('parallax_%s_percent' % position, None),
+                ('parallax_%s_mm' % position, self._parallax_mm_to_percent),
+                ('perceived_position_%s_percent' % position,
+                 self._perceived_percent_to_percent),
+                ('perceived_position_%s_m' % position,
+                 self._perceived_m_to_percent),
+            ]
+            for target, to_percent in targets:
+                self.inverses[(target, 'baseline_mm')] = \
+                    self._make_inverse(self._baseline, to_percent, distance)
+                self.inverses[(target, 'distance_screen_m')] = \
+                    self._make_inverse(self._distance_screen, to_percent,
+                                       distance)
+
+    @staticmethod
+    def _make_inverse(solve, to_percent, distance):
+        """Compose conversion of target value to parallax percent with
+        solving for the variable"""
+        def inverse(values, value):
+            if to_percent is not None:
+                value = to_percent(values, value)
+            return solve(values, value, values[distance])
+        return inverse
+
+    @staticmethod
+    def _parallax_mm_to_percent(values, parallax_mm):
+        return parallax_mm / (10 * values['screen_width_m'])
+
+    @staticmethod
+    def _perceived_percent_to_percent(values, perceived_percent):
+        ipd = values['interpupillary_distance_mm']
+        parallax_mm = ipd - 100 * ipd / perceived_percent
+        return ParameterSolver._parallax_mm_to_percent(values, parallax_mm)
+
+    @staticmethod
+    def _perceived_m_to_percent(values, perceived_m):
+        perceived_percent = 100 * perceived_m / values['screen_distance_m']
+        return ParameterSolver._perceived_percent_to_percent(values,
+                                                             perceived_percent)
+
+    @staticmethod
+    def _baseline(values, parallax_percent, distance):
+        """Invert ParallaxScaleCalc and ParallaxPercentHelperCalc for
+        baseline_mm"""
+        distance_screen_m = values['distance_screen_m']
+        scale = parallax_percent / (1 / (1000 * distance_screen_m) -
+                                    1 / (1000 * distance))
+        return scale * values['frame_width_mm'] / (100 * values['focal_length_mm'])
+
+    @staticmethod
+    def _distance_screen(values, parallax_percent, distance):
+        """Invert ParallaxPercentHelperCalc for distance_screen_m"""
+        return 1 / (1000 * (parallax_percent / values['parallax_scale'] +
+                            1 / (1000 * distance)))
+
+    def _prepare(self, target, variable):
+        """Take a snapshot of parameter values and collect evaluators
+        needed to evaluate `target` from `variable`"""
+        store = self.store
+        with store.lock:
+            store.evaluate_dirty()
+
+            target_desc = store._find_param(target)
+            variable_desc = store._find_param(variable)
+            if target not in store.EVALUATORS:
+                raise SolverRequestError('parameter %s is not evaluated' % (target))
+
+            # parameters that target is evaluated from
+            required = set()
+            pending = [target]
+            while pending:
+                bound = store.EVALUATORS.get(pending.pop())
+                if bound is None:
+                    continue
+                for arg in bound.args:
+                    if arg.name not in required:
+                        required.add(arg.name)
+                        pending.append(arg.name)
+
+            if variable not in required:
+                raise SolverRequestError('parameter %s does not depend on %s' % (
+                    target, variable))
+
+            plan = [(pdesc, store.EVALUATORS[pdesc.name])
+                    for pdesc in store.EVALUATION_PLAN[variable]
+                    if pdesc.name in required or pdesc is target_desc]
+
+            values = dict((name, pdesc.value)
+                          for name, pdesc in store.PARAMETERS.items())
+
+        return values, variable_desc, plan
+
+    @staticmethod
+    def _evaluate(values, variable, x, target, plan):
+        """Evaluate `target` with `variable` set to `x`. Raises
+        ArithmeticError if any of evaluators fails."""
+        values = dict(values)
+        values[variable] = x
+        for pdesc, bound in plan:
+            args = [values[arg.name] for arg in bound.args]
+            values[pdesc.name] = pdesc.value_type(bound.evaluator(*args))
+        return values[target]
+
+    def _bracket(self, func, start):
+        """Find a range around `start` where func changes sign"""
+        low, high = start / 2.0, start * 2.0
+        if start == 0:
+            low, high = -1.0, 1.0
+        elif start < 0:
+            low, high = high, low
+
+        for _ in range(self.MAX_EXPAND):
+            try:
+                if (func(low) > 0) != (func(high) > 0):
+                    return low, high
+            except ArithmeticError:
+                pass
+            low, high = low - (high - low), high + (high - low)
+
+        raise ValueError('solution not found around %r' % (start))
+
+    def solve(self, target, value, variable, low=None, high=None):
+        """Find value of parameter `variable` for which parameter `target`
+        evaluates to `value`. If `low` or `high` are given, the
+        solution is searched for in the range [low, high], a closed
+        form solution is used otherwise, if available. Raises KeyError
+        if parameters are not known, SolverRequestError if `target` does
+        not depend on `variable`, ValueError if solution was not found.
+
+        :param target str: name of evaluated parameter
+        :param value float: requested value of `target`
+        :param variable str: name of parameter to solve for
+        :param low float: lower end of range of `variable`
+        :param high float: upper end of range of `variable`
+        :rtype: dict
+        :return: dict with 'value' of the variable, 'target_value' that
+                 target evaluates to, 'method' and number of 'iterations'
+        """
+        if (low is None) != (high is None):
+            raise SolverRequestError('both ends of range are required')
+
+        values, variable_desc, plan = self._prepare(target, variable)
+        value = float(value)
+
+        def evaluate(x):
+            return self._evaluate(values, variable, variable_desc.value_type(x),
+                                  target, plan)
+
+        inverse = self.inverses.get((target, variable))
+        if inverse is not None and low is None:
+            try:
+                x = inverse(values, value)
+                return {
+                    "value": x,
+                    "target_value": evaluate(x),
+                    "method": self.METHOD_CLOSED_FORM,
+                    "iterations": 0,
+                }
+            except ArithmeticError:
+                _log.debug('closed form solution of %s for %s failed',
+                           variable, target)
+
+        tolerance = self.TOLERANCE * max(1.0, abs(value))
+
+        def func(x):
+            return evaluate(x) - value
+
+        try:
+            if low is None:
+                low, high = self._bracket(func, float(values[variable]))
+            x, iterations = find_root(func, float(low), float(high),
+                                      tolerance, self.MAX_ITERATIONS)
+            return {
+                "value": x,
+                "target_value": evaluate(x),
+                "method": self.METHOD_ROOT_FINDER,
+                "iterations": iterations,
+            }
+        except ArithmeticError as err:
+            raise ValueError('failed to evaluate %s: %s' % (target, err))
@@ -27,50 +27,806 @@
 #
 # - synchronization - store accessed from multiple threads
 #   simultaneously
-# - move parameters definition to external file or config
 
 from __future__ import absolute_import
 
-from ros3ddevcontroller.param.parameter import Parameter
+from ros3ddevcontroller.param.parameter import Parameter, HiddenParameter
+from ros3ddevcontroller.param.history import ParameterHistory
 from ros3ddevcontroller.web.codec import ParameterCodec
-from ros3ddevcontroller.param.sysparams import CAMERA_PARAMETERS, SERVO_PARAMETERS
-from threading import RLock
+from ros3ddevcontroller.param.sysparams import CAMERA_PARAMETERS, SERVO_PARAMETERS, \
+    SCREEN_PARAMETERS
+from threading import RLock, Lock, Condition, Thread
+from collections import deque, OrderedDict
+import inspect
+import heapq
+import time
+import copy
 import logging
 
 
 _log = logging.getLogger(__name__)
 
+class QueuedListener(object):
+    """Change listener wrapper that delivers notifications to the
+    handler from a separate dispatcher thread. Notifications are
+    queued in a bounded queue, once the queue is full the oldest
+    (OVERFLOW_DROP_OLDEST) or the newest (OVERFLOW_DROP_NEWEST)
+    notification is dropped.
+
+    """
+
+    OVERFLOW_DROP_OLDEST = 'drop-oldest'
+    OVERFLOW_DROP_NEWEST = 'drop-newest'
+
+    DEFAULT_MAX_QUEUE = 1000
+
+    def __init__(self, handler, max_queue=DEFAULT_MAX_QUEUE,
+                 overflow=OVERFLOW_DROP_OLDEST):
+        """Initialize a queued listener and start dispatcher thread
+
+        :param handler: callable to deliver notifications to
+        :param max_queue int: maximum number of queued notifications
+        :param overflow str: overflow policy
+        """
+        assert overflow in [self.OVERFLOW_DROP_OLDEST,
+                            self.OVERFLOW_DROP_NEWEST]
+
+        self.handler = handler
+        self.max_queue = max_queue
+        self.overflow = overflow
+
+        self.queue = deque()
+        self.cond = Condition()
+        self.running = True
+        # set while a notification taken off the queue is being
+        # delivered
+        self.busy = False
+
+        # metrics
+        self.max_depth = 0
+        self.delivered = 0
+        self.dropped = 0
+
+        self.thread = Thread(target=self._dispatch,
+                             name='listener-%s' % (handler_name(handler)))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __call__(self, *args, **keywargs):
+        """Queue a notification"""
+        with self.cond:
+            if len(self.queue) >= self.max_queue:
+                self.dropped += 1
+                if self.overflow == self.OVERFLOW_DROP_NEWEST:
+                    _log.warning('queue of %s full, dropping notification',
+                                 handler_name(self.handler))
+                    return
+                _log.warning('queue of %s full, dropping oldest notification',
+                             handler_name(self.handler))
+                self.queue.popleft()
+
+            self.queue.append((args, keywargs))
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.cond.notify()
+
+    def _dispatch(self):
+        """Dispatcher thread loop"""
+        while True:
+            with self.cond:
+                while self.running and not self.queue:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                args, keywargs = self.queue.popleft()
+                self.busy = True
+
+            try:
+                self.handler(*args, **keywargs)
+            except Exception:
+                _log.exception('listener %s failed', handler_name(self.handler))
+
+            with self.cond:
+                self.delivered += 1
+                self.busy = False
+                self.cond.notify_all()
+
+    def wait_empty(self, timeout=None):
+        """Wait until all queued notifications have been delivered
+
+        :param timeout float: timeout in seconds
+        :rtype: bool
+        :return: True if all notifications have been delivered
+        """
+        with self.cond:
+            deadline = None if timeout is None else time.time() + timeout
+            while (self.queue or self.busy) and self.running:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            return not (self.queue or self.busy)
+
+    def stop(self):
+        """Stop dispatcher thread, pending notifications are discarded"""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def stats(self):
+        """Obtain queue metrics
+
+        :rtype: dict
+        """
+        with self.cond:
+            return {
+                'depth': len(self.queue),
+                'max_depth': self.max_depth,
+                'max_queue': self.max_queue,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+            }
+
+
+class RateLimitedListener(object):
+    """Change listener wrapper that limits the rate of notifications
+    delivered for each parameter. Notifications arriving faster than
+    the limit are coalesced, only the latest one is kept and
+    delivered once the limit allows, so the final value of a parameter
+    is always delivered. The latest notification is the most recent
+    change, as ParametersStoreListener delivers notifications in order
+    of changes.
+
+    """
+
+    def __init__(self, handler, rate, rates=None):
+        """Initialize rate limited listener
+
+        :param handler: callable to deliver notifications to
+        :param rate float: maximum number of notifications per second for
+                           each parameter, 0 for no limit
+        :param rates dict: dict of parameter_name: rate, overrides `rate`
+                           for given parameters
+        """
+        self.handler = handler
+        self.rate = rate
+        self.rates = dict(rates or {})
+
+        self.cond = Condition()
+        self.running = True
+        # dict of parameter_name: time of last delivery
+        self.last = {}
+        # dict of parameter_name: (param, args, keywargs), latest
+        # notification awaiting delivery
+        self.pending = {}
+        # heap of (due_time, parameter_name) of scheduled deliveries,
+        # served by a single scheduler thread started on first use
+        self.due = []
+        self.scheduled = set()
+        self.thread = None
+
+        # metrics
+        self.forwarded = 0
+        self.coalesced = 0
+
+    def _interval(self, name):
+        """Minimum interval between notifications of parameter `name`"""
+        rate = self.rates.get(name, self.rate)
+        if not rate:
+            return 0.0
+        return 1.0 / rate
+
+    def __call__(self, param, *args, **keywargs):
+        """Deliver notification or postpone it if rate limit was reached"""
+        name = param.name
+        with self.cond:
+            if name in self.scheduled:
+                # delivery is already scheduled, latest notification wins
+                if name in self.pending:
+                    self.coalesced += 1
+                self.pending[name] = (param, args, keywargs)
+                return
+
+            now = time.time()
+            due = self.last.get(name, 0) + self._interval(name)
+            if due > now:
+                self.pending[name] = (param, args, keywargs)
+                self._schedule(due, name)
+                return
+
+            self.last[name] = now
+            self.forwarded += 1
+
+        self.handler(param, *args, **keywargs)
+
+    def _schedule(self, due, name):
+        """Schedule delivery of pending notification of parameter `name` at
+        time `due`, must be called with self.cond held"""
+        if self.thread is None:
+            self.thread = Thread(target=self._dispatch,
+                                 name='rate-limit-%s' % (handler_name(self.handler)))
+            self.thread.daemon = True
+            self.thread.start()
+
+        heapq.heappush(self.due, (due, name))
+        self.scheduled.add(name)
+        self.cond.notify()
+
+    def _dispatch(self):
+        """Scheduler thread loop, delivers pending notifications once due"""
+        while True:
+            with self.cond:
+                while self.running:
+                    if self.due:
+                        remaining = self.due[0][0] - time.time()
+                        if remaining <= 0:
+                            break
+                    else:
+                        remaining = None
+                    self.cond.wait(remaining)
+                if not self.running:
+                    return
+
+                _, name = heapq.heappop(self.due)
+                self.scheduled.discard(name)
+                pending = self.pending.pop(name, None)
+                if pending is None:
+                    continue
+                self.last[name] = time.time()
+                self.forwarded += 1
+
+            param, args, keywargs = pending
+            try:
+                self.handler(param, *args, **keywargs)
+            except Exception:
+                _log.exception('listener %s failed', handler_name(self.handler))
+
+    def stop(self):
+        """Stop scheduler thread, pending notifications are discarded"""
+        with self.cond:
+            self.running = False
+            self.due = []
+            self.scheduled = set()
+            self.pending = {}
+            self.cond.notify_all()
+
+    def stats(self):
+        """Obtain rate limiter metrics
+
+        :rtype: dict
+        """
+        with self.cond:
+            return {
+                'rate': self.rate,
+                'pending': len(self.pending),
+                'forwarded': self.forwarded,
+                'coalesced': self.coalesced,
+            }
+
+
+def unwrap_handler(handler):
+    """Obtain handler wrapped in QueuedListener or RateLimitedListener"""
+    while isinstance(handler, (QueuedListener, RateLimitedListener)):
+        handler = handler.handler
+    return handler
+
+
+def handler_name(handler):
+    """Obtain a readable name of change listener `handler`"""
+    name = getattr(handler, '__name__', None)
+    if name is None:
+        return repr(handler)
+
+    owner = getattr(handler, '__self__', None)
+    if owner is not None:
+        return '%s.%s' % (type(owner).__name__, name)
+    return name
+
+
 class ParametersStoreListener(object):
-    """Class for notifying other modules about any changes in parameters"""
+    """Class for notifying other modules about any changes in parameters.
+    Handlers are called synchronously by default, handlers registered
+    with `queued` enabled are called from a dispatcher thread.
+
+    Notifications are posted while the store lock is held, so that they
+    are queued in the order changes were made, and delivered by
+    deliver() once the lock is released. Delivery is serialized,
+    notifications posted by other threads while one is delivering
+    are delivered by that thread, in order.
+
+    Handlers can subscribe to changes of selected parameters only, by
+    parameter name, name prefix or parameter group. Handlers
+    interested in given parameter are looked up in an index built on
+    first change of the parameter, hence fire() does not need to match
+    subscriptions of every handler on each change.
+
+    """
 
     def __init__(self):
         self.__handlers = []
-
-    def add(self, handler):
-        """Register a handler (only if not registered before)"""
-        if handler not in self.__handlers:
-            _log.debug('registering %r handler', handler)
-            self.__handlers.append(handler)
-        else:
+        # dict of registered_handler: (names, prefixes, groups), only
+        # for handlers with a subscription filter
+        self.__filters = {}
+        # dict of group_name: set(parameter_name)
+        self.__groups = {}
+        # dict of parameter_name: list(registered_handler), handlers
+        # interested in changes of given parameter
+        self.__index = {}
+        # notifications awaiting delivery, in order of changes
+        self.__pending = deque()
+        # held by the thread delivering pending notifications
+        self.__delivering = Lock()
+
+    def _find(self, handler):
+        """Find registered handler or its queued wrapper, returns None if
+        handler is not registered"""
+        for registered in self.__handlers:
+            if registered == handler or unwrap_handler(registered) == handler:
+                return registered
+        return None
+
+    def add(self, handler, names=None, prefixes=None, groups=None,
+            queued=False, max_queue=QueuedListener.DEFAULT_MAX_QUEUE,
+            overflow=QueuedListener.OVERFLOW_DROP_OLDEST,
+            rate=None, rates=None):
+        """Register a handler (only if not registered before). If any of
+        `names`, `prefixes` or `groups` is provided, the handler is
+        called only for parameters matching at least one of them,
+        otherwise it is called for all parameters.
+
+        :param handler: callable
+        :param names list(str): parameter names
+        :param prefixes list(str): parameter name prefixes
+        :param groups list(str): parameter groups, see ParametersStore.GROUPS
+        :param queued bool: deliver notifications from a dispatcher thread
+        :param max_queue int: maximum number of queued notifications
+        :param overflow str: queue overflow policy, see QueuedListener
+        :param rate float: maximum number of notifications per second for
+                           each parameter, see RateLimitedListener
+        :param rates dict: dict of parameter_name: rate, overriding `rate`
+        """
+        if self._find(handler) is not None:
             _log.warning('handler %r already registered', handler)
+            return
+
+        _log.debug('registering %r handler', handler)
+        if queued:
+            handler = QueuedListener(handler, max_queue=max_queue,
+                                     overflow=overflow)
+        if rate or rates:
+            handler = RateLimitedListener(handler, rate, rates=rates)
+        if names or prefixes or groups:
+            self.__filters[handler] = (frozenset(names or []),
+                                       tuple(prefixes or []),
+                                       frozenset(groups or []))
+        self.__handlers.append(handler)
+        self.__index = {}
 
     def remove(self, handler):
         """Remove a handler"""
-        try:
-            self.__handlers.remove(handler)
-        except ValueError:
+        registered = self._find(handler)
+        if registered is None:
             _log.warning('handler %r was not registered', handler)
+            return
+
+        self.__handlers.remove(registered)
+        self.__filters.pop(registered, None)
+        self.__index = {}
+        while isinstance(registered, (QueuedListener, RateLimitedListener)):
+            registered.stop()
+            registered = registered.handler
+
+    def set_groups(self, groups):
+        """Set parameter groups that handlers can subscribe to
+
+        :param groups dict: dict of group_name: list of parameter names
+        """
+        self.__groups = dict((group, frozenset(names))
+                             for group, names in groups.items())
+        self.__index = {}
+
+    def _matches(self, handler, name):
+        """Check if `handler` is interested in changes of parameter `name`"""
+        filters = self.__filters.get(handler)
+        if filters is None:
+            return True
+
+        names, prefixes, groups = filters
+        if name in names:
+            return True
+        if prefixes and name.startswith(prefixes):
+            return True
+        for group in groups:
+            if name in self.__groups.get(group, ()):
+                return True
+        return False
+
+    def handlers(self, name):
+        """Obtain a list of handlers interested in changes of parameter
+        `name`
 
-    def fire(self, *args, **keywargs):
-        """Trigger all handlers, *args and **keywargs are passed directly to
-        handlers"""
-        for handler in self.__handlers:
+        :param name str: parameter name
+        :rtype: list
+        """
+        index = self.__index
+        handlers = index.get(name)
+        if handlers is None:
+            handlers = [handler for handler in self.__handlers
+                        if self._matches(handler, name)]
+            index[name] = handlers
+        return handlers
+
+    def fire(self, param, *args, **keywargs):
+        """Trigger all handlers interested in changes of `param`. `param`,
+        *args and **keywargs are passed directly to handlers"""
+        for handler in self.handlers(param.name):
             _log.debug('callling %r', handler)
-            handler(*args, **keywargs)
+            handler(param, *args, **keywargs)
+
+    def post(self, param, *args, **keywargs):
+        """Queue notification of change of `param` for delivery by
+        deliver(), to be called with the store lock held"""
+        self.__pending.append((param, args, keywargs))
+
+    def deliver(self):
+        """Deliver posted notifications, to be called with the store lock
+        released. If another thread is already delivering, notifications
+        are left for it to deliver, so that handlers are called in the
+        order notifications were posted."""
+        while self.__pending:
+            if not self.__delivering.acquire(False):
+                return
+            try:
+                while self.__pending:
+                    param, args, keywargs = self.__pending.popleft()
+                    self.fire(param, *args, **keywargs)
+            finally:
+                self.__delivering.release()
+
+    def stats(self):
+        """Obtain queue and rate limiter metrics of handlers registered as
+        queued or rate limited
+
+        :rtype: dict
+        :return: dict of handler_name: metrics
+        """
+        out = {}
+        for handler in list(self.__handlers):
+            metrics = {}
+            while isinstance(handler, (QueuedListener, RateLimitedListener)):
+                metrics.update(handler.stats())
+                handler = handler.handler
+            if metrics:
+                out[handler_name(handler)] = metrics
+        return out
+
+
+class FailedValue(object):
+    """Stand-in for value of a hidden parameter that failed to evaluate,
+    passed to evaluators of parameters depending on it. Arithmetic
+    with or comparing the value raises ArithmeticError, hence a
+    dependant fails to evaluate only if its result actually requires
+    the value, same as if the value was calculated by its evaluator.
+
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _fail(self, *args):
+        raise ArithmeticError('parameter %s failed to evaluate' % (self.name))
+
+    @staticmethod
+    def check(value):
+        """Raise ArithmeticError if `value`, a result of evaluation, is a
+        FailedValue passed through by the evaluator
+
+        :return: value
+        """
+        if isinstance(value, FailedValue):
+            value._fail()
+        return value
+
+    __add__ = __radd__ = __sub__ = __rsub__ = _fail
+    __mul__ = __rmul__ = __div__ = __rdiv__ = _fail
+    __truediv__ = __rtruediv__ = __floordiv__ = __rfloordiv__ = _fail
+    __mod__ = __rmod__ = __pow__ = __rpow__ = _fail
+    __neg__ = __pos__ = __abs__ = _fail
+    __lt__ = __le__ = __gt__ = __ge__ = _fail
+    __float__ = __int__ = __long__ = _fail
+
+    def __repr__(self):
+        return '<failed %s>' % (self.name)
+
+
+class BoundEvaluator(object):
+    """Evaluator instance bound to descriptors of parameters it
+    requires. The values of required parameters are passed to the
+    evaluator positionally, in order of evaluator's __call__()
+    arguments.
+
+    """
+
+    def __init__(self, param, evaluator, args):
+        """Initialize a bound evaluator
+
+        :param param Parameter: evaluated parameter descriptor
+        :param evaluator Evaluator: evaluator instance
+        :param args list(Parameter): descriptors of evaluator arguments
+        """
+        self.param = param
+        self.evaluator = evaluator
+        self.args = args
+
+        self.memo = None
+        if evaluator.MEMO_SIZE:
+            self.memo = EvaluatorMemo(evaluator.MEMO_SIZE)
+
+    @classmethod
+    def bind(cls, param, parameters):
+        """Create an evaluator for `param` and bind it to parameters listed
+        in REQUIRES of the evaluator. Raises RuntimeError if
+        evaluator's arguments do not match REQUIRES.
+
+        :param param Parameter: evaluated parameter descriptor
+        :param parameters dict: dict of parameter_name: parameter_desc
+        :rtype: BoundEvaluator
+        """
+        evaluator = param.evaluator()
+
+        # skip self
+        arg_names = inspect.getargspec(evaluator.__call__).args[1:]
+        if sorted(arg_names) != sorted(param.evaluator.REQUIRES):
+            raise RuntimeError('arguments of evaluator for parameter %s do not match its requirements' \
+                               % (param.name))
+
+        return cls(param, evaluator,
+                   [parameters[name] for name in arg_names])
+
+    def arguments(self, failed=None):
+        """Obtain current values of evaluator arguments
+
+        :param failed set(str): names of required parameters that failed
+                                to evaluate
+        :rtype: dict
+        :return: dict of parameter_name: value
+        """
+        failed = failed or ()
+        return dict((p.name, FailedValue(p.name) if p.name in failed else p.value)
+                    for p in self.args)
+
+    def __call__(self, failed=None):
+        """Evaluate parameter using current values of required parameters
+
+        :param failed set(str): names of required parameters that failed
+                                to evaluate, passed as FailedValue
+        :return: new value of parameter
+        """
+        if failed:
+            return FailedValue.check(
+                self.evaluator(*[FailedValue(p.name) if p.name in failed else p.value
+                                 for p in self.args]))
+
+        args = [p.value for p in self.args]
+        if self.memo is None:
+            return self.evaluator(*args)
+
+        key = tuple(args)
+        value = self.memo.get(key, EvaluatorMemo.MISSING)
+        if value is EvaluatorMemo.MISSING:
+            value = self.evaluator(*args)
+            self.memo.put(key, value)
+        return value
+
+
+class EvaluatorMemo(object):
+    """Bounded cache of evaluator results, keyed on a tuple of argument
+    values. Least recently used results are evicted first.
+
+    """
+
+    # marker of missing result
+    MISSING = object()
+
+    def __init__(self, size):
+        """Initialize the cache
+
+        :param size int: maximum number of cached results
+        """
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Obtain cached result, `default` if not present"""
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        # reinsert as most recently used
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Cache a result"""
+        if len(self.entries) >= self.size:
+            self.entries.popitem(last=False)
+        self.entries[key] = value
+
+
+class EvaluatorStats(object):
+    """Registry of evaluator call statistics. For each evaluator class,
+    the number of calls, number of failed calls, cumulative and
+    maximum evaluation time are recorded.
+
+    """
+
+    # indices of counters in entries of `stats`
+    CALLS = 0
+    ERRORS = 1
+    TOTAL_TIME = 2
+    MAX_TIME = 3
+
+    def __init__(self):
+        # dict of evaluator_name: [calls, errors, total_time, max_time]
+        self.stats = {}
+
+    def record(self, name, duration, failed=False):
+        """Record a single evaluator call
+
+        :param name str: evaluator name
+        :param duration float: evaluation time in seconds
+        :param failed bool: True if evaluation has failed
+        """
+        entry = self.stats.get(name)
+        if entry is None:
+            entry = self.stats[name] = [0, 0, 0.0, 0.0]
+
+        entry[self.CALLS] += 1
+        if failed:
+            entry[self.ERRORS] += 1
+        entry[self.TOTAL_TIME] += duration
+        if duration > entry[self.MAX_TIME]:
+            entry[self.MAX_TIME] = duration
+
+    def reset(self):
+        """Clear all statistics"""
+        self.stats = {}
+
+    def as_dict(self):
+        """Repack statistics to JSON serializable dictionary, times are
+        given in milliseconds
+
+        :rtype: dict
+        """
+        out = {}
+        for name, entry in self.stats.items():
+            calls = entry[self.CALLS]
+            out[name] = {
+                'calls': calls,
+                'errors': entry[self.ERRORS],
+                'total_ms': entry[self.TOTAL_TIME] * 1000.0,
+                'max_ms': entry[self.MAX_TIME] * 1000.0,
+                'avg_ms': entry[self.TOTAL_TIME] * 1000.0 / calls,
+            }
+        return out
+
+
+class ParametersView(object):
+    """Consistent view of all parameters, as of given revision of the
+    store. The view holds copies of parameter descriptors and is never
+    modified once published, hence can be read without acquiring the
+    store lock.
+
+    """
+
+    def __init__(self, revision, parameters, revisions, fragments=None):
+        """Initialize a view
+
+        :param revision int: store revision
+        :param parameters dict: dict of parameter_name: Parameter
+        :param revisions dict: dict of parameter_name: revision of last modification
+        :param fragments dict: dict of parameter_name: JSON encoded
+                               parameter, taken over from previous view
+        """
+        self.revision = revision
+        self.parameters = parameters
+        self.revisions = revisions
+        # fragments are encoded on demand, and passed on to the next
+        # view for parameters that were not modified
+        self.fragments = fragments if fragments is not None else {}
+        self.encoded = None
+
+    def get(self, name):
+        """Get a parameter, raises KeyError if parameter is not present"""
+        return self.parameters[name]
+
+    def get_parameters(self):
+        """Obtain a list of all parameters
+
+        :rtype: list(Parameter)
+        """
+        return list(self.parameters.values())
+
+    def changed_since(self, revision):
+        """Obtain a list of parameters modified after given revision
+
+        :param revision int: store revision
+        :rtype: list(Parameter)
+        """
+        return [pdesc for pname, pdesc in self.parameters.items()
+                if self.revisions[pname] > revision]
+
+    def as_dict(self):
+        """Repack parameter descriptors do dictionary format."""
+        params = {}
+        for pname, pp in self.parameters.items():
+            params[pname] = ParameterCodec.parameter_to_dict(pp)
+        return params
+
+    def _encode(self, names):
+        """Encode parameters of given names to JSON object, reusing
+        fragments encoded earlier"""
+        fragments = self.fragments
+        parts = []
+        for pname in names:
+            fragment = fragments.get(pname)
+            if fragment is None:
+                fragment = ParameterCodec.parameter_to_json(self.parameters[pname])
+                fragments[pname] = fragment
+            parts.append(fragment)
+        return '{' + ', '.join(parts) + '}'
+
+    def as_json(self):
+        """Obtain JSON encoded dictionary format of parameters. Only
+        parameters modified since previous views were encoded are
+        encoded, others are reused.
+
+        :rtype: str
+        """
+        if self.encoded is None:
+            self.encoded = self._encode(self.parameters.keys())
+        return self.encoded
+
+    def changed_as_json(self, revision):
+        """Obtain JSON encoded dictionary format of parameters modified
+        after given revision, see as_json()
+
+        :param revision int: store revision
+        :rtype: str
+        """
+        return self._encode([pname for pname, prev in self.revisions.items()
+                             if prev > revision])
+
+
+class storemethod(object):
+    """Decorator for ParametersStore methods. A method accessed through
+    the class is bound to the class, which acts as the default store,
+    while a method accessed through an instance is bound to the
+    instance. In both cases the store is passed as `cls` argument.
+
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, objtype=None):
+        store = obj if obj is not None else objtype
+        return self.func.__get__(store, type(store))
 
 
 class ParametersStore(object):
-    """System parameters store"""
+    """System parameters store. The class itself is the default store,
+    with its state kept in class attributes, and all methods can be
+    called directly on the class. Instances of the class are separate
+    stores, with their own parameters, listeners and lock, sharing
+    only configuration defaults with the class.
+
+    """
 
     # dict of parameter_name: parameter_desc, for quick lookup by
     # parameter name
@@ -83,31 +839,142 @@ class ParametersStore(object):
     # 'focus_distance_m'
     DEPENDENCIES = {}
 
+    # dict of parameter_name: list(parameter_desc), the list contains
+    # descriptors of all parameters that need to be reevaluated when
+    # given parameter changes, including indirect dependencies. Each
+    # parameter is listed once, after all parameters it depends on,
+    # so that evaluating the list in order yields consistent values
+    EVALUATION_PLAN = {}
+
+    # dict of parameter_name: position of parameter in topological
+    # order, used for merging evaluation plans of multiple parameters
+    EVALUATION_RANK = {}
+
+    # dict of parameter_name: BoundEvaluator, only for parameters
+    # that have an evaluator
+    EVALUATORS = {}
+
+    # when enabled, setting a parameter to its current value does not
+    # trigger evaluation nor change notification
+    SKIP_UNCHANGED = True
+
+    # float values differing by no more than FLOAT_EPSILON are
+    # considered equal when checking whether a value has changed
+    FLOAT_EPSILON = 1e-9
+
+    # dict of parameter_name: number of updates that were skipped
+    # because value has not changed
+    SUPPRESSED_UPDATES = {}
+
+    # names of parameters with an evaluator that have not been
+    # evaluated since being loaded, hence their values may not match
+    # their inputs; setting a parameter they depend on is never
+    # skipped as unchanged
+    UNEVALUATED = set()
+
+    # when enabled, parameters that depend on a modified parameter
+    # are only marked as dirty, and are evaluated when read
+    LAZY_EVALUATION = False
+
+    # names of parameters that are always evaluated when any of
+    # parameters they depend on changes, regardless of
+    # LAZY_EVALUATION
+    EAGER_PARAMETERS = set()
+
+    # names of parameters that need to be evaluated before their value
+    # is read
+    DIRTY = set()
+
+    # names of hidden parameters that failed to evaluate
+    FAILED_HIDDEN = set()
+
+    # call counts and timings of evaluators
+    EVALUATOR_STATS = EvaluatorStats()
+
+    # number of samples kept in history of each numeric parameter, 0
+    # disables history
+    HISTORY_SIZE = 0
+
+    # types of parameters that history is kept for
+    HISTORY_TYPES = (int, float, bool)
+
+    # dict of parameter_name: ParameterHistory
+    HISTORY = {}
+
+    # most recent ParametersView, replaced with a new view after each
+    # update of parameters, reading it does not require a lock. Store
+    # revision is incremented with each new view
+    VIEW = ParametersView(0, {}, {})
+
+    # dict of parameter_name: parameter_desc, parameters modified
+    # since last view was published
+    MODIFIED = {}
+
     # Use recursive lock, this allows for internal helpers like
     # _find_param() to have both a thin lockless wrapping or a
-    # complete wrapping like get()/set(). Also, this allows for
-    # parameters to be modified from change_listeners callback
+    # complete wrapping like get()/set()
     lock = RLock()
+    # change listeners are called after the lock is released, with
+    # copies of parameters from the published view
     change_listeners = ParametersStoreListener()
 
-    @staticmethod
-    def is_servo_parameter(name):
+    # names of parameters applied to servo and camera respectively,
+    # replaced when parameters are loaded from schema file
+    SERVO_PARAMETERS = SERVO_PARAMETERS
+    CAMERA_PARAMETERS = CAMERA_PARAMETERS
+    # names of parameters describing screen and spectator
+    SCREEN_PARAMETERS = SCREEN_PARAMETERS
+
+    # groups of parameters that change listeners can subscribe to
+    GROUP_SERVO = 'servo'
+    GROUP_CAMERA = 'camera'
+    GROUP_SCREEN = 'screen'
+    GROUP_DERIVED = 'derived'
+    GROUPS = [GROUP_SERVO, GROUP_CAMERA, GROUP_SCREEN, GROUP_DERIVED]
+
+    # dict of group_name: list of names of parameters in the group,
+    # rebuilt whenever parameters are loaded or cleared, for quick
+    # selection of parameters by group
+    GROUP_INDEX = {}
+
+    def __init__(self):
+        """Create a new store, independent of the default one"""
+        self.PARAMETERS = {}
+        self.DEPENDENCIES = {}
+        self.EVALUATION_PLAN = {}
+        self.EVALUATION_RANK = {}
+        self.EVALUATORS = {}
+        self.SUPPRESSED_UPDATES = {}
+        self.UNEVALUATED = set()
+        self.EAGER_PARAMETERS = set(ParametersStore.EAGER_PARAMETERS)
+        self.DIRTY = set()
+        self.FAILED_HIDDEN = set()
+        self.EVALUATOR_STATS = EvaluatorStats()
+        self.HISTORY = {}
+        self.VIEW = ParametersView(0, {}, {})
+        self.MODIFIED = {}
+        self.lock = RLock()
+        self.change_listeners = ParametersStoreListener()
+        self.GROUP_INDEX = {}
+
+    @storemethod
+    def is_servo_parameter(cls, name):
         """Test if parameter with name `name` is applicable to servo
 
         :param name str: parameter name
         :return: True if is a servo parameter"""
-        return name in SERVO_PARAMETERS
+        return name in cls.SERVO_PARAMETERS
 
-    @staticmethod
-    def is_camera_parameter(name):
+    @storemethod
+    def is_camera_parameter(cls, name):
         """Test if parameter with name `name` is applicable to camera
 
         :param name str: parameter name
         :return: True if is a camera parameter
         """
-        return name in CAMERA_PARAMETERS
+        return name in cls.CAMERA_PARAMETERS
 
-    @classmethod
+    @storemethod
     def is_read_only(cls, name):
         """Test if parameter with given `name` is read only
 
@@ -116,11 +983,16 @@ class ParametersStore(object):
         pdesc = cls.get(name)
         return pdesc.is_read_only()
 
-    @classmethod
-    def load_parameters(cls, params):
-        """Load parameters from list
+    @storemethod
+    def load_parameters(cls, params, plan=None):
+        """Load parameters from list. If `plan` is provided, dependencies
+        and evaluation order are taken from it instead of being
+        computed and validated. The plan must describe all parameters
+        in the store, hence can only be used when loading into an
+        empty store.
 
         :param list params: list of Parameter objects
+        :param dict plan: plan obtained with get_plan()
         """
         with cls.lock:
             # 1st pass, load any parameters
@@ -130,6 +1002,131 @@ class ParametersStore(object):
                 cls.PARAMETERS[p.name] = p
                 cls.DEPENDENCIES[p.name] = []
 
+            if plan and not cls._plan_matches(plan, params):
+                _log.warning('evaluation plan does not match evaluators, recompiling')
+                plan = None
+
+            if plan:
+                cls._link_plan(plan)
+            else:
+                cls._compile_plan(params)
+
+            cls.UNEVALUATED.update(p.name for p in params
+                                   if p.name in cls.EVALUATORS)
+
+            # hidden parameters are evaluated upfront, so that their
+            # dependants can be evaluated right away
+            hidden = [p for p in params
+                      if isinstance(p, HiddenParameter) and p.evaluator]
+            hidden.sort(key=lambda p: cls.EVALUATION_RANK[p.name])
+            for p in hidden:
+                cls.evaluate_single_param(p)
+
+            if cls.HISTORY_SIZE:
+                cls._setup_history(params)
+
+            for p in params:
+                cls.MODIFIED[p.name] = p
+            cls._publish()
+
+            cls._index_groups()
+
+    @storemethod
+    def clone(cls):
+        """Create an independent store holding copies of current
+        parameters, with the same evaluation plan and configuration.
+        Change listeners and history are not carried over, hence the
+        clone can be freely modified, for instance to try out values
+        of parameters without affecting the rig.
+
+        :rtype: ParametersStore
+        :return: new store
+        """
+        with cls.lock:
+            cls.evaluate_dirty()
+
+            store = ParametersStore()
+            store.SERVO_PARAMETERS = list(cls.SERVO_PARAMETERS)
+            store.CAMERA_PARAMETERS = list(cls.CAMERA_PARAMETERS)
+            store.SCREEN_PARAMETERS = list(cls.SCREEN_PARAMETERS)
+            store.EAGER_PARAMETERS = set(cls.EAGER_PARAMETERS)
+            store.SKIP_UNCHANGED = cls.SKIP_UNCHANGED
+            store.FLOAT_EPSILON = cls.FLOAT_EPSILON
+            store.LAZY_EVALUATION = cls.LAZY_EVALUATION
+            store.HISTORY_SIZE = 0
+
+            params = [pdesc.copy() for pdesc in cls.PARAMETERS.values()]
+            store.load_parameters(params, plan=cls.get_plan())
+
+        return store
+
+    @storemethod
+    def parameter_groups(cls):
+        """Obtain names of parameters in each of GROUPS
+
+        :rtype: dict
+        :return: dict of group_name: list of parameter names
+        """
+        with cls.lock:
+            return {
+                cls.GROUP_SERVO: list(cls.SERVO_PARAMETERS),
+                cls.GROUP_CAMERA: list(cls.CAMERA_PARAMETERS),
+                cls.GROUP_SCREEN: list(cls.SCREEN_PARAMETERS),
+                cls.GROUP_DERIVED: list(cls.EVALUATORS.keys()),
+            }
+
+    @storemethod
+    def _index_groups(cls):
+        """Rebuild GROUP_INDEX and update groups of change listeners. Call
+        with lock held."""
+        groups = cls.parameter_groups()
+        cls.GROUP_INDEX = dict(
+            (group, [name for name in names
+                     if name in cls.PARAMETERS and
+                     not isinstance(cls.PARAMETERS[name], HiddenParameter)])
+            for group, names in groups.items())
+        cls.change_listeners.set_groups(groups)
+
+    @storemethod
+    def select_parameters(cls, names=None, groups=None):
+        """Obtain parameters with given names or belonging to any of
+        given groups, taken from the most recent view. All parameters
+        are returned if neither names nor groups are given. Raises
+        KeyError if parameter or group is not known.
+
+        :param names list(str): parameter names
+        :param groups list(str): group names, see GROUPS
+        :rtype: list(Parameter)
+        :return: list of parameters, each listed once
+        """
+        view = cls.view()
+        if names is None and groups is None:
+            return view.get_parameters()
+
+        selected = list(names or [])
+        for group in groups or []:
+            if group not in cls.GROUPS:
+                raise KeyError('group %s not known' % (group))
+            selected.extend(cls.GROUP_INDEX.get(group, []))
+
+        params = []
+        seen = set()
+        for name in selected:
+            if name in seen:
+                continue
+            seen.add(name)
+
+            pdesc = view.parameters.get(name)
+            if pdesc is None:
+                raise KeyError('parameter %s not found' % (name))
+            params.append(pdesc)
+        return params
+
+    @storemethod
+    def _compile_plan(cls, params):
+        """Setup dependencies and evaluation order of newly loaded `params`,
+        validating evaluators on the way"""
+        with cls.lock:
             # 2nd pass, setup dependencies
             for p in params:
                 if not p.evaluator:
@@ -140,24 +1137,263 @@ class ParametersStore(object):
                         raise RuntimeError('unknown dependency %s in evaluator for parameter %s' \
                                            % (req, p.name))
                     cls.DEPENDENCIES[req].append(p)
+                cls.EVALUATORS[p.name] = BoundEvaluator.bind(p, cls.PARAMETERS)
 
-    @classmethod
+            # 3rd pass, compile evaluation order
+            cls._build_evaluation_plan()
+
+    @storemethod
+    def get_plan(cls):
+        """Obtain dependencies and evaluation order of currently loaded
+        parameters, in a form that can be serialized and passed back to
+        load_parameters()
+
+        :rtype: dict
+        """
+        def names(pdescs):
+            return [p.name for p in pdescs]
+
+        with cls.lock:
+            return {
+                'dependencies': dict((name, names(deps)) for name, deps
+                                     in cls.DEPENDENCIES.items()),
+                'evaluation_plan': dict((name, names(deps)) for name, deps
+                                        in cls.EVALUATION_PLAN.items()),
+                'evaluation_rank': dict(cls.EVALUATION_RANK),
+                'arguments': dict((name, names(bound.args)) for name, bound
+                                  in cls.EVALUATORS.items()),
+            }
+
+    @staticmethod
+    def _plan_matches(plan, params):
+        """Check if arguments of evaluators in `plan` match evaluators of
+        `params`, that is the plan was not compiled with a different
+        version of evaluators
+
+        :rtype: bool
+        """
+        arguments = plan['arguments']
+        evaluated = [p for p in params if p.evaluator]
+        if len(arguments) != len(evaluated):
+            return False
+
+        for p in evaluated:
+            names = arguments.get(p.name)
+            if names is None or sorted(names) != sorted(p.evaluator.REQUIRES):
+                return False
+            # arguments are passed positionally
+            if names != inspect.getargspec(p.evaluator.__call__).args[1:]:
+                return False
+        return True
+
+    @storemethod
+    def _link_plan(cls, plan):
+        """Setup dependencies and evaluation order from plan obtained with
+        get_plan()"""
+        def params(names):
+            return [cls.PARAMETERS[name] for name in names]
+
+        with cls.lock:
+            cls.DEPENDENCIES = dict((name, params(names)) for name, names
+                                    in plan['dependencies'].items())
+            cls.EVALUATION_PLAN = dict((name, params(names)) for name, names
+                                       in plan['evaluation_plan'].items())
+            cls.EVALUATION_RANK = dict(plan['evaluation_rank'])
+
+            cls.EVALUATORS = {}
+            for name, names in plan['arguments'].items():
+                pdesc = cls.PARAMETERS[name]
+                cls.EVALUATORS[name] = BoundEvaluator(pdesc, pdesc.evaluator(),
+                                                      params(names))
+
+    @storemethod
+    def _sort_parameters(cls):
+        """Sort names of all parameters topologically, i.e. each parameter
+        is placed after all parameters it depends on. Raises
+        RuntimeError if dependencies are circular.
+
+        :rtype: list(str)
+        :return: list of parameter names
+        """
+        order = []
+        done = set()
+        in_progress = set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in in_progress:
+                raise RuntimeError('circular dependency of parameter %s' % name)
+
+            in_progress.add(name)
+            for dep in cls.DEPENDENCIES[name]:
+                visit(dep.name)
+            in_progress.remove(name)
+
+            done.add(name)
+            order.append(name)
+
+        for name in cls.PARAMETERS:
+            visit(name)
+
+        order.reverse()
+        return order
+
+    @storemethod
+    def _build_evaluation_plan(cls):
+        """Populate EVALUATION_PLAN and EVALUATION_RANK using current
+        DEPENDENCIES"""
+        rank = dict((name, idx) for idx, name in enumerate(cls._sort_parameters()))
+
+        plan = {}
+        for name in cls.PARAMETERS:
+            # collect all direct and indirect dependants
+            affected = {}
+            pending = [name]
+            while pending:
+                for dep in cls.DEPENDENCIES[pending.pop()]:
+                    if dep.name not in affected:
+                        affected[dep.name] = dep
+                        pending.append(dep.name)
+
+            plan[name] = sorted(affected.values(),
+                                key=lambda pdesc: rank[pdesc.name])
+
+        cls.EVALUATION_PLAN = plan
+        cls.EVALUATION_RANK = rank
+
+    @storemethod
     def clear_parameters(cls):
         """Remove all parameters"""
         with cls.lock:
             cls.PARAMETERS = {}
             cls.DEPENDENCIES = {}
+            cls.EVALUATION_PLAN = {}
+            cls.EVALUATION_RANK = {}
+            cls.EVALUATORS = {}
+            cls.SUPPRESSED_UPDATES = {}
+            cls.UNEVALUATED = set()
+            cls.DIRTY = set()
+            cls.FAILED_HIDDEN = set()
+            cls.EVALUATOR_STATS.reset()
+            cls.HISTORY = {}
+            cls.MODIFIED = {}
+            cls.VIEW = ParametersView(cls.VIEW.revision + 1, {}, {})
+            cls._index_groups()
+
+    @storemethod
+    def _publish(cls):
+        """Publish a new view of parameters, updated with copies of
+        parameters modified since the last view was published. Hidden
+        parameters are not published. Call with lock held.
+        """
+        if not cls.MODIFIED:
+            return
+
+        revision = cls.VIEW.revision + 1
+        parameters = dict(cls.VIEW.parameters)
+        revisions = dict(cls.VIEW.revisions)
+        fragments = dict(cls.VIEW.fragments)
+        for pname, pdesc in cls.MODIFIED.items():
+            # hidden parameters are internal to the store
+            if isinstance(pdesc, HiddenParameter):
+                continue
+            parameters[pname] = pdesc.copy()
+            revisions[pname] = revision
+            fragments.pop(pname, None)
+
+        if cls.HISTORY:
+            now = time.time()
+            for pname, pdesc in cls.MODIFIED.items():
+                history = cls.HISTORY.get(pname)
+                if history is not None:
+                    history.append(now, pdesc.value)
+
+        cls.MODIFIED = {}
+
+        cls.VIEW = ParametersView(revision, parameters, revisions, fragments)
+
+    @storemethod
+    def _setup_history(cls, params):
+        """Allocate history buffers for numeric parameters in `params`. Call
+        with lock held."""
+        for p in params:
+            if p.value_type in cls.HISTORY_TYPES and \
+               not isinstance(p, HiddenParameter):
+                cls.HISTORY[p.name] = ParameterHistory(cls.HISTORY_SIZE,
+                                                       p.value_type)
+
+    @storemethod
+    def enable_history(cls, size):
+        """Keep history of up to `size` latest values of each numeric
+        parameter, 0 disables history. Any previously recorded history
+        is discarded.
+
+        :param size int: number of samples
+        """
+        with cls.lock:
+            cls.HISTORY_SIZE = size
+            cls.HISTORY = {}
+            if size:
+                cls._setup_history(cls.PARAMETERS.values())
+                now = time.time()
+                for pname, history in cls.HISTORY.items():
+                    history.append(now, cls.PARAMETERS[pname].value)
+
+    @storemethod
+    def history(cls, name, since=None):
+        """Obtain history of parameter values. Raises KeyError if history
+        of parameter is not recorded.
 
-    @classmethod
+        :param name str: parameter name
+        :param since float: only samples recorded at or after this timestamp
+        :rtype: list((float, value))
+        :return: list of (timestamp, value) tuples, oldest first
+        """
+        with cls.lock:
+            return cls.HISTORY[name].samples(since)
+
+    @storemethod
+    def view(cls):
+        """Obtain most recent view of parameters. The lock is acquired only
+        if there are lazily evaluated parameters pending evaluation.
+
+        :rtype: ParametersView
+        """
+        if cls.DIRTY:
+            cls.evaluate_dirty()
+        return cls.VIEW
+
+    @storemethod
+    def revision(cls):
+        """Obtain current store revision
+
+        :rtype: int
+        """
+        return cls.view().revision
+
+    @storemethod
+    def changed_since(cls, revision):
+        """Obtain parameters modified after given store revision
+
+        :param revision int: store revision
+        :rtype: tuple(int, list(Parameter))
+        :return: current store revision and list of modified parameters
+        """
+        view = cls.view()
+        return view.revision, view.changed_since(revision)
+
+    @storemethod
     def parameters_as_dict(cls):
         """Repack parameter descriptors do dictionary format."""
-        with cls.lock:
-            params = {}
-            for pname, pp in cls.PARAMETERS.items():
-                params[pname] = ParameterCodec.parameter_to_dict(pp)
-            return params
+        return cls.view().as_dict()
 
-    @classmethod
+    @storemethod
+    def parameters_as_json(cls):
+        """Obtain JSON encoded dictionary format of parameters"""
+        return cls.view().as_json()
+
+    @storemethod
     def _find_param(cls, name):
         """Find parameter in known parameters dict and return a
         descriptor. Acquires a lock on parameters.
@@ -172,7 +1408,7 @@ class ParametersStore(object):
             raise KeyError('parameter %s not known' % (name))
         return pdesc
 
-    @classmethod
+    @storemethod
     def _convert(cls, pdesc, value):
         """Convert a parameter value according to descriptor. Will throw
         `ValueError` if conversion fails.
@@ -188,7 +1424,41 @@ class ParametersStore(object):
             raise
         return cval
 
-    @classmethod
+    @storemethod
+    def _is_unchanged(cls, pdesc, value):
+        """Check if `value` is the same as current value of parameter. Float
+        values are compared with FLOAT_EPSILON tolerance, other types
+        are compared exactly. Always returns False if SKIP_UNCHANGED is
+        disabled, or if any parameter depending on it has not been
+        evaluated yet. Updates SUPPRESSED_UPDATES counters.
+
+        :param pdesc: parameter descriptor
+        :param value: converted parameter value
+        :rtype: bool
+        :return: True if value has not changed
+        """
+        if not cls.SKIP_UNCHANGED:
+            return False
+
+        if cls.UNEVALUATED and \
+           any(dep_param.name in cls.UNEVALUATED
+               for dep_param in cls.EVALUATION_PLAN.get(pdesc.name, [])):
+            return False
+
+        current = pdesc.value
+        if value == current:
+            unchanged = True
+        elif pdesc.value_type == float:
+            unchanged = abs(value - current) <= cls.FLOAT_EPSILON
+        else:
+            unchanged = False
+
+        if unchanged:
+            _log.debug('value of %s unchanged', pdesc.name)
+            cls.SUPPRESSED_UPDATES[pdesc.name] = cls.SUPPRESSED_UPDATES.get(pdesc.name, 0) + 1
+        return unchanged
+
+    @storemethod
     def validate(cls, name, value):
         """Validate that parameter is of correct value
 
@@ -200,7 +1470,7 @@ class ParametersStore(object):
         # attempt conversion
         cls._convert(pdesc, value)
 
-    @classmethod
+    @storemethod
     def validate_desc(cls, desc):
         """Validate that parameter passed as Parameter instance has correct
         value. Aside from same exceptions as validate(), also throws
@@ -213,7 +1483,7 @@ class ParametersStore(object):
         # attempt conversion
         cls._convert(pdesc, desc.value)
 
-    @classmethod
+    @storemethod
     def set(cls, name, value, notify=True, evaluate=True):
         """Set a parameter, attempts automatic conversion to proper type
 
@@ -229,52 +1499,210 @@ class ParametersStore(object):
         with cls.lock:
             _log.debug('acquired')
             pdesc = cls._find_param(name)
-            pdesc.value = cls._convert(pdesc, value)
+            value = cls._convert(pdesc, value)
+            if cls._is_unchanged(pdesc, value):
+                return True
+
+            pdesc.value = value
+            cls.MODIFIED[pdesc.name] = pdesc
             _log.debug('set value of %s to %s', name, pdesc.value)
-            if notify:
-                cls.change_listeners.fire(pdesc)
 
             if evaluate:
                 cls.evaluate_param_tree(pdesc)
 
+            cls._publish()
+            # notify with a copy from published view
+            if notify:
+                cls.change_listeners.post(cls.VIEW.get(pdesc.name))
+
+        # listeners are called with lock released
+        cls.change_listeners.deliver()
+
         return True
 
-    @classmethod
+    @storemethod
+    def set_many(cls, values, notify=True, evaluate=True):
+        """Set a number of parameters at once, attempts automatic conversion
+        to proper type. All values are converted before any parameter
+        is modified, hence if conversion of any value fails, the
+        store remains unchanged. Values that are the same as current
+        ones are skipped. Parameters depending on any of the
+        modified ones are evaluated once all values have been
+        applied. Change notification is triggered once for each
+        modified parameter, after evaluation is complete and the store
+        lock is released.
+
+        :param values: dict of parameter name: value, or list of (name, value) tuples
+        :param notify bool: trigger parameter change notification chain
+        :param evaluate bool: trigger parameter evaluation
+        :rtype: list(Parameter)
+        :return: list of modified parameter descriptors
+        """
+        if isinstance(values, dict):
+            values = values.items()
+
+        _log.debug('set parameters %s', values)
+
+        with cls.lock:
+            converted = []
+            for name, value in values:
+                pdesc = cls._find_param(name)
+                converted.append((pdesc, cls._convert(pdesc, value)))
+
+            changed = {}
+            for pdesc, value in converted:
+                if cls._is_unchanged(pdesc, value):
+                    continue
+                pdesc.value = value
+                changed[pdesc.name] = pdesc
+            cls.MODIFIED.update(changed)
+            changed = list(changed.values())
+
+            if evaluate:
+                cls._evaluate_params(cls._collect_dependants(changed))
+
+            cls._publish()
+            if notify:
+                for pdesc in changed:
+                    cls.change_listeners.post(cls.VIEW.get(pdesc.name))
+
+        cls.change_listeners.deliver()
+
+        return changed
+
+    @storemethod
+    def _collect_dependants(cls, params):
+        """Merge evaluation plans of `params`. Parameters from `params`
+        are skipped, even if they depend on each other, so that
+        explicitly set values are not overwritten.
+
+        :param params list(Parameter): parameter descriptors
+        :rtype: list(Parameter)
+        :return: list of parameters in evaluation order
+        """
+        names = set(p.name for p in params)
+        affected = {}
+        for param in params:
+            for dep_param in cls.EVALUATION_PLAN.get(param.name, []):
+                if dep_param.name not in names:
+                    affected[dep_param.name] = dep_param
+
+        return sorted(affected.values(),
+                      key=lambda pdesc: cls.EVALUATION_RANK[pdesc.name])
+
+    @storemethod
     def evaluate_param_tree(cls, param):
-        """Evalaluate paramters that depend on `param`
+        """Evalaluate paramters that depend on `param`, either directly or
+        indirectly. Each parameter is evaluated exactly once, in order
+        precomputed by load_parameters().
 
         :param param Parameter: parameter descriptor
         """
-        dependant_params = cls.DEPENDENCIES.get(param.name, [])
-        for dep_param in dependant_params:
-            cls.evaluate_single_param(dep_param)
+        cls._evaluate_params(cls.EVALUATION_PLAN.get(param.name, []))
 
-    @classmethod
+    @storemethod
+    def _evaluate_params(cls, params):
+        """Evaluate parameters in given order, or, if LAZY_EVALUATION is
+        enabled, mark them as dirty. Parameters listed in
+        EAGER_PARAMETERS are always evaluated.
+
+        :param params list(Parameter): parameter descriptors in evaluation order
+        """
+        for param in params:
+            if cls.LAZY_EVALUATION and param.name not in cls.EAGER_PARAMETERS:
+                cls.DIRTY.add(param.name)
+            else:
+                cls.evaluate_single_param(param)
+
+    @storemethod
+    def evaluate_dirty(cls):
+        """Evaluate all parameters marked as dirty"""
+        with cls.lock:
+            if not cls.DIRTY:
+                return
+
+            dirty = sorted(cls.DIRTY, key=lambda name: cls.EVALUATION_RANK[name])
+            for name in dirty:
+                # might have been evaluated as a dependency already
+                if name in cls.DIRTY:
+                    cls.evaluate_single_param(cls.PARAMETERS[name])
+
+            cls._publish()
+
+    @storemethod
     def evaluate_single_param(cls, param):
-        """Evaluate a single parameter. Effectively this method will construct
-        an instance of an evaluator and call it passing required
-        parameters (listed in REQUIRES property of the evaluator) as
-        keywords.
+        """Evaluate a single parameter. Effectively this method will call an
+        evaluator instance created by load_parameters(), passing
+        values of required parameters (listed in REQUIRES property of
+        the evaluator) as positional arguments. Parameters that
+        depend on `param` are not evaluated.
 
         :param param Parameter: parameter descriptor
-
+        :rtype: bool
+        :return: True if parameter was evaluated
         """
-        args = {}
-        for pname in param.evaluator.REQUIRES:
-            args[pname] = ParametersStore.get_value(pname)
+        bound = cls.EVALUATORS[param.name]
+        if cls.DIRTY:
+            # lazily evaluated arguments need to be updated first
+            for arg in bound.args:
+                if arg.name in cls.DIRTY:
+                    cls.evaluate_single_param(arg)
+            cls.DIRTY.discard(param.name)
+
+        cls.UNEVALUATED.discard(param.name)
 
-        # param.value = param.evaluator()(**args)
+        hidden = isinstance(param, HiddenParameter)
+
+        evaluator_name = type(bound.evaluator).__name__
+        start = time.time()
         try:
-            cls.set(param.name, param.evaluator()(**args), notify=False)
+            # intermediate values that could not be evaluated are
+            # passed as FailedValue, failing evaluation only if used
+            value = bound(cls.FAILED_HIDDEN)
         except ArithmeticError:
+            cls.EVALUATOR_STATS.record(evaluator_name, time.time() - start,
+                                       failed=True)
             _log.exception('failed to evaluate parameter %s, args: %s',
-                           param.name, args)
+                           param.name, bound.arguments(cls.FAILED_HIDDEN))
+            if hidden:
+                cls.FAILED_HIDDEN.add(param.name)
+            return False
         except Exception:
+            cls.EVALUATOR_STATS.record(evaluator_name, time.time() - start,
+                                       failed=True)
             _log.exception('unexpected error when evaluating parameter %s with args %s',
-                           param.name, args)
+                           param.name, bound.arguments(cls.FAILED_HIDDEN))
             raise
+        cls.EVALUATOR_STATS.record(evaluator_name, time.time() - start)
 
-    @classmethod
+        param.value = cls._convert(param, value)
+        cls.MODIFIED[param.name] = param
+        if hidden:
+            cls.FAILED_HIDDEN.discard(param.name)
+        return True
+
+    @storemethod
+    def evaluator_stats(cls):
+        """Obtain call statistics of evaluators
+
+        :rtype: dict
+        :return: dict of evaluator_name: dict with calls, errors, total_ms,
+                 max_ms and avg_ms, and memo_hits and memo_misses for
+                 evaluators with MEMO_SIZE set
+        """
+        with cls.lock:
+            stats = cls.EVALUATOR_STATS.as_dict()
+
+            for bound in cls.EVALUATORS.values():
+                entry = stats.get(type(bound.evaluator).__name__)
+                if bound.memo is None or entry is None:
+                    continue
+                entry['memo_hits'] = entry.get('memo_hits', 0) + bound.memo.hits
+                entry['memo_misses'] = entry.get('memo_misses', 0) + bound.memo.misses
+
+            return stats
+
+    @storemethod
     def set_status(cls, name, status, notify=True):
         """Set a parameter status
 
@@ -285,24 +1713,31 @@ class ParametersStore(object):
         with cls.lock:
             pdesc = cls._find_param(name)
             pdesc.status = status
+            cls.MODIFIED[pdesc.name] = pdesc
+            cls._publish()
             if notify:
-                cls.change_listeners.fire(pdesc)
+                cls.change_listeners.post(cls.VIEW.get(pdesc.name))
+
+        cls.change_listeners.deliver()
 
         return True
 
-    @classmethod
+    @storemethod
     def get(cls, name):
         """Get a parameter"""
 
         _log.debug('get parameter %s', name)
         with cls.lock:
             pdesc = cls.PARAMETERS.get(name, None)
+            if name in cls.DIRTY:
+                cls.evaluate_single_param(pdesc)
+                cls._publish()
         if not pdesc:
             raise KeyError('parameter %s not found' % (name))
 
         return pdesc
 
-    @classmethod
+    @storemethod
     def get_value(cls, name):
         """Obtain a parameter's value. Raises KeyError if parameter is not
         present.
@@ -314,25 +1749,69 @@ class ParametersStore(object):
         pdesc = cls.get(name)
         return pdesc.value
 
-    @classmethod
+    @storemethod
     def get_parameters(cls):
-        """Obtaina list of all parameters, symmetric to load_parameters() call
+        """Obtaina list of all parameters, symmetric to load_parameters()
+        call. The list contains copies of parameter descriptors, taken
+        from the most recent view.
 
         :rtype: list(Parameter)
         :return: list of parmeters"""
-        with cls.lock:
-            return cls.PARAMETERS.values()
+        return cls.view().get_parameters()
 
 
 class ParameterLoader(object):
     """Utility class for loading up a paramteres from a set"""
 
     @classmethod
-    def load(cls):
+    def load(cls, path=None, store=ParametersStore):
+        """Load parameters into the store. If `path` is provided, parameters
+        are loaded from schema file, otherwise built in system
+        parameters are used.
+
+        :param path str: path to parameters schema file
+        :param store ParametersStore: store to load parameters into
+        """
+        if path:
+            cls.load_schema(path, store=store)
+            return
 
         from ros3ddevcontroller.param.sysparams import SYSTEM_PARAMETERS
 
-        ParametersStore.load_parameters(SYSTEM_PARAMETERS)
+        # load copies, so that definitions remain intact when
+        # parameters are modified in the store
+        store.load_parameters(copy.deepcopy(SYSTEM_PARAMETERS))
+
+    @classmethod
+    def load_schema(cls, path, store=ParametersStore):
+        """Load parameters from schema file. Uses a precompiled cache of the
+        schema if one matching current schema is present, otherwise
+        the schema is validated and the cache is updated.
+
+        :param path str: path to parameters schema file
+        :param store ParametersStore: store to load parameters into
+        """
+        from ros3ddevcontroller.param.schema import ParameterSchema
+
+        schema = ParameterSchema(path)
+
+        compiled = schema.load_cache()
+        if compiled:
+            _log.debug('using precompiled parameters schema')
+            store.SERVO_PARAMETERS = compiled.servo
+            store.CAMERA_PARAMETERS = compiled.camera
+            store.SCREEN_PARAMETERS = compiled.screen
+            store.load_parameters(compiled.parameters, plan=compiled.plan)
+            return
+
+        compiled = schema.load()
+        store.SERVO_PARAMETERS = compiled.servo
+        store.CAMERA_PARAMETERS = compiled.camera
+        store.SCREEN_PARAMETERS = compiled.screen
+        store.load_parameters(compiled.parameters)
+
+        compiled.plan = store.get_plan()
+        schema.save_cache(compiled)
 
 
 class ParameterSnapshotBackend(object):
@@ -382,14 +1861,15 @@ class ParameterSnapshotter(object):
     location"""
 
     @classmethod
-    def save(cls, backend=None):
+    def save(cls, backend=None, store=ParametersStore):
         """Save parameter using backend `backend`
 
         :param backend ParameterSnapshotBackend: a ParameterSnapshotBackend instance
+        :param store ParametersStore: store to take parameters from
         :rtype int:
         :return: snapshot ID
         """
         assert backend != None
 
-        return backend.save(ParametersStore.get_parameters())
+        return backend.save(store.get_parameters())
 
@@ -24,7 +24,7 @@
 
 from __future__ import absolute_import
 
-from ros3ddevcontroller.param.parameter import Parameter, ReadOnlyParameter
+from ros3ddevcontroller.param.parameter import Parameter, ReadOnlyParameter, HiddenParameter
 from ros3ddevcontroller.param.evaluators import *
 
 SERVO_PARAMETERS = [
@@ -65,6 +65,26 @@ CAMERA_PARAMETERS = [
     'sensor_height_px'
 ]
 
+SCREEN_PARAMETERS = [
+    'screen_type',
+    'screen_width_m',
+    'screen_height_m',
+    'screen_distance_n',
+    'screen_distance_m',
+    'interpupillary_distance_mm',
+    'spectator_fov_horizontal_deg',
+    'perceived_position_near_percent',
+    'perceived_position_screen_percent',
+    'perceived_position_far_percent',
+    'perceived_position_object1_percent',
+    'perceived_position_object2_percent',
+    'perceived_position_near_m',
+    'perceived_position_screen_m',
+    'perceived_position_far_m',
+    'perceived_position_object1_m',
+    'perceived_position_object2_m'
+]
+
 SYSTEM_PARAMETERS = [
     # shot parameters
     Parameter('scene_no', '', str),
@@ -217,4 +237,8 @@ SYSTEM_PARAMETERS = [
     Parameter('stereographer', '', str),
     ReadOnlyParameter('copyright', '', str),
     ReadOnlyParameter('project_framerate', 25, float),
+
+    # intermediate values shared by evaluators
+    HiddenParameter('hyperfocal_m', 0, float, evaluator=HyperfocalCalc),
+    HiddenParameter('parallax_scale', 0, float, evaluator=ParallaxScaleCalc),
 ]
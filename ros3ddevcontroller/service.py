@@ -31,6 +31,7 @@ from ros3ddevcontroller.bus.camera import CameraTask
 from ros3ddevcontroller.util import SystemConfigLoader, ControllerConfigLoader, get_eth_mac
 from ros3ddevcontroller.mqtt import MQTTTask
 from ros3ddevcontroller.controller import Controller
+from ros3ddevcontroller.param.store import ParametersStore, ParameterLoader
 import logging
 import sys
 
@@ -53,6 +54,9 @@ class Ros3DdevControllerService(VService):
                           self.options.system_config_file)
         self.system_config = SystemConfigLoader(self.options.system_config_file)
 
+        ParameterLoader.load(self.config.get_parameters_file())
+        ParametersStore.enable_history(self.config.get_history_size())
+
         self.controller = Controller()
         self.controller.set_snapshots_location(self.config.get_snapshots_location())
 
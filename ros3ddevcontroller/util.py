@@ -84,6 +84,17 @@ class ControllerConfigLoader(ConfigLoader):
         return self._get('controller', 'snapshots_location',
                          self.DEFAULT_SNAPSHOTS_LOCATION)
 
+    def get_parameters_file(self):
+        """Get path to parameters schema file, None if built in parameters
+        are to be used"""
+        return self._get('controller', 'parameters_file', None)
+
+    def get_history_size(self):
+        """Get number of samples of history kept for each numeric
+        parameter, 0 if history is disabled"""
+        # option may be present, but left empty
+        return int(self._get('controller', 'history_size', 0) or 0)
+
 
 class SystemConfigLoader(ConfigLoader):
     """Ros3D system configuration loader"""
@@ -0,0 +1,198 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Delivery of parameter changes to clients of the web API"""
+
+from __future__ import absolute_import
+from tornado.ioloop import IOLoop
+from ros3ddevcontroller.param.store import ParametersStore
+from threading import Lock
+import logging
+
+_log = logging.getLogger(__name__)
+
+
+class ParametersBroadcaster(object):
+    """Deliver changes of parameters to subscribers running in tornado
+    IOLoop. Change notifications from the store are coalesced, a burst
+    of changes results in a single delivery of the most recent view of
+    parameters. Subscribers are callables accepting a ParametersView,
+    called in IOLoop thread.
+
+    The broadcaster is registered as a change listener only while
+    there are subscribers.
+
+    """
+
+    def __init__(self, store=ParametersStore, ioloop=None):
+        """Initialize broadcaster
+
+        :param store ParametersStore: store to watch
+        :param ioloop IOLoop: loop to deliver changes in, current one if None
+        """
+        self.store = store
+        self.ioloop = ioloop or IOLoop.current()
+        self.subscribers = []
+
+        self.lock = Lock()
+        # delivery was scheduled and has not run yet
+        self.scheduled = False
+
+        # encoded changes of the most recently delivered view, dict
+        # of revision: JSON, shared by subscribers at the same revision
+        self.encoded_view = None
+        self.encoded = {}
+
+    def subscribe(self, subscriber):
+        """Add subscriber, call from IOLoop thread"""
+        if not self.subscribers:
+            self.store.change_listeners.add(self._param_changed)
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        """Remove subscriber, call from IOLoop thread"""
+        if subscriber not in self.subscribers:
+            return
+        self.subscribers.remove(subscriber)
+        if not self.subscribers:
+            self.store.change_listeners.remove(self._param_changed)
+
+    def close(self):
+        """Remove all subscribers"""
+        for subscriber in list(self.subscribers):
+            self.unsubscribe(subscriber)
+
+    def _param_changed(self, param):
+        """Change listener, may be called from any thread"""
+        with self.lock:
+            if self.scheduled:
+                return
+            self.scheduled = True
+        self.ioloop.add_callback(self._deliver)
+
+    def _deliver(self):
+        """Deliver most recent view to subscribers"""
+        with self.lock:
+            self.scheduled = False
+
+        view = self.store.view()
+        _log.debug('deliver revision %d to %d subscribers', view.revision,
+                   len(self.subscribers))
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber(view)
+            except Exception:
+                _log.exception('failed to deliver changes')
+
+    def changes_as_json(self, view, since):
+        """Obtain JSON encoded changes of parameters in `view` after
+        revision `since`, in the format of parameters changes request,
+        i.e. object with "revision" and "parameters" fields. Encoded
+        changes are shared among subscribers receiving the same view.
+
+        :param view ParametersView: view of parameters
+        :param since int: store revision
+        :rtype: str
+        """
+        if view is not self.encoded_view:
+            self.encoded_view = view
+            self.encoded = {}
+
+        encoded = self.encoded.get(since)
+        if encoded is None:
+            encoded = '{"revision": %d, "parameters": %s}' % (
+                view.revision, view.changed_as_json(since))
+            self.encoded[since] = encoded
+        return encoded
+
+
+class ChangesSender(object):
+    """Subscriber sending changes of parameters to a single client. A
+    send has to complete before the next one is started, changes
+    arriving in the meantime are coalesced and sent once the client
+    catches up, hence slow clients do not accumulate backlog.
+
+    """
+
+    def __init__(self, broadcaster, send, revision=0):
+        """Initialize sender
+
+        :param broadcaster ParametersBroadcaster: broadcaster to subscribe to
+        :param send: callable accepting a view and JSON encoded changes,
+                     returns a Future resolved once the data is sent
+        :param revision int: revision of parameters known to the client
+        """
+        self.broadcaster = broadcaster
+        self.send = send
+        self.revision = revision
+
+        # pending send and view postponed until it completes
+        self.sending = None
+        self.postponed = None
+        self.closed = False
+
+    def start(self, view):
+        """Subscribe to changes and send changes in `view`"""
+        self.broadcaster.subscribe(self)
+        self(view)
+
+    def stop(self):
+        """Stop sending changes"""
+        if not self.closed:
+            self.closed = True
+            self.broadcaster.unsubscribe(self)
+
+    def busy(self):
+        """Check if a send is in progress"""
+        return self.sending is not None
+
+    def wait(self, future):
+        """Postpone sending until `future` completes, for data sent to the
+        client other than changes"""
+        if future is None or future.done():
+            return
+        self.sending = future
+        future.add_done_callback(self._sent)
+
+    def __call__(self, view):
+        """Send changes after last sent revision"""
+        if self.closed or view.revision <= self.revision:
+            return
+
+        if self.sending is not None:
+            self.postponed = view
+            return
+
+        changes = self.broadcaster.changes_as_json(view, self.revision)
+        self.revision = view.revision
+        self.wait(self.send(view, changes))
+
+    def _sent(self, future):
+        self.sending = None
+        if future.exception() is not None:
+            _log.debug('send failed: %s', future.exception())
+            self.stop()
+            return
+
+        if self.postponed is not None:
+            view, self.postponed = self.postponed, None
+            self(view)
@@ -35,6 +35,9 @@ class ParameterCodecError(Exception):
     pass
 
 class ParameterCodec(object):
+    # fields of parameter description, as returned by parameter_to_dict()
+    FIELDS = ['value', 'type', 'status', 'minValue', 'maxValue']
+
     def __init__(self, as_set=False):
         self.as_set = as_set
 
@@ -70,6 +73,13 @@ class ParameterCodec(object):
         return ad
 
 
+    @staticmethod
+    def parameter_to_json(param):
+        """Encode Parameter to JSON object member, i.e. parameter name and
+        JSON serialized dict"""
+        return '%s: %s' % (json_encode(param.name),
+                           json_encode(ParameterCodec.parameter_to_dict(param)))
+
     def encode(self, param):
         """Encode parameter to REST API representation"""
         if not self.as_set:
@@ -109,6 +119,11 @@ class ParameterCodec(object):
             _log.exception("failed to decode JSON")
             raise ParameterCodecError("JSON decoding error")
 
+        return self.decode_dict(req)
+
+    def decode_dict(self, req):
+        """Decode a dict of parameter_name: parameter data, as found in
+        decoded JSON"""
         if not isinstance(req, dict):
             raise ParameterCodecError('Request not an object')
 
@@ -25,12 +25,21 @@
 from __future__ import absolute_import
 
 import logging
+import time
 import tornado.web
+import tornado.gen
+import tornado.ioloop
+import tornado.concurrent
+import tornado.websocket
+from concurrent.futures import ThreadPoolExecutor
 from tornado.escape import json_decode, json_encode
 from sparts.tasks.tornado import TornadoHTTPTask
-from ros3ddevcontroller.param  import ParametersStore
 from ros3ddevcontroller.bus.servo import ServoTask, ParamApplyError
 from ros3ddevcontroller.web.codec import ParameterCodec, ParameterCodecError
+from ros3ddevcontroller.web.broadcast import ParametersBroadcaster, ChangesSender
+from ros3ddevcontroller.param.batch import BatchEvaluator
+from ros3ddevcontroller.param.solver import SolverRequestError
+from ros3ddevcontroller.param.parameter import Infinity
 
 
 _log = logging.getLogger(__name__)
@@ -38,6 +47,10 @@ _log = logging.getLogger(__name__)
 # REST API version
 API_VERSION = '1.0'
 
+# ETag prefix, unique for each run of the controller
+_ETAG_EPOCH = '%x' % (int(time.time() * 1000))
+
+
 class APIError(Exception):
     """General API Error wrapper"""
     ERROR_PERMISSION_DENIED = 1
@@ -68,6 +81,33 @@ class RequestFailedError(APIError):
     HTTP_CODE = 500
 
 
+def _format_revision(revision):
+    """Format store revision for clients, qualified with _ETAG_EPOCH, as
+    store revisions start over when the controller is restarted"""
+    return '%s-%d' % (_ETAG_EPOCH, revision)
+
+
+def _parse_revision(value, current):
+    """Parse revision formatted with _format_revision(). Revisions from
+    other run of the controller, or not qualified at all, are
+    replaced with 0, hence the client receives all parameters.
+
+    :param value str: revision known to the client
+    :param current int: current store revision
+    :rtype: int
+    :return: store revision
+    """
+    epoch, _, revision = value.rpartition('-')
+    try:
+        revision = int(revision)
+    except ValueError:
+        raise InvalidDataError("Incorrect revision %s" % (value))
+
+    if epoch != _ETAG_EPOCH or revision > current:
+        return 0
+    return revision
+
+
 class TaskRequestHandler(tornado.web.RequestHandler):
     """Helper class for setting up a request handler. Fields from
     parameter dictionary passed as `arg` will be added to class
@@ -103,17 +143,457 @@ class SystemVersionHandler(TaskRequestHandler):
 
 class SystemStatusHandler(TaskRequestHandler):
     def get(self):
-        status = {}
+        status = self.task.controller.get_system_status()
         _log.debug("SystemStatusHandler() Response: %s", status)
         self.write(status)
 
 
 class ParametersListHandler(TaskRequestHandler):
+    def compute_etag(self):
+        """Tag response with revision of parameters store, the revision
+        changes with every modification of parameters. Process start
+        time distinguishes revisions of a restarted controller."""
+        revision = self.task.controller.get_parameters_revision()
+        return '"%s"' % (_format_revision(revision))
+
+    def _get_list_argument(self, name):
+        """Obtain a list of values of query argument `name`, given either as
+        repeated or comma separated argument, None if argument is not
+        present or empty"""
+        values = [value for arg in self.get_arguments(name)
+                  for value in arg.split(',') if value]
+        return values or None
+
+    def get(self):
+        # revision is obtained before parameters, hence parameters
+        # modified in between are sent again with next request
+        self.set_etag_header()
+        if self.check_etag_header():
+            _log.debug("ParametersListHandler() Not modified")
+            self.set_status(304)
+            return
+
+        names = self._get_list_argument('names')
+        groups = self._get_list_argument('groups')
+        fields = self._get_list_argument('fields')
+
+        if names is None and groups is None and fields is None:
+            params = self.task.controller.get_parameters_json()
+
+            _log.debug("ParametersListHandler() Response: %s", params)
+            self.set_header('Content-Type', 'application/json; charset=UTF-8')
+            self.write(params)
+            return
+
+        try:
+            try:
+                params = self.task.controller.get_selected_parameters(names, groups,
+                                                                      fields)
+            except KeyError as err:
+                raise InvalidDataError("Unknown parameter or group %s" % (err))
+            except ValueError as err:
+                raise InvalidDataError(str(err))
+
+            _log.debug("ParametersListHandler() Response: %s", params)
+            self.write(params)
+        except APIError as err:
+            self._respond_with_error(err)
+
+
+class ParametersChangesHandler(TaskRequestHandler):
+    """Parameters modified since revision given in 'since' argument. The
+    revision in response is qualified with time of controller start,
+    same as stream event IDs, and is to be passed back in 'since' of
+    the next request. All parameters are returned if 'since' is from
+    before a restart of the controller.
+    """
+
+    def get(self):
+        try:
+            since = _parse_revision(self.get_argument('since', '0'),
+                                    self.task.controller.get_parameters_revision())
+
+            changes = self.task.controller.get_changed_parameters(since)
+            changes['revision'] = _format_revision(changes['revision'])
+
+            _log.debug("ParametersChangesHandler() Response: %s", changes)
+            self.write(changes)
+        except APIError as err:
+            self._respond_with_error(err)
+
+
+class ParametersStreamHandler(TaskRequestHandler):
+    """Stream changes of parameters as server-sent events. Each event
+    carries parameters modified since the previous event, in the same
+    format as parameters changes request, with store revision as event
+    ID, qualified with time of controller start. A client resuming the
+    stream passes ID of last received event in Last-Event-ID header (or
+    'since' argument), all parameters are sent first otherwise, or if
+    the controller has been restarted since.
+    """
+
+    # interval of comments keeping idle connections alive, seconds
+    KEEPALIVE_INTERVAL = 15
+    # reconnection delay suggested to clients, milliseconds
+    RETRY_MS = 2000
+
+    def _get_since(self):
+        """Obtain revision of last event received by the client"""
+        since = self.request.headers.get('Last-Event-ID',
+                                         self.get_argument('since', '0'))
+        return _parse_revision(since, self.task.controller.get_parameters_revision())
+
+    @tornado.gen.coroutine
+    def get(self):
+        _log.debug("ParametersStreamHandler() Request: %s", self.request)
+
+        try:
+            since = self._get_since()
+        except APIError as err:
+            self._respond_with_error(err)
+            return
+
+        self.closed = tornado.concurrent.Future()
+        self.sender = ChangesSender(self.task.broadcaster, self._send, since)
+
+        self.set_header('Content-Type', 'text/event-stream')
+        self.set_header('Cache-Control', 'no-cache')
+        self.write('retry: %d\n\n' % (self.RETRY_MS))
+        self.sender.wait(self.flush())
+
+        self.keepalive = tornado.ioloop.PeriodicCallback(
+            self._keepalive, self.KEEPALIVE_INTERVAL * 1000)
+        self.keepalive.start()
+
+        self.sender.start(self.task.controller.store.view())
+
+        yield self.closed
+
+    def _send(self, view, changes):
+        self.write('id: %s\nevent: parameters\ndata: %s\n\n' % (
+            _format_revision(view.revision), changes))
+        return self.flush()
+
+    def _keepalive(self):
+        if self.sender.closed:
+            self.on_connection_close()
+        elif not self.sender.busy():
+            self.write(':\n\n')
+            self.sender.wait(self.flush())
+
+    def on_connection_close(self):
+        if not hasattr(self, 'closed') or self.closed.done():
+            return
+
+        _log.debug("ParametersStreamHandler() Connection closed")
+        self.sender.stop()
+        self.keepalive.stop()
+        self.closed.set_result(None)
+
+
+class ParametersHistoryHandler(TaskRequestHandler):
+    # number of samples sent in a single chunk of response
+    CHUNK_SAMPLES = 500
+
+    @tornado.gen.coroutine
     def get(self):
-        params = self.task.controller.get_parameters()
+        try:
+            name = self.get_argument('name', None)
+            if not name:
+                raise InvalidDataError("Missing parameter name")
+
+            since = self.get_argument('from', None)
+            if since is not None:
+                try:
+                    since = float(since)
+                except ValueError:
+                    raise InvalidDataError("Incorrect timestamp %s" % (since))
+
+            samples = self.task.controller.get_parameter_history(name, since)
+            if samples is None:
+                raise InvalidDataError("History of parameter %s not available" % (name))
+        except APIError as err:
+            self._respond_with_error(err)
+            return
+
+        _log.debug("ParametersHistoryHandler() Response: %d samples", len(samples))
+
+        # history may be long, send samples in chunks, waiting for each
+        # chunk to be written so that other requests are served in
+        # between
+        self.set_header('Content-Type', 'application/json; charset=UTF-8')
+        self.write('{"name": %s, "samples": [' % (json_encode(name)))
+        for start in range(0, len(samples), self.CHUNK_SAMPLES):
+            chunk = samples[start:start + self.CHUNK_SAMPLES]
+            if start:
+                self.write(', ')
+            self.write(', '.join(json_encode(list(sample)) for sample in chunk))
+            yield self.flush()
+        self.write(']}')
+
+
+def _decode_batch_request(req):
+    """Validate description of a batch in request `req`, that is a list
+    of input values, optional list of outputs and optional mode, see
+    ParametersBatchHandler for format.
+
+    :rtype: tuple(list, list, str)
+    :return: tuple (inputs, outputs, mode)
+    """
+    inputs = req.get('inputs')
+    if not isinstance(inputs, list) or not inputs:
+        raise InvalidDataError("Missing 'inputs' list")
+
+    batch = []
+    for inp in inputs:
+        if not isinstance(inp, dict) or \
+           not isinstance(inp.get('values'), list) or 'name' not in inp:
+            raise InvalidDataError("Incorrect input description")
+
+        values = [Infinity.convert_from(val) if type(val) == float else val
+                  for val in inp['values']]
+        batch.append((str(inp['name']), values))
+
+    outputs = req.get('outputs')
+    if outputs is not None:
+        if not isinstance(outputs, list):
+            raise InvalidDataError("'outputs' not a list")
+        outputs = [str(name) for name in outputs]
+
+    mode = req.get('mode', BatchEvaluator.MODE_PRODUCT)
+    return batch, outputs, mode
+
+
+def _encode_batch_result(result):
+    """Convert result of batch evaluation to JSON serializable dict"""
+    columns = {}
+    rows = 0
+    for name, column in result.items():
+        columns[name] = [Infinity.convert_to(val) if type(val) == float else val
+                         for val in column]
+        rows = len(column)
+
+    return {
+        "rows": rows,
+        "columns": columns
+    }
+
+
+class ParametersBatchHandler(TaskRequestHandler):
+    """Evaluate parameters for a batch of input values. Request format:
+
+    {
+        "inputs": [
+            {"name": "focal_length_mm", "values": [25, 35, 50]},
+            {"name": "focus_distance_m", "values": [1, 2, 5, 10]}
+        ],
+        "outputs": ["dof_near_m", "dof_far_m"],
+        "mode": "product"
+    }
+
+    "outputs" and "mode" are optional. Response contains values of
+    inputs and outputs, as columns of equal length.
+    """
+
+    def _validate_request(self, data):
+        """Parse and validate request data
+
+        :return: tuple (inputs, outputs, mode)
+        """
+        try:
+            req = json_decode(data)
+        except ValueError:
+            raise InvalidDataError("JSON decoding error")
+
+        if not isinstance(req, dict):
+            raise InvalidDataError("Request not an object")
+
+        return _decode_batch_request(req)
+
+    @tornado.gen.coroutine
+    def post(self):
+        _log.debug("ParametersBatchHandler() Request: %s", self.request)
+
+        try:
+            inputs, outputs, mode = self._validate_request(self.request.body)
+            try:
+                result = yield self.task.executor.submit(
+                    self.task.controller.evaluate_batch, inputs, outputs, mode)
+            except KeyError as err:
+                raise InvalidDataError("Unknown parameter %s" % (err))
+            except ValueError as err:
+                raise InvalidDataError(str(err))
+
+            self.write(_encode_batch_result(result))
+        except APIError as err:
+            self._respond_with_error(err)
+
+
+class ParametersSimulateHandler(TaskRequestHandler):
+    """Evaluate parameters for hypothetical values, without applying
+    them to the rig. Request format:
+
+    {
+        "parameters": {
+            "baseline_mm": {"value": 60}
+        },
+        "ranges": [
+            {"name": "distance_screen_m", "values": [2, 3, 4]}
+        ],
+        "outputs": ["parallax_far_percent"],
+        "mode": "product"
+    }
+
+    "parameters" use the same format as parameters update. Optional
+    "ranges", "outputs" and "mode" describe a batch evaluated on top
+    of "parameters", see ParametersBatchHandler. Response contains
+    simulated "parameters", and a "batch" if ranges were given.
+    """
+
+    def _validate_request(self, data):
+        """Parse and validate request data
+
+        :return: tuple (params, ranges, outputs, mode)
+        """
+        try:
+            req = json_decode(data)
+        except ValueError:
+            raise InvalidDataError("JSON decoding error")
+
+        if not isinstance(req, dict):
+            raise InvalidDataError("Request not an object")
+
+        try:
+            params = ParameterCodec(as_set=True).decode_dict(req.get('parameters'))
+        except ParameterCodecError as perr:
+            raise InvalidDataError(str(perr))
+
+        ranges, outputs = None, req.get('outputs')
+        mode = BatchEvaluator.MODE_PRODUCT
+        if 'ranges' in req:
+            ranges, outputs, mode = _decode_batch_request(
+                dict(req, inputs=req['ranges']))
+        elif outputs is not None:
+            if not isinstance(outputs, list):
+                raise InvalidDataError("'outputs' not a list")
+            outputs = [str(name) for name in outputs]
+
+        return params, ranges, outputs, mode
+
+    @tornado.gen.coroutine
+    def post(self):
+        _log.debug("ParametersSimulateHandler() Request: %s", self.request)
+
+        try:
+            params, ranges, outputs, mode = self._validate_request(self.request.body)
+            try:
+                result = yield self.task.executor.submit(
+                    self.task.controller.simulate, params, ranges, outputs, mode)
+            except KeyError as err:
+                raise InvalidDataError("Unknown parameter %s" % (err))
+            except ValueError as err:
+                raise InvalidDataError(str(err))
+
+            response = {
+                "parameters": dict((param.name, ParameterCodec.parameter_to_dict(param))
+                                   for param in result['parameters'])
+            }
+            if 'batch' in result:
+                response["batch"] = _encode_batch_result(result['batch'])
+            self.write(response)
+        except APIError as err:
+            self._respond_with_error(err)
+
+
+class ParametersSolveHandler(TaskRequestHandler):
+    """Find value of a parameter for which an evaluated parameter reaches
+    requested value, without applying it. Request format:
+
+    {
+        "target": "parallax_far_percent",
+        "value": 1.5,
+        "variable": "baseline_mm",
+        "range": [10, 120]
+    }
+
+    "range" is optional.
+    """
+
+    def _validate_request(self, data):
+        """Parse and validate request data
+
+        :return: tuple (target, value, variable, low, high)
+        """
+        try:
+            req = json_decode(data)
+        except ValueError:
+            raise InvalidDataError("JSON decoding error")
 
-        _log.debug("ParametersListHandler() Response: %s" % params)
-        self.write(params)
+        if not isinstance(req, dict):
+            raise InvalidDataError("Request not an object")
+
+        for field in ['target', 'value', 'variable']:
+            if field not in req:
+                raise InvalidDataError("Missing '%s' field" % (field))
+
+        value = req['value']
+        if type(value) not in (int, float):
+            raise InvalidDataError("Incorrect 'value' field")
+
+        low, high = None, None
+        if 'range' in req:
+            rng = req['range']
+            if not isinstance(rng, list) or len(rng) != 2 or \
+               any(type(val) not in (int, float) for val in rng):
+                raise InvalidDataError("Incorrect 'range' field")
+            low, high = rng
+
+        return (str(req['target']), Infinity.convert_from(float(value)),
+                str(req['variable']), low, high)
+
+    def post(self):
+        _log.debug("ParametersSolveHandler() Request: %s", self.request)
+
+        try:
+            target, value, variable, low, high = \
+                self._validate_request(self.request.body)
+            try:
+                solution = self.task.controller.solve_parameter(target, value,
+                                                                variable,
+                                                                low, high)
+            except KeyError as err:
+                raise InvalidDataError("Unknown parameter %s" % (err))
+            except SolverRequestError as err:
+                raise InvalidDataError(str(err))
+            except ValueError as err:
+                raise RequestFailedError(str(err))
+
+            self.write({
+                "target": target,
+                "variable": variable,
+                "value": Infinity.convert_to(solution['value']),
+                "target_value": Infinity.convert_to(solution['target_value']),
+                "method": solution['method'],
+                "iterations": solution['iterations']
+            })
+        except APIError as err:
+            self._respond_with_error(err)
+
+
+def _validate_parameters(store, params):
+    """Validate values of decoded parameters to be applied
+
+    :param store ParametersStore: store the parameters are applied to
+    :param params list(Parameter): decoded parameters
+    """
+    for param in params:
+        try:
+            store.validate_desc(param)
+        except KeyError:
+            raise InvalidDataError("Unknown parameter %s" % (param.name))
+        except ValueError:
+            _log.exception('failed to validate parameter %s', param.name)
+            raise InvalidDataError("Incorrect value type of parameter %s" % (param.name))
 
 
 class ParametersUpdateHandler(TaskRequestHandler):
@@ -127,13 +607,7 @@ class ParametersUpdateHandler(TaskRequestHandler):
         except ParameterCodecError as perr:
             raise InvalidDataError(str(perr))
 
-        for param in req:
-            try:
-                ParametersStore.validate_desc(param)
-            except ValueError:
-                _log.exception('failed to validate parameter %s', param.name)
-                raise InvalidDataError("Incorrect value type of parameter %s" % (param.name))
-
+        _validate_parameters(self.task.controller.store, req)
         return req
 
     def put(self):
@@ -148,6 +622,121 @@ class ParametersUpdateHandler(TaskRequestHandler):
             self._respond_with_error(err)
 
 
+class ParametersSocketHandler(tornado.websocket.WebSocketHandler):
+    """Set parameters and receive changes of parameters over a WebSocket.
+    Client sends messages setting parameters, in the same format as
+    parameters update request:
+
+    {"type": "set", "id": 1, "parameters": {"focus_distance_m": {"value": 2.5}}}
+
+    "id" is optional and is passed back in the reply listing applied
+    parameters, or describing an error:
+
+    {"type": "applied", "id": 1, "parameters": {...}}
+    {"type": "error", "id": 1, "code": 2, "reason": "..."}
+
+    Changes of parameters, made by this or any other client, are sent
+    in the format of parameters changes request. "id" of the message
+    is the revision qualified the same way as event IDs of parameters
+    stream; when reconnecting, it is passed back in 'since' argument to
+    receive changes made after it, or all parameters if the controller
+    has been restarted in the meantime:
+
+    {"type": "changes", "id": "...-12", "changes": {"revision": 12, "parameters": {...}}}
+    """
+
+    def initialize(self, task):
+        self.task = task
+        self.sender = None
+
+    def open(self):
+        _log.debug("ParametersSocketHandler() Open: %s", self.request)
+
+        try:
+            since = _parse_revision(self.get_argument('since', '0'),
+                                    self.task.controller.get_parameters_revision())
+        except APIError as err:
+            self._write_error(None, err)
+            self.close()
+            return
+
+        self.sender = ChangesSender(self.task.broadcaster, self._send_changes,
+                                    since)
+        self.sender.start(self.task.controller.store.view())
+
+    def _send_changes(self, view, changes):
+        try:
+            return self.write_message('{"type": "changes", "id": "%s", "changes": %s}'
+                                      % (_format_revision(view.revision), changes))
+        except tornado.websocket.WebSocketClosedError:
+            self.sender.stop()
+            return None
+
+    def _write_error(self, msg_id, err):
+        self.write_message({
+            "type": "error",
+            "id": msg_id,
+            "code": err.CODE,
+            "reason": str(err)
+        })
+
+    def _decode_message(self, message):
+        """Parse message
+
+        :return: dict with message data
+        """
+        try:
+            msg = json_decode(message)
+        except ValueError:
+            raise InvalidDataError("JSON decoding error")
+
+        if not isinstance(msg, dict):
+            raise InvalidDataError("Unsupported message")
+        return msg
+
+    def _validate_set_message(self, msg):
+        """Validate set-parameters message
+
+        :return: list of parameters to apply
+        """
+        if msg.get('type') != 'set':
+            raise InvalidDataError("Unsupported message type %s" % (msg.get('type')))
+
+        try:
+            params = ParameterCodec(as_set=True).decode_dict(msg.get('parameters'))
+        except ParameterCodecError as perr:
+            raise InvalidDataError(str(perr))
+
+        _validate_parameters(self.task.controller.store, params)
+        return params
+
+    def on_message(self, message):
+        _log.debug("ParametersSocketHandler() Message: %s", message)
+
+        msg_id = None
+        try:
+            msg = self._decode_message(message)
+            msg_id = msg.get('id')
+            params = self._validate_set_message(msg)
+            applied = self.task.controller.apply_parameters(params)
+        except APIError as err:
+            _log.warning("failed to handle message: %s", err)
+            self._write_error(msg_id, err)
+            return
+
+        self.write_message({
+            "type": "applied",
+            "id": msg_id,
+            "parameters": dict((param.name, ParameterCodec.parameter_to_dict(param))
+                               for param in applied)
+        })
+
+    def on_close(self):
+        _log.debug("ParametersSocketHandler() Closed")
+        if self.sender is not None:
+            self.sender.stop()
+
+
 class SnapshotsCaptureHandler(TaskRequestHandler):
     def post(self):
         _log.debug("SnapshotsCaptureHandler() Request: %s", self.request)
@@ -221,12 +810,22 @@ class ServosConnectedHandler(TaskRequestHandler):
 class WebAPITask(TornadoHTTPTask):
     DEFAULT_PORT = 8090
 
+    _broadcaster = None
+    _executor = None
+
     def getApplicationConfig(self):
         return [
             (r"/api/system/version", SystemVersionHandler, dict(task=self)),
             (r"/api/system/status", SystemStatusHandler, dict(task=self)),
             (r"/api/parameters/list", ParametersListHandler, dict(task=self)),
+            (r"/api/parameters/changes", ParametersChangesHandler, dict(task=self)),
+            (r"/api/parameters/history", ParametersHistoryHandler, dict(task=self)),
+            (r"/api/parameters/stream", ParametersStreamHandler, dict(task=self)),
+            (r"/api/parameters/batch", ParametersBatchHandler, dict(task=self)),
+            (r"/api/parameters/simulate", ParametersSimulateHandler, dict(task=self)),
+            (r"/api/parameters/solve", ParametersSolveHandler, dict(task=self)),
             (r"/api/parameters/update", ParametersUpdateHandler, dict(task=self)),
+            (r"/api/parameters/socket", ParametersSocketHandler, dict(task=self)),
             (r"/api/snapshots/list", SnapshotsListHandler, dict(task=self)),
             (r"/api/snapshots/capture", SnapshotsCaptureHandler, dict(task=self)),
             (r"/api/snapshots/(\d)", SnapshotHandler, dict(task=self)),
@@ -243,10 +842,33 @@ class WebAPITask(TornadoHTTPTask):
         self.servo_task = self.service.controller.servo
         _log.debug('servo task: %s', self.servo_task)
 
+    def stop(self):
+        if self._broadcaster is not None:
+            self._broadcaster.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        super(WebAPITask, self).stop()
+
     def get_servo(self):
         """Access servo task"""
         return self.servo_task
 
+    @property
+    def broadcaster(self):
+        """Access broadcaster of parameter changes, created on first use"""
+        if self._broadcaster is None:
+            self._broadcaster = ParametersBroadcaster(self.controller.store)
+        return self._broadcaster
+
+    @property
+    def executor(self):
+        """Access executor of lengthy computations, like batch evaluation,
+        that would otherwise block the IO loop, created on first use. A
+        single worker runs submitted computations one at a time"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
     @property
     def controller(self):
         """Access controller instance"""
@@ -32,8 +32,13 @@ install_requires = [
     'tornado',
     'paho-mqtt',
     'requests',
+    'futures',
 ]
 tests_require = []
+extras_require = {
+    # vectorized batch evaluation
+    'numpy': ['numpy'],
+}
 
 ROOT = os.path.dirname(__file__)
 
@@ -50,6 +55,7 @@ setup(
     description="Ros3D device controller",
     long_description=read("README.rst"),
     install_requires=install_requires,
+    extras_require=extras_require,
     tests_require=tests_require,
     author='OpenRnD',
     author_email='ros3d@open-rnd.pl',
@@ -0,0 +1,233 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Batch evaluation tests"""
+from __future__ import absolute_import, print_function
+import unittest
+import copy
+import mock
+
+from ros3ddevcontroller.param import batch
+from ros3ddevcontroller.param.batch import BatchEvaluator
+from ros3ddevcontroller.param.store import ParametersStore, ParameterLoader
+from ros3ddevcontroller.param.parameter import Parameter, HiddenParameter, Evaluator
+
+
+class BatchEvaluatorTestCase(unittest.TestCase):
+    class BarEvaluator(Evaluator):
+        REQUIRES = [
+            'foo'
+        ]
+
+        def __call__(self, foo=None):
+            return 10.0 / foo
+
+    class BazEvaluator(Evaluator):
+        REQUIRES = [
+            'bar',
+            'qux'
+        ]
+
+        def __call__(self, bar=None, qux=None):
+            return bar + qux
+
+    class CafeEvaluator(Evaluator):
+        REQUIRES = [
+            'qux'
+        ]
+
+        def __call__(self, qux=None):
+            return qux * 2
+
+    PARAMETERS = [
+        Parameter('foo', 1, float),
+        Parameter('qux', 1, int),
+        HiddenParameter('bar', 0, float, evaluator=BarEvaluator),
+        Parameter('baz', 0, float, evaluator=BazEvaluator),
+        Parameter('cafe', 0, int, evaluator=CafeEvaluator),
+        Parameter('other', 'a', str),
+    ]
+
+    def setUp(self):
+        self.store = ParametersStore()
+        self.store.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.batch = BatchEvaluator(self.store)
+
+    def _expected(self, inputs):
+        """Evaluate expected values by setting inputs in a fresh store"""
+        store = ParametersStore()
+        store.SKIP_UNCHANGED = False
+        store.load_parameters(copy.deepcopy(self.PARAMETERS))
+        store.set_many(inputs)
+        return store
+
+    def test_product(self):
+        res = self.batch.evaluate([('foo', [1.0, 2.0, 4.0]), ('qux', [1, 2])])
+
+        # hidden parameters are not part of the result
+        self.assertEqual(sorted(res.keys()), ['baz', 'cafe', 'foo', 'qux'])
+        self.assertEqual(res['foo'], [1.0, 1.0, 2.0, 2.0, 4.0, 4.0])
+        self.assertEqual(res['qux'], [1, 2, 1, 2, 1, 2])
+        self.assertEqual(res['baz'], [11.0, 12.0, 6.0, 7.0, 3.5, 4.5])
+        self.assertEqual(res['cafe'], [2, 4, 2, 4, 2, 4])
+
+        for row in range(6):
+            store = self._expected([('foo', res['foo'][row]),
+                                    ('qux', res['qux'][row])])
+            for name in ['baz', 'cafe']:
+                self.assertEqual(res[name][row], store.get_value(name))
+
+    def test_zip(self):
+        res = self.batch.evaluate({'foo': [1.0, 2.0], 'qux': [3, 4]},
+                                  outputs=['baz'], mode=BatchEvaluator.MODE_ZIP)
+        self.assertEqual(res, {
+            'foo': [1.0, 2.0],
+            'qux': [3, 4],
+            'baz': [13.0, 9.0],
+        })
+
+        self.assertRaises(ValueError, self.batch.evaluate,
+                          [('foo', [1.0, 2.0]), ('qux', [1])],
+                          mode=BatchEvaluator.MODE_ZIP)
+
+    def test_empty(self):
+        res = self.batch.evaluate([('foo', []), ('qux', [1, 2])], outputs=['baz'])
+        self.assertEqual(res, {'foo': [], 'qux': [], 'baz': []})
+
+    def test_convert(self):
+        res = self.batch.evaluate([('foo', [2])], outputs=['baz'])
+        self.assertEqual(res['foo'], [2.0])
+        self.assertIsInstance(res['foo'][0], float)
+
+        self.assertRaises(ValueError, self.batch.evaluate, [('qux', ['x'])])
+
+    def test_failed(self):
+        self.store.set('foo', 5.0)
+
+        # division by 0 in hidden parameter, dependants keep current value
+        res = self.batch.evaluate([('foo', [0.0, 2.0, 0.0])], outputs=['baz'])
+        self.assertEqual(res['baz'], [3.0, 6.0, 3.0])
+
+        for row in range(3):
+            store = self._expected([('foo', 5.0)])
+            store.set('foo', res['foo'][row])
+            self.assertEqual(res['baz'][row], store.get_value('baz'))
+
+    def test_errors(self):
+        self.assertRaises(KeyError, self.batch.evaluate, [('missing', [1])])
+        self.assertRaises(KeyError, self.batch.evaluate, [('foo', [1.0])],
+                          outputs=['missing'])
+        # hidden parameters cannot be requested
+        self.assertRaises(KeyError, self.batch.evaluate, [('foo', [1.0])],
+                          outputs=['bar'])
+        self.assertRaises(ValueError, self.batch.evaluate, [('foo', [1.0])],
+                          mode='other')
+
+        with mock.patch.object(BatchEvaluator, 'MAX_ROWS', 5):
+            self.assertRaises(ValueError, self.batch.evaluate,
+                              [('foo', [1.0, 2.0, 3.0]), ('qux', [1, 2])])
+
+    def test_store_unchanged(self):
+        revision = self.store.revision()
+        before = self.store.parameters_as_dict()
+
+        self.batch.evaluate([('foo', [2.0, 4.0]), ('qux', [5, 6])])
+
+        self.assertEqual(self.store.revision(), revision)
+        self.assertEqual(self.store.parameters_as_dict(), before)
+
+    def test_as_arrays(self):
+        res = self.batch.evaluate([('foo', [1.0, 2.0])], outputs=['baz'])
+
+        with mock.patch.object(batch, 'numpy', None):
+            self.assertRaises(RuntimeError, BatchEvaluator.as_arrays, res)
+
+        if batch.numpy is not None:
+            arrays = BatchEvaluator.as_arrays(res)
+            self.assertEqual(list(arrays['baz']), res['baz'])
+
+
+class RowBatchEvaluatorTestCase(BatchEvaluatorTestCase):
+    """Same as BatchEvaluatorTestCase, without NumPy"""
+
+    def setUp(self):
+        super(RowBatchEvaluatorTestCase, self).setUp()
+        patcher = mock.patch.object(batch, 'numpy', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+@unittest.skipIf(batch.numpy is None, 'NumPy is not available')
+class VectorizedBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.store = ParametersStore()
+        ParameterLoader.load(store=self.store)
+        self.store.set('focal_length_mm', 25.0)
+        self.store.set('sensor_width_mm', 24.0)
+        self.store.set('coc_px', 1.5)
+
+    def _compare(self, inputs, outputs=None):
+        res = BatchEvaluator(self.store).evaluate(inputs, outputs)
+        with mock.patch.object(batch, 'numpy', None):
+            expected = BatchEvaluator(self.store).evaluate(inputs, outputs)
+
+        self.assertEqual(sorted(res.keys()), sorted(expected.keys()))
+        for name, column in expected.items():
+            for value, expected_value in zip(res[name], column):
+                if expected_value != expected_value:
+                    # NaN
+                    self.assertNotEqual(value, value)
+                else:
+                    self.assertAlmostEqual(value, expected_value, msg=name)
+        return res
+
+    def test_dof(self):
+        inf = float('inf')
+        res = self._compare([('focal_length_mm', [0.0, 20.0, 35.0, inf]),
+                             ('focus_distance_m', [0.0, 1.0, 20.0, 1e6, inf]),
+                             ('coc_px', [0.0, 1.5])],
+                            ['dof_near_m', 'dof_far_m', 'dof_total_m'])
+        self.assertEqual(len(res['dof_far_m']), 40)
+
+        # hyperfocal distance fails to evaluate
+        self._compare([('sensor_width_px', [0, 5120]),
+                       ('focus_distance_m', [1.0, inf])])
+
+    def test_parallax(self):
+        self._compare([('baseline_mm', [0.0, 50.0, 80.0]),
+                       ('distance_screen_m', [0.0, 2.0, 5.0]),
+                       ('distance_far_m', [0.0, 1.0, 6.0, float('inf')])])
+        self._compare([('interpupillary_distance_mm', [0.0, 65.0]),
+                       ('frame_width_px', [0, 2048, 4096])])
+
+    def test_vectorized(self):
+        inputs = [('focal_length_mm', [20.0, 35.0]),
+                  ('focus_distance_m', [1.0, 5.0])]
+        with mock.patch.object(ParametersStore, '_evaluate_params') as eval_mock, \
+             mock.patch('ros3ddevcontroller.param.evaluators.DofFarCalc.__call__') as call_mock:
+            res = BatchEvaluator(self.store).evaluate(inputs, ['dof_far_m'])
+
+        # evaluated as a whole column
+        self.assertFalse(call_mock.called)
+        self.assertFalse(eval_mock.called)
+        self.assertEqual(len(res['dof_far_m']), 4)
@@ -0,0 +1,133 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Parameters broadcaster tests"""
+from __future__ import absolute_import, print_function
+import unittest
+import copy
+import json
+import mock
+import threading
+
+from tornado.ioloop import IOLoop
+from tornado.concurrent import Future
+
+from ros3ddevcontroller.web.broadcast import ParametersBroadcaster, ChangesSender
+from ros3ddevcontroller.param.store import ParametersStore
+from ros3ddevcontroller.param.parameter import Parameter
+
+
+class BroadcasterTestCase(unittest.TestCase):
+    PARAMETERS = [
+        Parameter('foo', 1, int),
+        Parameter('bar', 'a', str),
+    ]
+
+    def setUp(self):
+        self.store = ParametersStore()
+        self.store.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.ioloop = IOLoop()
+        self.broadcaster = ParametersBroadcaster(self.store, self.ioloop)
+
+    def tearDown(self):
+        self.broadcaster.close()
+        self.ioloop.close()
+
+    def run_loop(self):
+        """Run pending callbacks of the loop"""
+        self.ioloop.add_callback(self.ioloop.stop)
+        self.ioloop.start()
+
+    def test_subscribe(self):
+        subscriber = mock.Mock()
+        self.broadcaster.subscribe(subscriber)
+        self.assertEqual(len(self.store.change_listeners.handlers('foo')), 1)
+
+        # changes made in other threads are coalesced
+        def update():
+            for value in range(2, 10):
+                self.store.set('foo', value)
+        thread = threading.Thread(target=update)
+        thread.start()
+        thread.join()
+
+        self.run_loop()
+        subscriber.assert_called_once_with(self.store.view())
+        self.assertEqual(subscriber.call_args[0][0].get('foo').value, 9)
+
+        self.broadcaster.unsubscribe(subscriber)
+        self.assertEqual(self.store.change_listeners.handlers('foo'), [])
+
+        self.store.set('foo', 1)
+        self.run_loop()
+        self.assertEqual(subscriber.call_count, 1)
+
+    def test_changes_as_json(self):
+        start = self.store.revision()
+        self.store.set('bar', 'b')
+        view = self.store.view()
+
+        encoded = self.broadcaster.changes_as_json(view, start)
+        self.assertEqual(json.loads(encoded), {
+            'revision': view.revision,
+            'parameters': {'bar': view.as_dict()['bar']}
+        })
+        # encoded changes are shared for the same view and revision
+        self.assertIs(self.broadcaster.changes_as_json(view, start), encoded)
+
+    def test_sender(self):
+        futures = []
+
+        def send(view, changes):
+            futures.append(Future())
+            return futures[-1]
+        send = mock.Mock(side_effect=send)
+
+        start = self.store.revision()
+        sender = ChangesSender(self.broadcaster, send, start)
+        sender.start(self.store.view())
+        # client is up to date
+        send.assert_not_called()
+
+        self.store.set('foo', 2)
+        self.run_loop()
+        self.assertEqual(send.call_count, 1)
+        self.assertTrue(sender.busy())
+
+        # changes made while sending are postponed and coalesced
+        self.store.set('foo', 3)
+        self.run_loop()
+        self.store.set('bar', 'b')
+        self.run_loop()
+        self.assertEqual(send.call_count, 1)
+
+        futures[0].set_result(None)
+        self.assertEqual(send.call_count, 2)
+        view, changes = send.call_args[0]
+        self.assertEqual(view, self.store.view())
+        self.assertEqual(sorted(json.loads(changes)['parameters'].keys()),
+                         ['bar', 'foo'])
+
+        # failed send stops the sender
+        futures[1].set_exception(IOError('closed'))
+        self.assertFalse(sender.busy())
+        self.assertEqual(self.broadcaster.subscribers, [])
@@ -174,6 +174,14 @@ class CodecTestCase(unittest.TestCase):
         self.assertEqual(dec['foo-min']['value'], Infinity.MINUS)
         self.assertEqual(dec['foo-other']['value'], 20e10)
 
+    def test_encode_json_member(self):
+        p = Parameter('foo', float('inf'), float)
+
+        encoded = ParameterCodec.parameter_to_json(p)
+        dec = json.loads('{' + encoded + '}')
+        self.assertEqual(dec, {'foo': ParameterCodec.parameter_to_dict(p)})
+        self.assertEqual(dec['foo']['value'], Infinity.PLUS)
+
     @staticmethod
     def find_param_in_list(params_list, name):
         """Helper for locating parameter of name `name` in list of Parameter
@@ -23,11 +23,13 @@
 """ParameterCodec tests"""
 from __future__ import absolute_import, print_function
 import unittest
+import mock
+import copy
 import os.path
 
 from ros3ddevcontroller.controller import Controller
 from ros3ddevcontroller.param.store import ParametersStore
-from ros3ddevcontroller.param.parameter import Parameter, ReadOnlyParameter
+from ros3ddevcontroller.param.parameter import Parameter, ReadOnlyParameter, Evaluator
 
 
 class ControllerTestCase(unittest.TestCase):
@@ -61,11 +63,49 @@ class ParmetersGetTestCase(ControllerTestCase):
 
         self.assertFalse(dict_params.has_key('foo-not-present'))
 
+    def test_get_changed(self):
+        revision = ParametersStore.revision()
+
+        changes = self.ctrl.get_changed_parameters(revision)
+        self.assertEqual(changes, {'revision': revision, 'parameters': {}})
+
+        ParametersStore.set('foo-writable', 'baz')
+        changes = self.ctrl.get_changed_parameters(revision)
+        self.assertEqual(changes['revision'], revision + 1)
+        self.assertEqual(changes['parameters'].keys(), ['foo-writable'])
+        self.assertEqual(changes['parameters']['foo-writable']['value'], 'baz')
+
+    def test_get_selected(self):
+        params = self.ctrl.get_selected_parameters(names=['foo-readonly'])
+        self.assertEqual(params.keys(), ['foo-readonly'])
+        self.assertEqual(params['foo-readonly'], self.ctrl.get_parameters()['foo-readonly'])
+
+        params = self.ctrl.get_selected_parameters(fields=['value'])
+        self.assertEqual(params, {
+            'foo-writable': {'value': ParametersStore.get_value('foo-writable')},
+            'foo-readonly': {'value': 'baz'}
+        })
+
+        self.assertRaises(ValueError, self.ctrl.get_selected_parameters,
+                          fields=['value', 'other'])
+
+    def test_get_revision(self):
+        revision = self.ctrl.get_parameters_revision()
+        self.assertEqual(revision, ParametersStore.revision())
+
+        # setting the same value does not change the revision
+        ParametersStore.set('foo-writable', ParametersStore.get_value('foo-writable'))
+        self.assertEqual(self.ctrl.get_parameters_revision(), revision)
+
+        ParametersStore.set('foo-writable', 'other')
+        self.assertEqual(self.ctrl.get_parameters_revision(), revision + 1)
+
 
 class ParametersApplyTestCase(ControllerTestCase):
     PARAMETERS = [
         Parameter('foo-writable', 'bar', str),
-        ReadOnlyParameter('foo-readonly', 'baz', str)
+        ReadOnlyParameter('foo-readonly', 'baz', str),
+        Parameter('bar-writable', 'bar', str)
     ]
 
     def test_apply(self):
@@ -87,6 +127,39 @@ class ParametersApplyTestCase(ControllerTestCase):
         # readonly remains unchanged
         self.assertEqual(ParametersStore.get('foo-readonly').value, 'baz')
 
+    def test_apply_many(self):
+
+        to_apply = [
+            Parameter('foo-writable', 'test', str),
+            Parameter('foo-readonly', 'test2', str),
+            Parameter('bar-writable', 'test3', str)
+        ]
+
+        with mock.patch.object(ParametersStore, 'set_many',
+                               wraps=ParametersStore.set_many) as set_mock:
+            applied = self.ctrl.apply_parameters(to_apply)
+
+        # writable parameters were set in one go
+        set_mock.assert_called_once_with([('foo-writable', 'test'),
+                                          ('bar-writable', 'test3')])
+        self.assertEqual([p.name for p in applied],
+                         ['foo-writable', 'bar-writable'])
+        self.assertEqual(ParametersStore.get('bar-writable').value, 'test3')
+
+    def test_apply_store(self):
+        store = ParametersStore()
+        store.load_parameters(copy.deepcopy(self.PARAMETERS))
+        ctrl = Controller(store=store)
+        default_value = ParametersStore.get('foo-writable').value
+
+        applied = ctrl.apply_parameters([Parameter('foo-writable', 'other', str)])
+        self.assertEqual([p.name for p in applied], ['foo-writable'])
+
+        # only the controller's store was modified
+        self.assertEqual(store.get('foo-writable').value, 'other')
+        self.assertEqual(ParametersStore.get('foo-writable').value,
+                         default_value)
+
 
 class SnapshotsSetupTestCase(ControllerTestCase):
     def test_snapshots_location(self):
@@ -193,3 +266,50 @@ class SnapshotsTestCase(SnapshotTestCaseBase):
         for param in snap:
             if param.name == 'foo-writable':
                 self.assertEqual(param.value, 'test')
+
+
+class SimulateTestCase(ControllerTestCase):
+    class BarEvaluator(Evaluator):
+        REQUIRES = [
+            'foo'
+        ]
+
+        def __call__(self, foo=None):
+            return foo * 2.0
+
+    PARAMETERS = [
+        ReadOnlyParameter('foo', 1, float),
+        Parameter('bar', 0, float, evaluator=BarEvaluator),
+        Parameter('baz', 'a', str),
+    ]
+
+    def test_simulate(self):
+        listener = mock.Mock()
+        ParametersStore.change_listeners.add(listener)
+
+        # read-only parameters can be simulated too
+        result = self.ctrl.simulate([Parameter('foo', 3, int)])
+        self.assertEqual(dict((p.name, p.value) for p in result['parameters']),
+                         {'foo': 3.0, 'bar': 6.0})
+        self.assertNotIn('batch', result)
+
+        # store was not modified and listeners were not notified
+        self.assertEqual(ParametersStore.get_value('foo'), 1.0)
+        listener.assert_not_called()
+        ParametersStore.change_listeners.remove(listener)
+
+        result = self.ctrl.simulate([Parameter('baz', 'b', str)],
+                                    outputs=['bar'])
+        self.assertEqual([p.name for p in result['parameters']], ['bar'])
+
+        self.assertRaises(KeyError, self.ctrl.simulate,
+                          [Parameter('missing', 1, int)])
+
+    def test_simulate_ranges(self):
+        result = self.ctrl.simulate([Parameter('baz', 'b', str)],
+                                    ranges=[('foo', [1.0, 2.0, 5.0])])
+        self.assertEqual(result['batch'], {
+            'foo': [1.0, 2.0, 5.0],
+            'bar': [2.0, 4.0, 10.0]
+        })
+        self.assertEqual(ParametersStore.get_value('baz'), 'a')
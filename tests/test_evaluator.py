@@ -81,3 +81,27 @@ class EvaluationTestCase(unittest.TestCase):
 
         real_height_near_m = ParametersStore.get_value('real_height_near_m')
         self.assertEquals(round(real_height_near_m, 2), 0.46)
+
+    def test_dof_focus_infinity(self):
+
+        ParametersStore.set('focal_length_mm', 35, evaluate=False)
+        ParametersStore.set('aperture', 2.8, evaluate=False)
+        ParametersStore.set('frame_width_px', 4096, evaluate=False)
+        ParametersStore.set('sensor_width_px', 5120, evaluate=False)
+        ParametersStore.set('focus_distance_m', float('inf'), evaluate=False)
+
+        ParametersStore.set('coc_um', 30, evaluate=True)
+
+        self.assertEquals(ParametersStore.get_value('dof_far_m'), float('inf'))
+        # hyperfocal distance uses ratio of frame to sensor width
+        dof_near_m = ParametersStore.get_value('dof_near_m')
+        self.assertEquals(round(dof_near_m, 2), 18.23)
+
+        # far limit does not need hyperfocal distance when focused at
+        # infinity, even if it cannot be evaluated
+        ParametersStore.set('dof_far_m', 0, evaluate=False)
+        ParametersStore.set('sensor_width_px', 0, evaluate=True)
+        self.assertEquals(ParametersStore.get_value('dof_far_m'), float('inf'))
+        self.assertEquals(ParametersStore.get_value('dof_near_m'), dof_near_m)
+
+        ParametersStore.set('sensor_width_px', 5120, evaluate=True)
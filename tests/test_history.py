@@ -0,0 +1,119 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Parameter history tests"""
+from __future__ import absolute_import, print_function
+import unittest
+import copy
+
+from ros3ddevcontroller.param.history import ParameterHistory
+from ros3ddevcontroller.param.store import ParametersStore
+from ros3ddevcontroller.param.parameter import Parameter, Evaluator
+
+
+class ParameterHistoryTestCase(unittest.TestCase):
+    def test_append(self):
+        history = ParameterHistory(4, int)
+        self.assertEqual(history.samples(), [])
+
+        for ts in range(1, 4):
+            history.append(float(ts), ts * 10)
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history.samples(), [(1.0, 10), (2.0, 20), (3.0, 30)])
+        self.assertIsInstance(history.samples()[0][1], int)
+
+        # same value is not recorded again
+        history.append(4.0, 30)
+        self.assertEqual(len(history), 3)
+
+    def test_wrap(self):
+        history = ParameterHistory(3)
+        for ts in range(1, 8):
+            history.append(float(ts), ts / 2.0)
+
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history.samples(), [(5.0, 2.5), (6.0, 3.0), (7.0, 3.5)])
+        # buffers are never resized
+        self.assertEqual(len(history.values), 3)
+        self.assertEqual(len(history.timestamps), 3)
+
+    def test_since(self):
+        history = ParameterHistory(4)
+        for ts in range(1, 7):
+            history.append(float(ts), float(ts))
+
+        self.assertEqual([ts for ts, _ in history.samples(since=4.5)], [5.0, 6.0])
+        self.assertEqual([ts for ts, _ in history.samples(since=4.0)],
+                         [4.0, 5.0, 6.0])
+        self.assertEqual(history.samples(since=1.0), history.samples())
+        self.assertEqual(history.samples(since=7.0), [])
+
+
+class StoreHistoryTestCase(unittest.TestCase):
+    class BarEvaluator(Evaluator):
+        REQUIRES = [
+            'foo'
+        ]
+
+        def __call__(self, foo=None):
+            return foo * 2.0
+
+    PARAMETERS = [
+        Parameter('foo', 1, int),
+        Parameter('bar', 0, float, evaluator=BarEvaluator),
+        Parameter('baz', 'a', str),
+    ]
+
+    def setUp(self):
+        ParametersStore.enable_history(10)
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+        ParametersStore.enable_history(0)
+
+    def test_history(self):
+        ParametersStore.set('foo', 2)
+        ParametersStore.set('foo', 3)
+
+        self.assertEqual([v for _, v in ParametersStore.history('foo')], [1, 2, 3])
+        # evaluated parameters are recorded too
+        self.assertEqual([v for _, v in ParametersStore.history('bar')],
+                         [0.0, 4.0, 6.0])
+
+        samples = ParametersStore.history('foo')
+        self.assertEqual(ParametersStore.history('foo', since=samples[-1][0])[-1],
+                         samples[-1])
+
+        # history is kept only for numeric parameters
+        self.assertRaises(KeyError, ParametersStore.history, 'baz')
+
+    def test_enable(self):
+        ParametersStore.enable_history(0)
+        self.assertRaises(KeyError, ParametersStore.history, 'foo')
+
+        ParametersStore.set('foo', 2)
+        ParametersStore.enable_history(2)
+        self.assertEqual([v for _, v in ParametersStore.history('foo')], [2])
+        ParametersStore.set('foo', 3)
+        ParametersStore.set('foo', 4)
+        self.assertEqual([v for _, v in ParametersStore.history('foo')], [3, 4])
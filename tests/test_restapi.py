@@ -0,0 +1,432 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""REST API handlers tests"""
+from __future__ import absolute_import, print_function
+import copy
+import json
+import mock
+
+import tornado.gen
+import tornado.web
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.testing import AsyncHTTPTestCase, gen_test
+from tornado.websocket import websocket_connect
+
+from ros3ddevcontroller.web import restapi
+from ros3ddevcontroller.web.broadcast import ParametersBroadcaster
+from ros3ddevcontroller.controller import Controller
+from ros3ddevcontroller.param.store import ParametersStore
+from ros3ddevcontroller.param.parameter import Parameter, Evaluator
+
+
+class Task(object):
+    """Stand-in for WebAPITask"""
+
+    def __init__(self, controller, broadcaster):
+        self.controller = controller
+        self.broadcaster = broadcaster
+
+
+class HandlerTestCase(AsyncHTTPTestCase):
+    PARAMETERS = [
+        Parameter('foo', 1, int),
+        Parameter('bar', 'a', str),
+    ]
+
+    # number of samples of history kept, 0 if disabled
+    HISTORY_SIZE = 0
+
+    def get_app(self):
+        # controller owns a store separate from the default one
+        self.store = ParametersStore()
+        self.store.enable_history(self.HISTORY_SIZE)
+        self.store.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.task = Task(Controller(store=self.store),
+                         ParametersBroadcaster(self.store, self.io_loop))
+        return tornado.web.Application([
+            (r"/api/parameters/list", restapi.ParametersListHandler,
+             dict(task=self.task)),
+            (r"/api/parameters/changes", restapi.ParametersChangesHandler,
+             dict(task=self.task)),
+            (r"/api/parameters/update", restapi.ParametersUpdateHandler,
+             dict(task=self.task)),
+            (r"/api/parameters/stream", restapi.ParametersStreamHandler,
+             dict(task=self.task)),
+            (r"/api/parameters/socket", restapi.ParametersSocketHandler,
+             dict(task=self.task)),
+            (r"/api/parameters/history", restapi.ParametersHistoryHandler,
+             dict(task=self.task)),
+            (r"/api/parameters/solve", restapi.ParametersSolveHandler,
+             dict(task=self.task)),
+        ])
+
+    def tearDown(self):
+        self.task.broadcaster.close()
+        super(HandlerTestCase, self).tearDown()
+
+    @tornado.gen.coroutine
+    def wait_for(self, condition):
+        """Wait until `condition` returns True"""
+        while not condition():
+            yield tornado.gen.sleep(0.01)
+
+
+class ListHandlerTestCase(HandlerTestCase):
+
+    def get_list(self, query=''):
+        resp = self.fetch('/api/parameters/list' + query)
+        self.assertEqual(resp.code, 200)
+        return json.loads(resp.body)
+
+    def test_select(self):
+        params = self.get_list('?names=foo&fields=value')
+        self.assertEqual(params, {'foo': {'value': 1}})
+
+    def test_select_empty(self):
+        # empty arguments are the same as no arguments
+        full = self.get_list()
+        self.assertEqual(sorted(full.keys()), ['bar', 'foo'])
+        for query in ['?fields=', '?names=', '?names=&groups=&fields=,']:
+            self.assertEqual(self.get_list(query), full)
+
+
+    def test_etag(self):
+        for query in ['', '?names=foo&fields=value']:
+            url = '/api/parameters/list' + query
+            resp = self.fetch(url)
+            self.assertEqual(resp.code, 200)
+            etag = resp.headers['ETag']
+            self.assertEqual(etag, '"%s"' % (
+                restapi._format_revision(self.store.revision())))
+
+            # nothing changed
+            resp = self.fetch(url, headers={'If-None-Match': etag})
+            self.assertEqual(resp.code, 304)
+            self.assertEqual(resp.headers['ETag'], etag)
+
+            # parameters modified, new tag
+            self.store.set('foo', self.store.get_value('foo') + 1)
+            resp = self.fetch(url, headers={'If-None-Match': etag})
+            self.assertEqual(resp.code, 200)
+            self.assertNotEqual(resp.headers['ETag'], etag)
+            self.assertEqual(json.loads(resp.body)['foo']['value'],
+                             self.store.get_value('foo'))
+
+    def test_etag_restarted(self):
+        # tag of a controller that has been restarted since
+        resp = self.fetch('/api/parameters/list', headers={
+            'If-None-Match': '"0-%d"' % (self.store.revision())})
+        self.assertEqual(resp.code, 200)
+
+
+class UpdateHandlerTestCase(HandlerTestCase):
+
+    def update(self, req):
+        return self.fetch('/api/parameters/update', method='PUT',
+                          body=json.dumps(req))
+
+    def test_update(self):
+        # parameters are validated against store of the controller,
+        # not known to the default store
+        self.assertRaises(KeyError, ParametersStore.get, 'foo')
+
+        resp = self.update({'foo': {'value': 5}})
+        self.assertEqual(resp.code, 200)
+        self.assertEqual(json.loads(resp.body)['foo']['value'], 5)
+        self.assertEqual(self.store.get_value('foo'), 5)
+
+    def test_update_invalid(self):
+        for req in [{'baz': {'value': 1}}, {'foo': {'value': 'x'}}]:
+            resp = self.update(req)
+            self.assertEqual(resp.code, 400)
+        self.assertEqual(self.store.get_value('foo'), 1)
+
+
+class ChangesHandlerTestCase(HandlerTestCase):
+
+    def get_changes(self, since=None):
+        url = '/api/parameters/changes'
+        if since is not None:
+            url += '?since=' + since
+        resp = self.fetch(url)
+        self.assertEqual(resp.code, 200)
+        return json.loads(resp.body)
+
+    def test_changes(self):
+        changes = self.get_changes()
+        self.assertEqual(sorted(changes['parameters'].keys()), ['bar', 'foo'])
+        self.assertEqual(changes['revision'],
+                         restapi._format_revision(self.store.revision()))
+
+        self.store.set('foo', 2)
+        changes = self.get_changes(changes['revision'])
+        self.assertEqual(changes['parameters'].keys(), ['foo'])
+        self.assertEqual(changes['revision'],
+                         restapi._format_revision(self.store.revision()))
+
+        changes = self.get_changes(changes['revision'])
+        self.assertEqual(changes['parameters'], {})
+
+    def test_changes_restarted(self):
+        # revision of a controller that has been restarted since, or
+        # from before revisions were qualified
+        for since in ['0-%d' % (self.store.revision()), '999999',
+                      restapi._format_revision(self.store.revision() + 10)]:
+            changes = self.get_changes(since)
+            self.assertEqual(sorted(changes['parameters'].keys()),
+                             ['bar', 'foo'])
+
+    def test_invalid(self):
+        resp = self.fetch('/api/parameters/changes?since=x')
+        self.assertEqual(resp.code, 400)
+
+
+class StreamHandlerTestCase(HandlerTestCase):
+
+    def _events(self, chunks):
+        """Parse server-sent events received so far"""
+        events = []
+        for block in ''.join(chunks).split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.split('\n')
+                          if ': ' in line)
+            if 'data' in fields:
+                events.append((fields['id'], json.loads(fields['data'])))
+        return events
+
+    @tornado.gen.coroutine
+    def _stream(self, headers=None, events=1, url='/api/parameters/stream'):
+        """Open stream and wait for `events` events, then call
+        self.store.set('foo', ...) and wait for one more event"""
+        client = AsyncHTTPClient(force_instance=True)
+        chunks = []
+        client.fetch(HTTPRequest(self.get_url(url), headers=headers,
+                                 streaming_callback=chunks.append,
+                                 request_timeout=5),
+                     raise_error=False)
+
+        yield self.wait_for(lambda: len(self._events(chunks)) == events and
+                            self.task.broadcaster.subscribers)
+        self.store.set('foo', self.store.get_value('foo') + 1)
+        yield self.wait_for(lambda: len(self._events(chunks)) == events + 1)
+
+        client.close()
+        raise tornado.gen.Return(self._events(chunks))
+
+    @gen_test
+    def test_stream(self):
+        events = yield self._stream()
+
+        # all parameters first, then changes
+        event_id, data = events[0]
+        self.assertEqual(sorted(data['parameters'].keys()), ['bar', 'foo'])
+        self.assertEqual(event_id, restapi._format_revision(data['revision']))
+
+        event_id, data = events[1]
+        self.assertEqual(data['parameters'].keys(), ['foo'])
+        self.assertEqual(data['revision'], self.store.revision())
+        self.assertEqual(event_id, restapi._format_revision(self.store.revision()))
+
+    @gen_test
+    def test_resume(self):
+        last_id = restapi._format_revision(self.store.revision())
+        events = yield self._stream(headers={'Last-Event-ID': last_id}, events=0)
+        self.assertEqual(events[0][1]['parameters'].keys(), ['foo'])
+
+    @gen_test
+    def test_resume_restarted(self):
+        # revision of a controller that has been restarted since, or
+        # from before revisions were qualified
+        for last_id in ['0-%d' % (self.store.revision()),
+                        str(self.store.revision())]:
+            events = yield self._stream(headers={'Last-Event-ID': last_id})
+            self.assertEqual(sorted(events[0][1]['parameters'].keys()),
+                             ['bar', 'foo'])
+
+    def test_invalid(self):
+        resp = self.fetch('/api/parameters/stream?since=x')
+        self.assertEqual(resp.code, 400)
+        self.assertEqual(json.loads(resp.body)['code'],
+                         restapi.APIError.ERROR_INVALID_DATA)
+
+
+class SocketHandlerTestCase(HandlerTestCase):
+
+    @tornado.gen.coroutine
+    def _connect(self, since=None):
+        url = self.get_url('/api/parameters/socket').replace('http', 'ws', 1)
+        if since is not None:
+            url += '?since=' + since
+        conn = yield websocket_connect(url)
+        raise tornado.gen.Return(conn)
+
+    @tornado.gen.coroutine
+    def _read(self, conn):
+        msg = yield conn.read_message()
+        raise tornado.gen.Return(json.loads(msg))
+
+    @gen_test
+    def test_set(self):
+        conn = yield self._connect()
+
+        # all parameters first
+        msg = yield self._read(conn)
+        self.assertEqual(msg['type'], 'changes')
+        self.assertEqual(sorted(msg['changes']['parameters'].keys()),
+                         ['bar', 'foo'])
+        self.assertEqual(msg['id'],
+                         restapi._format_revision(msg['changes']['revision']))
+
+        conn.write_message(json.dumps({
+            'type': 'set',
+            'id': 1,
+            'parameters': {'foo': {'value': 5}}
+        }))
+
+        msg = yield self._read(conn)
+        self.assertEqual(msg['type'], 'applied')
+        self.assertEqual(msg['id'], 1)
+        self.assertEqual(msg['parameters']['foo']['value'], 5)
+
+        msg = yield self._read(conn)
+        self.assertEqual(msg['type'], 'changes')
+        self.assertEqual(msg['changes']['parameters'].keys(), ['foo'])
+        self.assertEqual(msg['id'], restapi._format_revision(self.store.revision()))
+        self.assertEqual(self.store.get_value('foo'), 5)
+
+        # unsubscribed once closed
+        conn.close()
+        yield self.wait_for(lambda: not self.task.broadcaster.subscribers)
+
+    @gen_test
+    def test_set_invalid(self):
+        conn = yield self._connect()
+        yield self._read(conn)
+
+        for message in ['x', '[]',
+                        json.dumps({'type': 'get', 'id': 2}),
+                        json.dumps({'type': 'set', 'id': 2,
+                                    'parameters': {'baz': {'value': 1}}})]:
+            conn.write_message(message)
+            msg = yield self._read(conn)
+            self.assertEqual(msg['type'], 'error')
+            self.assertEqual(msg['code'], restapi.APIError.ERROR_INVALID_DATA)
+
+        self.assertEqual(msg['id'], 2)
+        conn.close()
+
+    @gen_test
+    def test_since(self):
+        revision = self.store.revision()
+        conn = yield self._connect(since=restapi._format_revision(revision))
+
+        self.store.set('foo', 2)
+        msg = yield self._read(conn)
+        self.assertEqual(msg['changes']['parameters'].keys(), ['foo'])
+        conn.close()
+
+        # revision from a restarted controller
+        conn = yield self._connect(since='0-%d' % (revision))
+        msg = yield self._read(conn)
+        self.assertEqual(sorted(msg['changes']['parameters'].keys()),
+                         ['bar', 'foo'])
+        conn.close()
+
+    @gen_test
+    def test_since_invalid(self):
+        conn = yield self._connect(since='x')
+        msg = yield self._read(conn)
+        self.assertEqual(msg['type'], 'error')
+        self.assertEqual(msg['code'], restapi.APIError.ERROR_INVALID_DATA)
+
+        # connection is closed by the server
+        msg = yield conn.read_message()
+        self.assertIsNone(msg)
+
+
+class HistoryHandlerTestCase(HandlerTestCase):
+    HISTORY_SIZE = 20
+
+    def test_history(self):
+        for value in range(2, 12):
+            self.store.set('foo', value)
+
+        # samples span a couple of chunks
+        with mock.patch.object(restapi.ParametersHistoryHandler,
+                               'CHUNK_SAMPLES', 3):
+            resp = self.fetch('/api/parameters/history?name=foo')
+
+        self.assertEqual(resp.code, 200)
+        history = json.loads(resp.body)
+        self.assertEqual(history['name'], 'foo')
+        self.assertEqual([value for _, value in history['samples']],
+                         list(range(1, 12)))
+
+    def test_history_invalid(self):
+        for url in ['/api/parameters/history',
+                    '/api/parameters/history?name=bar',
+                    '/api/parameters/history?name=foo&from=x']:
+            resp = self.fetch(url)
+            self.assertEqual(resp.code, 400)
+
+
+class SolveHandlerTestCase(HandlerTestCase):
+    class ScaleEvaluator(Evaluator):
+        REQUIRES = [
+            'scale'
+        ]
+
+        def __call__(self, scale=None):
+            return scale * 2.0
+
+    PARAMETERS = HandlerTestCase.PARAMETERS + [
+        Parameter('scale', 1.0, float),
+        Parameter('scaled', 2.0, float, evaluator=ScaleEvaluator),
+    ]
+
+    def solve(self, req):
+        return self.fetch('/api/parameters/solve', method='POST',
+                          body=json.dumps(req))
+
+    def test_solve(self):
+        resp = self.solve({'target': 'scaled', 'value': 6.0,
+                           'variable': 'scale'})
+        self.assertEqual(resp.code, 200)
+        self.assertAlmostEqual(json.loads(resp.body)['value'], 3.0)
+
+    def test_solve_invalid(self):
+        for req in [
+                # target is not evaluated
+                {'target': 'foo', 'value': 1.0, 'variable': 'scale'},
+                # target does not depend on variable
+                {'target': 'scaled', 'value': 1.0, 'variable': 'foo'},
+                {'target': 'missing', 'value': 1.0, 'variable': 'scale'},
+        ]:
+            resp = self.solve(req)
+            self.assertEqual(resp.code, 400)
+            self.assertEqual(json.loads(resp.body)['code'],
+                             restapi.APIError.ERROR_INVALID_DATA)
+
+    def test_solve_not_found(self):
+        resp = self.solve({'target': 'scaled', 'value': 6.0,
+                           'variable': 'scale', 'range': [10.0, 20.0]})
+        self.assertEqual(resp.code, 500)
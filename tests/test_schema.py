@@ -0,0 +1,217 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""ParameterSchema tests"""
+from __future__ import absolute_import
+
+import unittest
+import mock
+import json
+import tempfile
+import shutil
+import os.path
+
+from ros3ddevcontroller.param.store import ParametersStore, ParameterLoader
+from ros3ddevcontroller.param.schema import ParameterSchema, ParameterSchemaError
+from ros3ddevcontroller.param.parameter import ReadOnlyParameter, HiddenParameter
+from ros3ddevcontroller.param.sysparams import SERVO_PARAMETERS, CAMERA_PARAMETERS, \
+    SCREEN_PARAMETERS
+from ros3ddevcontroller.param import evaluators
+
+
+class SchemaTestCase(unittest.TestCase):
+    SCHEMA = {
+        'servo': ['focal_length_mm'],
+        'camera': ['frame_width_mm'],
+        'screen': ['notes'],
+        'parameters': [
+            {'name': 'focal_length_mm', 'type': 'float', 'value': 35},
+            {'name': 'frame_width_mm', 'type': 'float', 'value': 20,
+             'read_only': True},
+            {'name': 'frame_height_mm', 'type': 'float', 'value': 10,
+             'min': 0, 'max': 100},
+            {'name': 'fov_horizontal_deg', 'type': 'float', 'value': 0,
+             'evaluator': 'FovHorizontalDegCalc'},
+            {'name': 'notes', 'type': 'str', 'value': ''},
+            {'name': 'scratch', 'type': 'float', 'value': 0, 'hidden': True},
+        ]
+    }
+
+    def setUp(self):
+        ParametersStore.clear_parameters()
+        self.location = tempfile.mkdtemp()
+        self.path = os.path.join(self.location, 'parameters.json')
+        self.write_schema(self.SCHEMA)
+
+    def tearDown(self):
+        shutil.rmtree(self.location)
+        ParametersStore.clear_parameters()
+        ParametersStore.SERVO_PARAMETERS = SERVO_PARAMETERS
+        ParametersStore.CAMERA_PARAMETERS = CAMERA_PARAMETERS
+        ParametersStore.SCREEN_PARAMETERS = SCREEN_PARAMETERS
+
+    def write_schema(self, schema):
+        with open(self.path, 'w') as outf:
+            outf.write(json.dumps(schema))
+
+    def test_load(self):
+        compiled = ParameterSchema(self.path).load()
+
+        self.assertEqual(compiled.servo, ['focal_length_mm'])
+        self.assertEqual(compiled.camera, ['frame_width_mm'])
+        self.assertEqual(compiled.screen, ['notes'])
+
+        params = dict((p.name, p) for p in compiled.parameters)
+        self.assertEqual(len(params), 6)
+        self.assertEqual(params['focal_length_mm'].value, 35.0)
+        self.assertEqual(params['focal_length_mm'].value_type, float)
+        self.assertIsInstance(params['frame_width_mm'], ReadOnlyParameter)
+        self.assertEqual(params['frame_height_mm'].min_value, 0)
+        self.assertEqual(params['frame_height_mm'].max_value, 100)
+        self.assertEqual(params['fov_horizontal_deg'].evaluator.__name__,
+                         'FovHorizontalDegCalc')
+        self.assertEqual(params['notes'].value_type, str)
+        self.assertIsInstance(params['scratch'], HiddenParameter)
+
+    def test_load_errors(self):
+        bad_schemas = [
+            [],
+            {'parameters': {}},
+            {'parameters': [{'name': 'foo', 'type': 'int'}]},
+            {'parameters': [{'name': 'foo', 'type': 'list', 'value': 1}]},
+            {'parameters': [{'name': 'foo', 'type': 'int', 'value': 'bar'}]},
+            {'parameters': [{'name': 'foo', 'type': 'bool', 'value': 'no'}]},
+            {'parameters': [{'name': 'foo', 'type': 'bool', 'value': 1}]},
+            {'parameters': [{'name': 'foo', 'type': 'int', 'value': 1,
+                             'evaluator': 'math'}]},
+            {'servo': 'foo', 'parameters': []},
+            {'servo': ['focal_lenght_mm'], 'parameters': [
+                {'name': 'focal_length_mm', 'type': 'float', 'value': 35}]},
+            {'screen': ['notes'], 'parameters': []},
+        ]
+        for schema in bad_schemas:
+            self.write_schema(schema)
+            self.assertRaises(ParameterSchemaError,
+                              ParameterSchema(self.path).load)
+
+        with open(self.path, 'w') as outf:
+            outf.write('{')
+        self.assertRaises(ParameterSchemaError, ParameterSchema(self.path).load)
+
+    def test_load_bool(self):
+        self.write_schema({'parameters': [
+            {'name': 'foo', 'type': 'bool', 'value': False},
+            {'name': 'bar', 'type': 'bool', 'value': 'false'},
+            {'name': 'baz', 'type': 'bool', 'value': 'True'},
+        ]})
+        compiled = ParameterSchema(self.path).load()
+
+        params = dict((p.name, p) for p in compiled.parameters)
+        self.assertIs(params['foo'].value, False)
+        self.assertIs(params['bar'].value, False)
+        self.assertIs(params['baz'].value, True)
+        self.assertEqual(params['bar'].value_type, bool)
+
+    def check_loaded(self):
+        self.assertTrue(ParametersStore.is_servo_parameter('focal_length_mm'))
+        self.assertFalse(ParametersStore.is_servo_parameter('baseline_mm'))
+        self.assertTrue(ParametersStore.is_camera_parameter('frame_width_mm'))
+        self.assertTrue(ParametersStore.is_read_only('frame_width_mm'))
+        self.assertEqual(ParametersStore.parameter_groups()['screen'], ['notes'])
+
+        ParametersStore.set('focal_length_mm', 10)
+        self.assertAlmostEqual(ParametersStore.get_value('fov_horizontal_deg'),
+                               90.0)
+
+    def test_loader(self):
+        ParameterLoader.load(self.path)
+        self.check_loaded()
+
+        # compiled schema was cached
+        self.assertTrue(os.path.exists(self.path + '.cache'))
+
+    def test_loader_cached(self):
+        ParameterLoader.load(self.path)
+        ParametersStore.clear_parameters()
+
+        with mock.patch.object(ParameterSchema, 'load') as load_mock:
+            ParameterLoader.load(self.path)
+
+        # schema was not parsed again
+        self.assertFalse(load_mock.called)
+        self.check_loaded()
+
+    def test_cache_outdated(self):
+        ParameterLoader.load(self.path)
+        ParametersStore.clear_parameters()
+
+        schema = dict(self.SCHEMA)
+        schema['parameters'] = self.SCHEMA['parameters'] + [
+            {'name': 'scene_no', 'type': 'str', 'value': '1'}
+        ]
+        self.write_schema(schema)
+
+        ParameterLoader.load(self.path)
+        self.assertEqual(ParametersStore.get_value('scene_no'), '1')
+
+        self.assertIsNone(ParameterSchema(self.path + '-foo').load_cache())
+        with open(self.path + '.cache', 'w') as outf:
+            outf.write('foo')
+        self.assertIsNone(ParameterSchema(self.path).load_cache())
+
+    def test_plan(self):
+        ParameterLoader.load(self.path)
+        plan = ParametersStore.get_plan()
+
+        self.assertEqual(plan['evaluation_plan']['focal_length_mm'],
+                         ['fov_horizontal_deg'])
+        self.assertEqual(plan['arguments'],
+                         {'fov_horizontal_deg': ['focal_length_mm', 'frame_width_mm']})
+
+    def test_plan_mismatch(self):
+        ParameterLoader.load(self.path)
+        plan = ParametersStore.get_plan()
+        params = [ParametersStore.get(name) for name in ParametersStore.PARAMETERS]
+        ParametersStore.clear_parameters()
+
+        # plan compiled with evaluator taking arguments in another order
+        plan['arguments']['fov_horizontal_deg'].reverse()
+        ParametersStore.load_parameters(params, plan=plan)
+
+        self.assertEqual(ParametersStore.get_plan()['arguments'],
+                         {'fov_horizontal_deg': ['focal_length_mm', 'frame_width_mm']})
+        ParametersStore.set('focal_length_mm', 10)
+        self.assertAlmostEqual(ParametersStore.get_value('fov_horizontal_deg'),
+                               90.0)
+
+    def test_key_compiled_evaluators(self):
+        # only compiled evaluators module is deployed
+        compiled = os.path.join(self.location, 'evaluators.pyc')
+
+        keys = []
+        for content in ['foo', 'bar']:
+            with open(compiled, 'w') as outf:
+                outf.write(content)
+            with mock.patch.object(evaluators, '__file__', compiled):
+                keys.append(ParameterSchema(self.path).key())
+
+        self.assertNotEqual(keys[0], keys[1])
@@ -0,0 +1,118 @@
+#
+# Copyright (c) 2015 Open-RnD Sp. z o.o.
+#
+# Permission is hereby granted, free of charge, to any person
+# obtaining a copy of this software and associated documentation
+# files (the "Software"), to deal in the Software without
+# restriction, including without limitation the rights to use, copy,
+# modify, merge, publish, distribute, sublicense, and/or sell copies
+# of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS
+# BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN
+# ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+# CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+"""Parameter solver tests"""
+from __future__ import absolute_import, print_function
+import unittest
+import math
+
+from ros3ddevcontroller.param.solver import ParameterSolver, SolverRequestError, \
+    find_root
+from ros3ddevcontroller.param.store import ParametersStore, ParameterLoader
+
+
+class FindRootTestCase(unittest.TestCase):
+    def test_find(self):
+        root, iterations = find_root(lambda x: x * x - 2, 0.0, 2.0)
+        self.assertAlmostEqual(root, math.sqrt(2), places=8)
+        self.assertLess(iterations, 20)
+
+        # range ends can be given in any order
+        root, _ = find_root(lambda x: x * x - 2, -2.0, -1.0)
+        self.assertAlmostEqual(root, -math.sqrt(2), places=8)
+
+        root, iterations = find_root(lambda x: x - 1, 1.0, 2.0)
+        self.assertEqual((root, iterations), (1.0, 0))
+
+    def test_not_bracketed(self):
+        self.assertRaises(ValueError, find_root, lambda x: x * x + 1, -1.0, 1.0)
+
+
+class ParameterSolverTestCase(unittest.TestCase):
+    def setUp(self):
+        ParameterLoader.load()
+        ParametersStore.set_many([
+            ('frame_width_mm', 15.84),
+            ('distance_screen_m', 3.0),
+            ('screen_distance_n', 3.0),
+        ])
+        self.solver = ParameterSolver()
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def _check(self, target, value, variable, solution):
+        """Verify solution by applying it to a copy of the store"""
+        store = ParametersStore.clone()
+        store.set(variable, solution['value'])
+        self.assertAlmostEqual(store.get_value(target), value, places=6)
+        self.assertAlmostEqual(solution['target_value'], value, places=6)
+
+    def test_closed_form(self):
+        for target, value, variable in [
+                ('parallax_far_percent', 1.5, 'baseline_mm'),
+                ('parallax_near_mm', -20.0, 'baseline_mm'),
+                ('parallax_far_percent', 1.5, 'distance_screen_m'),
+                ('perceived_position_far_m', 12.0, 'baseline_mm'),
+                ('perceived_position_near_m', 8.0, 'distance_screen_m')]:
+            solution = self.solver.solve(target, value, variable)
+            self.assertEqual(solution['method'], ParameterSolver.METHOD_CLOSED_FORM)
+            self._check(target, value, variable, solution)
+
+    def test_root_finder(self):
+        solution = self.solver.solve('convergence_deg', 1.0, 'baseline_mm')
+        self.assertEqual(solution['method'], ParameterSolver.METHOD_ROOT_FINDER)
+        self._check('convergence_deg', 1.0, 'baseline_mm', solution)
+
+        solution = self.solver.solve('spectator_fov_horizontal_deg', 30.0,
+                                     'screen_distance_n', low=0.5, high=10.0)
+        self._check('spectator_fov_horizontal_deg', 30.0, 'screen_distance_n',
+                    solution)
+
+        # giving a range enforces the root finder
+        solution = self.solver.solve('parallax_far_percent', 1.5, 'baseline_mm',
+                                     low=1.0, high=200.0)
+        self.assertEqual(solution['method'], ParameterSolver.METHOD_ROOT_FINDER)
+        self._check('parallax_far_percent', 1.5, 'baseline_mm', solution)
+
+    def test_errors(self):
+        self.assertRaises(KeyError, self.solver.solve,
+                          'missing', 1.0, 'baseline_mm')
+        # target does not depend on variable
+        self.assertRaises(SolverRequestError, self.solver.solve,
+                          'convergence_deg', 1.0, 'iso')
+        # target is not evaluated
+        self.assertRaises(SolverRequestError, self.solver.solve,
+                          'baseline_mm', 1.0, 'focal_length_mm')
+        self.assertRaises(SolverRequestError, self.solver.solve,
+                          'convergence_deg', 1.0, 'baseline_mm', low=1.0)
+        # no solution in range
+        self.assertRaises(ValueError, self.solver.solve,
+                          'convergence_deg', 1.0, 'baseline_mm',
+                          low=1.0, high=2.0)
+
+    def test_store_unchanged(self):
+        revision = ParametersStore.revision()
+        self.solver.solve('parallax_far_percent', 1.5, 'baseline_mm')
+        self.solver.solve('convergence_deg', 1.0, 'baseline_mm')
+        self.assertEqual(ParametersStore.revision(), revision)
+        self.assertEqual(ParametersStore.get_value('baseline_mm'), 80.0)
@@ -24,9 +24,14 @@
 
 import unittest
 import mock
+import copy
+import json
+import threading
+import time
 
 from ros3ddevcontroller.param.store import ParametersStore, ParameterLoader
-from ros3ddevcontroller.param.parameter import Parameter, ReadOnlyParameter, Evaluator
+from ros3ddevcontroller.param.parameter import Parameter, ReadOnlyParameter, \
+    HiddenParameter, Evaluator
 
 class StoreLoadingTestCase(unittest.TestCase):
     def setUp(self):
@@ -63,6 +68,10 @@ class GetSetStoreTestCase(StoreLoadingTestCase):
         from ros3ddevcontroller.param.sysparams import SYSTEM_PARAMETERS
 
         for param in SYSTEM_PARAMETERS:
+            # hidden parameters are evaluated when loaded
+            if isinstance(param, HiddenParameter):
+                continue
+
             name = param.name
             value = param.value
 
@@ -225,6 +234,39 @@ class ListenerTestCase(StoreLoadingTestCase):
         # now something different
         ParametersStore.change_listeners.remove(None)
 
+    def test_order(self):
+        # notifications are delivered in order of changes, even if the
+        # thread that made the first change is delayed after
+        # releasing the store lock
+        received = []
+        def handler(pdesc):
+            received.append(pdesc.value)
+        ParametersStore.change_listeners.add(handler)
+
+        listeners = ParametersStore.change_listeners
+        deliver = listeners.deliver
+        second_set = threading.Event()
+
+        def delayed_deliver():
+            if threading.current_thread().name == 'first-set':
+                second_set.wait(5)
+            deliver()
+
+        with mock.patch.object(listeners, 'deliver', delayed_deliver):
+            first = threading.Thread(target=ParametersStore.set,
+                                     args=('focus_distance_m', 1.0),
+                                     name='first-set')
+            first.start()
+            while ParametersStore.get_value('focus_distance_m') != 1.0:
+                time.sleep(0.01)
+
+            ParametersStore.set('focus_distance_m', 2.0)
+            second_set.set()
+            first.join(5)
+
+        ParametersStore.change_listeners.remove(handler)
+        self.assertEqual(received, [1.0, 2.0])
+
 
 class CameraServoTestCase(StoreLoadingTestCase):
 
@@ -329,7 +371,7 @@ class ParameterEvaluationTestCase(unittest.TestCase):
     ]
 
     def setUp(self):
-        ParametersStore.load_parameters(self.PARAMETERS)
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
 
     def tearDown(self):
         ParametersStore.clear_parameters()
@@ -349,3 +391,946 @@ class ParameterEvaluationTestCase(unittest.TestCase):
         # cafe = baz ** 2 + bar
         cafe_val = ParametersStore.get_value('cafe')
         self.assertEqual(cafe_val, 173)
+
+    def test_evaluated_once(self):
+        # cafe depends on bar directly and through baz, it should be
+        # evaluated only once per change of foo
+        with mock.patch.object(self.CafeEvaluator, '__call__',
+                               autospec=True, return_value=0) as cafe_mock:
+            ParametersStore.set('foo', 3)
+
+        self.assertEqual(cafe_mock.call_count, 1)
+
+    def test_evaluation_plan(self):
+        plan = [p.name for p in ParametersStore.EVALUATION_PLAN['foo']]
+        self.assertEqual(plan, ['bar', 'baz', 'cafe'])
+
+        plan = [p.name for p in ParametersStore.EVALUATION_PLAN['bar']]
+        self.assertEqual(plan, ['baz', 'cafe'])
+
+        self.assertEqual(ParametersStore.EVALUATION_PLAN['cafe'], [])
+
+
+class ParameterCircularDependencyTestCase(unittest.TestCase):
+    class FooEvaluator(Evaluator):
+        REQUIRES = [
+            'bar'
+        ]
+
+        def __call__(self, bar=None):
+            return bar
+
+    class BarEvaluator(Evaluator):
+        REQUIRES = [
+            'foo'
+        ]
+
+        def __call__(self, foo=None):
+            return foo
+
+    PARAMETERS = [
+        Parameter('foo', 1, int, evaluator=FooEvaluator),
+        Parameter('bar', 0, int, evaluator=BarEvaluator),
+    ]
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_load(self):
+        self.assertRaises(RuntimeError, ParametersStore.load_parameters,
+                          self.PARAMETERS)
+
+
+class ParameterSetManyTestCase(unittest.TestCase):
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_set_many(self):
+        tmock = mock.Mock()
+        ParametersStore.change_listeners.add(tmock)
+
+        evaluator = ParameterEvaluationTestCase.CafeEvaluator
+        with mock.patch.object(evaluator, '__call__', autospec=True,
+                               side_effect=evaluator.__call__) as cafe_mock:
+            changed = ParametersStore.set_many([('foo', 2), ('bar', 5),
+                                                ('foo', 3)])
+
+        ParametersStore.change_listeners.remove(tmock)
+
+        self.assertEqual(sorted(p.name for p in changed), ['bar', 'foo'])
+        # each modified parameter is notified once
+        self.assertEqual(tmock.call_count, 2)
+        # cafe depends on both foo and bar, but is evaluated once
+        self.assertEqual(cafe_mock.call_count, 1)
+
+        self.assertEqual(ParametersStore.get_value('foo'), 3)
+        # explicitly set value is not overwritten by evaluation
+        self.assertEqual(ParametersStore.get_value('bar'), 5)
+        # baz = foo * bar + 1
+        self.assertEqual(ParametersStore.get_value('baz'), 16)
+        # cafe = baz ** 2 + bar
+        self.assertEqual(ParametersStore.get_value('cafe'), 261)
+
+    def test_set_many_dict(self):
+        ParametersStore.set_many({'foo': 3})
+        self.assertEqual(ParametersStore.get_value('bar'), 4)
+        self.assertEqual(ParametersStore.get_value('cafe'), 173)
+
+    def test_set_many_failed(self):
+        ParametersStore.set('foo', 3)
+
+        self.assertRaises(ValueError, ParametersStore.set_many,
+                          [('foo', 4), ('bar', 'baz')])
+        self.assertRaises(KeyError, ParametersStore.set_many,
+                          [('foo', 4), ('foo=bar', 1)])
+
+        # store is unchanged
+        self.assertEqual(ParametersStore.get_value('foo'), 3)
+        self.assertEqual(ParametersStore.get_value('bar'), 4)
+
+
+class ParameterEvaluatorBindingTestCase(unittest.TestCase):
+    class BazEvaluator(Evaluator):
+        REQUIRES = [
+            'foo',
+            'bar'
+        ]
+
+        # arguments in different order than REQUIRES
+        def __call__(self, bar=None, foo=None):
+            return foo - bar
+
+    class BrokenEvaluator(Evaluator):
+        REQUIRES = [
+            'foo',
+            'bar'
+        ]
+
+        def __call__(self, foo=None, baz=None):
+            return foo
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_bind(self):
+        ParametersStore.load_parameters([
+            Parameter('foo', 1, int),
+            Parameter('bar', 2, int),
+            Parameter('baz', 0, int, evaluator=self.BazEvaluator)
+        ])
+
+        bound = ParametersStore.EVALUATORS['baz']
+        self.assertIsInstance(bound.evaluator, self.BazEvaluator)
+        self.assertEqual([p.name for p in bound.args], ['bar', 'foo'])
+
+        ParametersStore.set('foo', 10)
+        self.assertEqual(ParametersStore.get_value('baz'), 8)
+        # evaluator instance is reused
+        self.assertIs(ParametersStore.EVALUATORS['baz'], bound)
+
+    def test_bind_mismatch(self):
+        self.assertRaises(RuntimeError, ParametersStore.load_parameters, [
+            Parameter('foo', 1, int),
+            Parameter('bar', 2, int),
+            Parameter('baz', 0, int, evaluator=self.BrokenEvaluator)
+        ])
+
+
+class ParameterChangeDetectionTestCase(unittest.TestCase):
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS + [
+        Parameter('qux', 1.0, float),
+        Parameter('quux', 'a', str)
+    ]
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.listener = mock.Mock()
+        ParametersStore.change_listeners.add(self.listener)
+
+    def tearDown(self):
+        ParametersStore.change_listeners.remove(self.listener)
+        ParametersStore.clear_parameters()
+
+    def test_unchanged_skipped(self):
+        # dependants of foo are evaluated on first update, even if
+        # the value is the same as loaded one
+        ParametersStore.set('foo', 1)
+        self.assertEqual(ParametersStore.get_value('bar'), 2)
+        self.assertEqual(ParametersStore.get_value('cafe'), 11)
+        self.listener.reset_mock()
+        ParametersStore.SUPPRESSED_UPDATES = {}
+
+        with mock.patch.object(ParametersStore, 'evaluate_param_tree') as eval_mock:
+            ParametersStore.set('foo', 1)
+            ParametersStore.set('foo', '1')
+            ParametersStore.set('quux', 'a')
+            ParametersStore.set('qux', 1.0 + ParametersStore.FLOAT_EPSILON / 2)
+
+        self.assertFalse(eval_mock.called)
+        self.assertFalse(self.listener.called)
+        self.assertEqual(ParametersStore.SUPPRESSED_UPDATES,
+                         {'foo': 2, 'quux': 1, 'qux': 1})
+
+        self.assertEqual(ParametersStore.set_many([('foo', 1), ('qux', 1.0)]), [])
+        self.assertFalse(self.listener.called)
+        self.assertEqual(ParametersStore.SUPPRESSED_UPDATES['foo'], 3)
+
+    def test_unevaluated_loaded(self):
+        ParameterLoader.load()
+        self.addCleanup(ParametersStore.clear_parameters)
+        # loaded values of derived parameters do not match defaults of
+        # their inputs, setting input to its loaded value updates them
+        self.assertEqual(ParametersStore.get_value('frame_width_mm'), 0)
+        ParametersStore.set('focal_length_mm',
+                            ParametersStore.get_value('focal_length_mm'))
+        ParametersStore.set('sensor_width_mm',
+                            ParametersStore.get_value('sensor_width_mm'))
+        self.assertAlmostEqual(ParametersStore.get_value('frame_width_mm'), 22.16)
+        self.assertAlmostEqual(ParametersStore.get_value('fov_horizontal_deg'),
+                               35.13, places=2)
+
+        # once evaluated, setting the same value is skipped
+        ParametersStore.set('sensor_width_mm',
+                            ParametersStore.get_value('sensor_width_mm'))
+        self.assertEqual(ParametersStore.SUPPRESSED_UPDATES['sensor_width_mm'], 1)
+
+    def test_changed(self):
+        ParametersStore.set('foo', 2)
+        ParametersStore.set('qux', 1.0 + ParametersStore.FLOAT_EPSILON * 2)
+
+        self.assertEqual(self.listener.call_count, 2)
+        self.assertEqual(ParametersStore.get_value('bar'), 3)
+        self.assertEqual(ParametersStore.SUPPRESSED_UPDATES, {})
+
+    def test_disabled(self):
+        with mock.patch.object(ParametersStore, 'SKIP_UNCHANGED', False):
+            ParametersStore.set('foo', 1)
+
+        self.assertEqual(self.listener.call_count, 1)
+        self.assertEqual(ParametersStore.SUPPRESSED_UPDATES, {})
+
+
+class ParameterLazyEvaluationTestCase(unittest.TestCase):
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.lazy_patch = mock.patch.object(ParametersStore, 'LAZY_EVALUATION', True)
+        self.lazy_patch.start()
+
+    def tearDown(self):
+        self.lazy_patch.stop()
+        ParametersStore.clear_parameters()
+
+    def test_dirty(self):
+        with mock.patch.object(ParametersStore, 'evaluate_single_param') as eval_mock:
+            ParametersStore.set('foo', 3)
+            ParametersStore.set('foo', 4)
+
+        # nothing was evaluated, only marked as dirty
+        self.assertFalse(eval_mock.called)
+        self.assertEqual(ParametersStore.DIRTY, set(['bar', 'baz', 'cafe']))
+
+    def test_get(self):
+        ParametersStore.set('foo', 3)
+
+        # cafe = baz ** 2 + bar, evaluates bar and baz on the way
+        self.assertEqual(ParametersStore.get_value('cafe'), 173)
+        self.assertEqual(ParametersStore.DIRTY, set())
+        self.assertEqual(ParametersStore.PARAMETERS['bar'].value, 4)
+        self.assertEqual(ParametersStore.PARAMETERS['baz'].value, 13)
+
+    def test_read_all(self):
+        ParametersStore.set('foo', 3)
+
+        as_dict = ParametersStore.parameters_as_dict()
+        self.assertEqual(as_dict['cafe']['value'], 173)
+        self.assertEqual(ParametersStore.DIRTY, set())
+
+        ParametersStore.set('foo', 1)
+        params = dict((p.name, p.value) for p in ParametersStore.get_parameters())
+        # bar = foo + 1, baz = foo * bar + 1, cafe = baz ** 2 + bar
+        self.assertEqual(params, {'foo': 1, 'bar': 2, 'baz': 3, 'cafe': 11})
+
+    def test_eager(self):
+        with mock.patch.object(ParametersStore, 'EAGER_PARAMETERS', set(['baz'])):
+            ParametersStore.set('foo', 3)
+
+        # baz was evaluated, together with bar it depends on
+        self.assertEqual(ParametersStore.PARAMETERS['baz'].value, 13)
+        self.assertEqual(ParametersStore.PARAMETERS['bar'].value, 4)
+        self.assertEqual(ParametersStore.DIRTY, set(['cafe']))
+
+
+class ParametersViewTestCase(unittest.TestCase):
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_publish(self):
+        view = ParametersStore.view()
+        self.assertEqual(view.get('foo').value, 1)
+        self.assertIsNot(view.get('foo'), ParametersStore.PARAMETERS['foo'])
+
+        ParametersStore.set('foo', 3)
+
+        new_view = ParametersStore.view()
+        self.assertGreater(new_view.revision, view.revision)
+        self.assertEqual(new_view.get('foo').value, 3)
+        self.assertEqual(new_view.get('cafe').value, 173)
+        # previous view is not modified
+        self.assertEqual(view.get('foo').value, 1)
+        self.assertEqual(view.get('cafe').value, 0)
+
+    def test_status(self):
+        from ros3ddevcontroller.param.parameter import ParameterStatus
+
+        view = ParametersStore.view()
+        status = ParametersStore.get('foo').status
+        status.set_status(ParameterStatus.HARDWARE)
+        ParametersStore.set_status('foo', status)
+
+        new_view = ParametersStore.view()
+        self.assertEqual(view.get('foo').status.status, ParameterStatus.SOFTWARE)
+        self.assertEqual(new_view.get('foo').status.status, ParameterStatus.HARDWARE)
+        # unmodified parameters are shared between views
+        self.assertIs(view.get('bar'), new_view.get('bar'))
+
+    def test_read_without_lock(self):
+        import threading
+
+        ParametersStore.set('foo', 3)
+
+        result = []
+        reader = threading.Thread(
+            target=lambda: result.append(ParametersStore.parameters_as_dict()))
+
+        with ParametersStore.lock:
+            reader.start()
+            reader.join(5)
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0]['cafe']['value'], 173)
+
+    def test_clear(self):
+        ParametersStore.clear_parameters()
+        self.assertEqual(ParametersStore.get_parameters(), [])
+
+
+class ParameterRevisionTestCase(unittest.TestCase):
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS + [
+        Parameter('qux', 'a', str)
+    ]
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_changed_since(self):
+        start = ParametersStore.revision()
+
+        revision, changed = ParametersStore.changed_since(start)
+        self.assertEqual(revision, start)
+        self.assertEqual(changed, [])
+
+        # all parameters were modified by loading
+        revision, changed = ParametersStore.changed_since(start - 1)
+        self.assertEqual(len(changed), len(self.PARAMETERS))
+
+        ParametersStore.set('qux', 'b')
+        qux_revision = ParametersStore.revision()
+        self.assertEqual(qux_revision, start + 1)
+
+        ParametersStore.set('foo', 3)
+        revision, changed = ParametersStore.changed_since(start)
+        self.assertEqual(revision, start + 2)
+        self.assertEqual(sorted(p.name for p in changed),
+                         ['bar', 'baz', 'cafe', 'foo', 'qux'])
+
+        # evaluated parameters are reported as well
+        revision, changed = ParametersStore.changed_since(qux_revision)
+        self.assertEqual(sorted(p.name for p in changed),
+                         ['bar', 'baz', 'cafe', 'foo'])
+        self.assertEqual(dict((p.name, p.value) for p in changed),
+                         {'foo': 3, 'bar': 4, 'baz': 13, 'cafe': 173})
+
+    def test_as_json(self):
+        view = ParametersStore.view()
+        self.assertEqual(json.loads(view.as_json()), view.as_dict())
+        self.assertIs(view.as_json(), view.as_json())
+
+        fragments = dict(view.fragments)
+        ParametersStore.set('qux', 'b')
+
+        view = ParametersStore.view()
+        self.assertEqual(json.loads(ParametersStore.parameters_as_json()),
+                         view.as_dict())
+        # only the modified parameter was encoded again
+        self.assertIs(view.fragments['foo'], fragments['foo'])
+        self.assertIsNot(view.fragments['qux'], fragments['qux'])
+        self.assertEqual(json.loads(view.as_json())['qux']['value'], 'b')
+
+    def test_changed_as_json(self):
+        start = ParametersStore.revision()
+        self.assertEqual(ParametersStore.view().changed_as_json(start), '{}')
+
+        ParametersStore.set('foo', 3)
+        view = ParametersStore.view()
+        self.assertEqual(json.loads(view.changed_as_json(start)),
+                         dict((name, params) for name, params in view.as_dict().items()
+                              if name in ['foo', 'bar', 'baz', 'cafe']))
+
+    def test_unchanged(self):
+        start = ParametersStore.revision()
+        ParametersStore.set('qux', 'a')
+        self.assertEqual(ParametersStore.revision(), start)
+
+    def test_status(self):
+        start = ParametersStore.revision()
+        ParametersStore.set_status('qux', ParametersStore.get('qux').status)
+
+        revision, changed = ParametersStore.changed_since(start)
+        self.assertEqual(revision, start + 1)
+        self.assertEqual([p.name for p in changed], ['qux'])
+
+
+class ParametersStoreInstanceTestCase(unittest.TestCase):
+    PARAMETERS = ParameterRevisionTestCase.PARAMETERS
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.rig_a = ParametersStore()
+        self.rig_a.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.rig_b = ParametersStore()
+        self.rig_b.load_parameters(copy.deepcopy(self.PARAMETERS))
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_independent(self):
+        self.rig_a.set('foo', 3)
+
+        self.assertEqual(self.rig_a.get_value('foo'), 3)
+        self.assertEqual(self.rig_a.get_value('cafe'), 173)
+        # other stores are not affected
+        self.assertEqual(self.rig_b.get_value('foo'), 1)
+        self.assertEqual(ParametersStore.get_value('foo'), 1)
+
+        ParametersStore.set('foo', 5)
+        self.assertEqual(self.rig_a.get_value('foo'), 3)
+        self.assertEqual(self.rig_b.get_value('foo'), 1)
+
+    def test_listeners(self):
+        listener_a = mock.Mock()
+        listener_b = mock.Mock()
+        self.rig_a.change_listeners.add(listener_a)
+        self.rig_b.change_listeners.add(listener_b)
+
+        self.rig_a.set('qux', 'b')
+        listener_a.assert_called_once_with(self.rig_a.get('qux'))
+        listener_b.assert_not_called()
+
+        self.rig_a.change_listeners.remove(listener_a)
+        self.rig_b.change_listeners.remove(listener_b)
+
+    def test_clear(self):
+        self.rig_a.clear_parameters()
+        self.assertEqual(self.rig_a.get_parameters(), [])
+        self.assertEqual(len(self.rig_b.get_parameters()),
+                         len(self.PARAMETERS))
+
+    def test_clone(self):
+        listener = mock.Mock()
+        ParametersStore.change_listeners.add(listener)
+        ParametersStore.set('foo', 3)
+        listener.reset_mock()
+
+        scratch = ParametersStore.clone()
+        self.assertEqual(scratch.get_value('foo'), 3)
+        self.assertEqual(scratch.get_value('cafe'),
+                         ParametersStore.get_value('cafe'))
+
+        scratch.set('foo', 1)
+        self.assertEqual(scratch.get_value('cafe'), 11)
+        # original store and its listeners are not affected
+        self.assertEqual(ParametersStore.get_value('foo'), 3)
+        self.assertEqual(ParametersStore.get_value('cafe'), 173)
+        listener.assert_not_called()
+
+        ParametersStore.change_listeners.remove(listener)
+
+
+class EvaluatorStatsTestCase(unittest.TestCase):
+    class RatioEvaluator(Evaluator):
+        REQUIRES = [
+            'foo'
+        ]
+
+        def __call__(self, foo=None):
+            return 1.0 / foo
+
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS + [
+        Parameter('ratio', 0, float, evaluator=RatioEvaluator)
+    ]
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+        ParametersStore.EVALUATOR_STATS.reset()
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_calls(self):
+        ParametersStore.set('foo', 3)
+        ParametersStore.set('foo', 4)
+
+        stats = ParametersStore.evaluator_stats()
+        self.assertEqual(sorted(stats.keys()),
+                         ['BarEvaluator', 'BazEvaluator', 'CafeEvaluator',
+                          'RatioEvaluator'])
+        for name, entry in stats.items():
+            self.assertEqual(entry['calls'], 2)
+            self.assertEqual(entry['errors'], 0)
+            self.assertGreaterEqual(entry['total_ms'], entry['max_ms'])
+            self.assertGreaterEqual(entry['max_ms'], entry['avg_ms'])
+
+    def test_errors(self):
+        ParametersStore.set('foo', 2)
+        ParametersStore.EVALUATOR_STATS.reset()
+        ParametersStore.set('foo', 0)
+
+        stats = ParametersStore.evaluator_stats()
+        self.assertEqual(stats['RatioEvaluator']['calls'], 1)
+        self.assertEqual(stats['RatioEvaluator']['errors'], 1)
+        self.assertEqual(stats['BarEvaluator']['errors'], 0)
+        # value of failed parameter is not modified
+        self.assertEqual(ParametersStore.get_value('ratio'), 0.5)
+
+    def test_clear(self):
+        ParametersStore.set('foo', 3)
+        ParametersStore.clear_parameters()
+        self.assertEqual(ParametersStore.evaluator_stats(), {})
+
+
+class QueuedListenerTestCase(unittest.TestCase):
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.release = threading.Event()
+        self.received = []
+
+    def tearDown(self):
+        self.release.set()
+        ParametersStore.change_listeners.remove(self.handler)
+        ParametersStore.clear_parameters()
+
+    def handler(self, pdesc):
+        self.release.wait()
+        self.received.append((pdesc.name, pdesc.value))
+
+    def test_queued(self):
+        ParametersStore.change_listeners.add(self.handler, queued=True)
+
+        # set() does not wait for the handler
+        ParametersStore.set('foo', 2)
+        ParametersStore.set('foo', 3)
+        self.assertEqual(self.received, [])
+
+        self.release.set()
+        queued = ParametersStore.change_listeners._find(self.handler)
+        self.assertTrue(queued.wait_empty(5))
+        self.assertEqual(self.received, [('foo', 2), ('foo', 3)])
+
+        stats = ParametersStore.change_listeners.stats()
+        self.assertEqual(stats.keys(), ['QueuedListenerTestCase.handler'])
+        self.assertEqual(stats['QueuedListenerTestCase.handler']['delivered'], 2)
+        self.assertEqual(stats['QueuedListenerTestCase.handler']['depth'], 0)
+
+    def test_overflow(self):
+        ParametersStore.change_listeners.add(self.handler, queued=True,
+                                             max_queue=2)
+        queued = ParametersStore.change_listeners._find(self.handler)
+
+        for value in range(2, 8):
+            ParametersStore.set('foo', value)
+
+        stats = queued.stats()
+        self.assertEqual(stats['max_depth'], 2)
+        self.assertGreater(stats['dropped'], 0)
+
+        self.release.set()
+        self.assertTrue(queued.wait_empty(5))
+        # newest notifications are kept
+        self.assertEqual(self.received[-2:], [('foo', 6), ('foo', 7)])
+
+    def test_wait_in_flight(self):
+        ParametersStore.change_listeners.add(self.handler, queued=True)
+        queued = ParametersStore.change_listeners._find(self.handler)
+
+        ParametersStore.set('foo', 2)
+        # notification is taken off the queue, but the handler blocks
+        while queued.stats()['depth'] or not queued.busy:
+            time.sleep(0.01)
+        self.assertFalse(queued.wait_empty(0.1))
+
+        self.release.set()
+        self.assertTrue(queued.wait_empty(5))
+        self.assertEqual(self.received, [('foo', 2)])
+        self.assertEqual(queued.stats()['delivered'], 1)
+
+    def test_copy(self):
+        ParametersStore.change_listeners.add(self.handler)
+        self.release.set()
+
+        listener = mock.Mock()
+        ParametersStore.change_listeners.add(listener)
+        ParametersStore.set('foo', 2)
+        ParametersStore.change_listeners.remove(listener)
+
+        pdesc = listener.call_args[0][0]
+        self.assertEqual(pdesc.value, 2)
+        self.assertIsNot(pdesc, ParametersStore.PARAMETERS['foo'])
+
+
+class FilteredListenerTestCase(unittest.TestCase):
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS + [
+        Parameter('qux', 'a', str),
+        Parameter('qux_name', 'b', str)
+    ]
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.listeners = []
+
+    def tearDown(self):
+        for listener in self.listeners:
+            ParametersStore.change_listeners.remove(listener)
+        ParametersStore.clear_parameters()
+
+    def subscribe(self, **kwargs):
+        listener = mock.Mock()
+        ParametersStore.change_listeners.add(listener, **kwargs)
+        self.listeners.append(listener)
+        return listener
+
+    def notified(self, listener):
+        return sorted(call[0][0].name for call in listener.call_args_list)
+
+    def test_filters(self):
+        everything = self.subscribe()
+        by_name = self.subscribe(names=['bar'])
+        by_prefix = self.subscribe(prefixes=['qux_'])
+        by_group = self.subscribe(groups=[ParametersStore.GROUP_DERIVED])
+        combined = self.subscribe(names=['foo'], prefixes=['qux'])
+
+        ParametersStore.set_many([('foo', 2), ('qux', 'c'),
+                                  ('qux_name', 'd'), ('bar', 10)])
+
+        self.assertEqual(self.notified(everything),
+                         ['bar', 'foo', 'qux', 'qux_name'])
+        self.assertEqual(self.notified(by_name), ['bar'])
+        self.assertEqual(self.notified(by_prefix), ['qux_name'])
+        self.assertEqual(self.notified(by_group), ['bar'])
+        self.assertEqual(self.notified(combined), ['foo', 'qux', 'qux_name'])
+
+    def test_groups(self):
+        groups = ParametersStore.parameter_groups()
+        self.assertEqual(sorted(groups.keys()), sorted(ParametersStore.GROUPS))
+        self.assertEqual(sorted(groups[ParametersStore.GROUP_DERIVED]),
+                         ['bar', 'baz', 'cafe'])
+
+    def test_select(self):
+        params = ParametersStore.select_parameters(
+            names=['qux', 'bar'], groups=[ParametersStore.GROUP_DERIVED])
+        self.assertEqual([p.name for p in params], ['qux', 'bar', 'baz', 'cafe'])
+        self.assertIs(params[0], ParametersStore.view().get('qux'))
+
+        self.assertEqual(len(ParametersStore.select_parameters()),
+                         len(self.PARAMETERS))
+        self.assertEqual(ParametersStore.select_parameters(names=[]), [])
+
+        self.assertRaises(KeyError, ParametersStore.select_parameters,
+                          names=['missing'])
+        self.assertRaises(KeyError, ParametersStore.select_parameters,
+                          groups=['missing'])
+
+    def test_index(self):
+        listener = self.subscribe(names=['foo'])
+
+        self.assertEqual(ParametersStore.change_listeners.handlers('foo'),
+                         [listener])
+        self.assertEqual(ParametersStore.change_listeners.handlers('qux'), [])
+
+        # index is rebuilt when subscriptions change
+        other = self.subscribe(prefixes=['q'])
+        self.assertEqual(ParametersStore.change_listeners.handlers('qux'),
+                         [other])
+
+
+class RateLimitedListenerTestCase(unittest.TestCase):
+    PARAMETERS = ParameterEvaluationTestCase.PARAMETERS + [
+        Parameter('qux', 'a', str)
+    ]
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+        self.received = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        ParametersStore.change_listeners.remove(self.handler)
+        ParametersStore.clear_parameters()
+
+    def handler(self, pdesc):
+        self.received.append((pdesc.name, pdesc.value))
+        if pdesc.name == 'foo' and pdesc.value == 20:
+            self.done.set()
+
+    def test_rate_limit(self):
+        ParametersStore.change_listeners.add(self.handler, names=['foo', 'qux'],
+                                             rate=5, rates={'qux': 0})
+
+        for value in range(2, 21):
+            ParametersStore.set('foo', value)
+        ParametersStore.set('qux', 'b')
+        ParametersStore.set('qux', 'c')
+
+        # first change is delivered immediately, not limited
+        # parameters are not delayed
+        self.assertEqual(self.received, [('foo', 2), ('qux', 'b'), ('qux', 'c')])
+
+        # final value is delivered after a delay
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.received[-1], ('foo', 20))
+        self.assertEqual(len(self.received), 4)
+
+        stats = ParametersStore.change_listeners.stats()
+        stats = stats['RateLimitedListenerTestCase.handler']
+        self.assertEqual(stats['forwarded'], 4)
+        self.assertEqual(stats['coalesced'], 17)
+        self.assertEqual(stats['pending'], 0)
+
+    def test_single_scheduler(self):
+        ParametersStore.change_listeners.add(self.handler, names=['foo', 'qux'],
+                                             rate=5)
+        limited = ParametersStore.change_listeners._find(self.handler)
+
+        ParametersStore.set('qux', 'b')
+        for value in range(2, 21):
+            ParametersStore.set('foo', value)
+        ParametersStore.set('qux', 'c')
+        ParametersStore.set('qux', 'd')
+
+        # deliveries of both parameters are scheduled on one thread
+        self.assertEqual(sorted(limited.scheduled), ['foo', 'qux'])
+        thread = limited.thread
+        self.assertTrue(thread.is_alive())
+
+        self.assertTrue(self.done.wait(5))
+        while limited.stats()['pending']:
+            time.sleep(0.01)
+        self.assertEqual(sorted(self.received),
+                         [('foo', 2), ('foo', 20), ('qux', 'b'), ('qux', 'd')])
+        self.assertIs(limited.thread, thread)
+
+        # scheduler thread ends once the listener is stopped
+        limited.stop()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_final_value_order(self):
+        # final value is delivered even if the thread that set the
+        # previous value is delayed after releasing the store lock
+        ParametersStore.change_listeners.add(self.handler, rate=10)
+        limited = ParametersStore.change_listeners._find(self.handler)
+        ParametersStore.set('foo', 2)
+
+        listeners = ParametersStore.change_listeners
+        deliver = listeners.deliver
+        second_set = threading.Event()
+
+        def delayed_deliver():
+            if threading.current_thread().name == 'first-set':
+                second_set.wait(5)
+            deliver()
+
+        with mock.patch.object(listeners, 'deliver', delayed_deliver):
+            first = threading.Thread(target=ParametersStore.set,
+                                     args=('foo', 3), name='first-set')
+            first.start()
+            while ParametersStore.get_value('foo') != 3:
+                time.sleep(0.01)
+
+            ParametersStore.set('foo', 4)
+            second_set.set()
+            first.join(5)
+
+        while limited.stats()['pending']:
+            time.sleep(0.01)
+        self.assertEqual(self.received, [('foo', 2), ('foo', 4)])
+
+    def test_queued(self):
+        ParametersStore.change_listeners.add(self.handler, queued=True, rate=5)
+
+        for value in range(2, 21):
+            ParametersStore.set('foo', value)
+
+        self.assertTrue(self.done.wait(5))
+        self.assertEqual(self.received, [('foo', 2), ('foo', 20)])
+
+        stats = ParametersStore.change_listeners.stats()
+        stats = stats['RateLimitedListenerTestCase.handler']
+        self.assertEqual(stats['forwarded'], 2)
+        self.assertEqual(stats['depth'], 0)
+
+
+class HiddenParameterTestCase(unittest.TestCase):
+    class ScaleEvaluator(Evaluator):
+        REQUIRES = [
+            'foo',
+            'div'
+        ]
+
+        def __call__(self, foo=None, div=None):
+            return foo / div
+
+    class NearEvaluator(Evaluator):
+        REQUIRES = [
+            'scale',
+            'near'
+        ]
+
+        def __call__(self, scale=None, near=None):
+            return scale * near
+
+    class FarEvaluator(Evaluator):
+        REQUIRES = [
+            'scale',
+            'far'
+        ]
+
+        def __call__(self, scale=None, far=None):
+            return scale * far
+
+    PARAMETERS = [
+        Parameter('foo', 10.0, float),
+        Parameter('div', 2.0, float),
+        Parameter('near', 1.0, float),
+        Parameter('far', 3.0, float),
+        HiddenParameter('scale', 0, float, evaluator=ScaleEvaluator),
+        Parameter('near_scaled', 0, float, evaluator=NearEvaluator),
+        Parameter('far_scaled', 0, float, evaluator=FarEvaluator),
+    ]
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_shared(self):
+        # hidden parameters are evaluated when loaded
+        self.assertEqual(ParametersStore.get_value('scale'), 5.0)
+
+        ParametersStore.set('near', 2.0)
+        self.assertEqual(ParametersStore.get_value('near_scaled'), 10.0)
+
+        evaluator = self.ScaleEvaluator
+        with mock.patch.object(evaluator, '__call__', autospec=True,
+                               side_effect=evaluator.__call__) as scale_mock:
+            ParametersStore.set('foo', 20.0)
+
+        # intermediate value is computed once and shared
+        self.assertEqual(scale_mock.call_count, 1)
+        self.assertEqual(ParametersStore.get_value('near_scaled'), 20.0)
+        self.assertEqual(ParametersStore.get_value('far_scaled'), 30.0)
+
+    def test_not_published(self):
+        names = [p.name for p in ParametersStore.get_parameters()]
+        self.assertNotIn('scale', names)
+        self.assertNotIn('scale', ParametersStore.parameters_as_dict())
+        self.assertTrue(ParametersStore.is_read_only('scale'))
+
+        revision = ParametersStore.revision()
+        ParametersStore.set('foo', 20.0)
+        revision, changed = ParametersStore.changed_since(revision)
+        self.assertEqual(sorted(p.name for p in changed),
+                         ['far_scaled', 'foo', 'near_scaled'])
+
+    def test_failed(self):
+        ParametersStore.set('near', 2.0)
+        ParametersStore.set('div', 0.0)
+
+        # dependants using failed intermediate value fail to evaluate
+        self.assertEqual(ParametersStore.get_value('near_scaled'), 10.0)
+        ParametersStore.set('near', 4.0)
+        self.assertEqual(ParametersStore.get_value('near_scaled'), 10.0)
+
+        ParametersStore.set('div', 1.0)
+        self.assertEqual(ParametersStore.get_value('near_scaled'), 40.0)
+        self.assertEqual(ParametersStore.get_value('far_scaled'), 30.0)
+
+
+class EvaluatorMemoTestCase(unittest.TestCase):
+    class BarEvaluator(Evaluator):
+        MEMO_SIZE = 2
+
+        REQUIRES = [
+            'foo'
+        ]
+
+        def __call__(self, foo=None):
+            return foo + 1
+
+    PARAMETERS = [
+        Parameter('foo', 1, int),
+        Parameter('bar', 0, int, evaluator=BarEvaluator),
+    ]
+
+    def setUp(self):
+        ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+
+    def tearDown(self):
+        ParametersStore.clear_parameters()
+
+    def test_memo(self):
+        evaluator = self.BarEvaluator
+        with mock.patch.object(evaluator, '__call__', autospec=True,
+                               side_effect=evaluator.__call__) as bar_mock:
+            for value in [2, 3, 2, 3, 4, 2]:
+                ParametersStore.set('foo', value)
+                self.assertEqual(ParametersStore.get_value('bar'), value + 1)
+
+        # 2 was evicted by 4, as least recently used
+        self.assertEqual([c[0][1] for c in bar_mock.call_args_list], [2, 3, 4, 2])
+
+        stats = ParametersStore.evaluator_stats()['BarEvaluator']
+        self.assertEqual(stats['calls'], 6)
+        self.assertEqual(stats['memo_hits'], 2)
+        self.assertEqual(stats['memo_misses'], 4)
+
+    def test_disabled(self):
+        ParametersStore.clear_parameters()
+        with mock.patch.object(self.BarEvaluator, 'MEMO_SIZE', 0):
+            ParametersStore.load_parameters(copy.deepcopy(self.PARAMETERS))
+
+        self.assertIsNone(ParametersStore.EVALUATORS['bar'].memo)
+
+        ParametersStore.set('foo', 2)
+        ParametersStore.set('foo', 3)
+        ParametersStore.set('foo', 2)
+        stats = ParametersStore.evaluator_stats()['BarEvaluator']
+        self.assertEqual(stats['calls'], 3)
+        self.assertNotIn('memo_hits', stats)
@@ -77,6 +77,50 @@ class ParameterTestCase(unittest.TestCase):
         status.set_status(ParameterStatus.HARDWARE)
         self.assertEqual(status.status, ParameterStatus.HARDWARE)
 
+        self.assertRaises(ValueError, status.set_status, 'foo')
+        self.assertEqual(status.status, ParameterStatus.HARDWARE)
+
+    def test_status_flags(self):
+        status = ParameterStatus(read=True, write=False,
+                                 status_type=ParameterStatus.HARDWARE)
+        self.assertEqual(status.flags,
+                         ParameterStatus.FLAG_READ | ParameterStatus.FLAG_HARDWARE)
+        self.assertTrue(status.read)
+        self.assertFalse(status.write)
+
+        status.write = True
+        status.status = ParameterStatus.SOFTWARE
+        self.assertEqual(status.flags,
+                         ParameterStatus.FLAG_READ | ParameterStatus.FLAG_WRITE)
+        self.assertEqual(status, ParameterStatus())
+        self.assertNotEqual(status, ParameterStatus(read=False))
+
+    def test_slots(self):
+        par = Parameter('foo', 1, int)
+        self.assertFalse(hasattr(par, '__dict__'))
+        self.assertFalse(hasattr(par.status, '__dict__'))
+        self.assertFalse(hasattr(ReadOnlyParameter('foo', 1, int), '__dict__'))
+
+    def test_equal(self):
+        par = Parameter('foo', 1, int, min_val=0)
+
+        self.assertEqual(par, Parameter('foo', 1, int, min_val=0))
+        self.assertNotEqual(par, Parameter('foo', 2, int, min_val=0))
+        self.assertNotEqual(par, Parameter('foo', 1, int))
+        self.assertNotEqual(par, ReadOnlyParameter('foo', 1, int, min_val=0))
+        self.assertNotEqual(par, None)
+
+    def test_copy(self):
+        par = ReadOnlyParameter('foo', 1, int)
+        par_copy = par.copy()
+
+        self.assertIsInstance(par_copy, ReadOnlyParameter)
+        self.assertEqual(par, par_copy)
+        self.assertIsNot(par.status, par_copy.status)
+
+        import copy
+        self.assertEqual(par, copy.deepcopy(par))
+
 
 class FloatInfinityTestCase(unittest.TestCase):
     def test_convert_to(self):